@@ -1,14 +1,26 @@
 import os
+import time
+import asyncio
+from contextlib import AsyncExitStack
 from PyQt6.QtCore import QThread, pyqtSignal
 
 from pydantic_ai import Agent
 from pydantic import BaseModel, Field
-from pydantic_ai.mcp import MCPServerStreamableHTTP, MCPServerSSE
+from pydantic_ai.mcp import MCPServerSSE
 from pydantic_ai.models.openai import OpenAIModel
 from pydantic_ai.providers.openrouter import OpenRouterProvider
+from pydantic_ai.toolsets import AbstractToolset
 
 from dotenv import load_dotenv
 
+from DbToolset import DbToolset
+from ToolCache import CachingToolset, tool_cache
+from SQLValidator import ValidationResult, check_syntax, explain_sql
+from LatencyStats import RaceStats
+from Tracer import TracedModel, TracingToolset, tracer
+from SqlLibraryIndex import FEW_SHOT_HEADER, few_shot_context, few_shot_examples
+from PromptBuilder import PromptBuilder, load_schema_catalog
+
 load_dotenv()
 
 
@@ -17,9 +29,16 @@ import logfire
 logfire.configure(token=os.getenv("LOGFIRE_TOKEN"))
 logfire.instrument_pydantic_ai()
 """
+# Spans are recorded locally by Tracer (appdata/traces) instead of logfire
 
 sys_prompt = open("sys_prompt.txt", "r", encoding="utf-8").read()
 
+repair_prompt = """คำสั่ง SQL ที่คุณสร้างไม่ผ่านการตรวจสอบด้วย EXPLAIN
+สาเหตุ: {reason}
+SQL เดิม:
+{sql}
+กรุณาแก้ไขคำสั่ง SQL ให้ถูกต้องและใช้ index ได้ (หลีกเลี่ยงการสแกนทั้งตาราง) แล้วตอบกลับในรูปแบบเดิม"""
+
 
 class OutputType(BaseModel):
     sql: str = Field(
@@ -30,48 +49,295 @@ class OutputType(BaseModel):
     )
 
 
+def build_model(llm_model):
+    """Turn a model name from the UI into a pydantic-ai model."""
+    if llm_model == "openai/gpt-oss-20b":
+        return OpenAIModel(
+            model_name="openai/gpt-oss-20b",
+            provider=OpenRouterProvider(api_key=os.getenv("OPENROUTER_API_KEY")),
+        )
+    return llm_model
+
+
+def model_label(llm_model):
+    return llm_model if isinstance(llm_model, str) else getattr(
+        llm_model, "model_name", repr(llm_model)
+    )
+
+
 class AgentDataWorker(QThread):
     signal_finished = pyqtSignal(str)
     signal_error = pyqtSignal(str)
     signal_progress = pyqtSignal(str)
     signal_message_history = pyqtSignal(list)
 
-    def __init__(self, llm_model, user_input, message_history):
+    def __init__(
+        self,
+        llm_model,
+        user_input,
+        message_history,
+        db_config=None,
+        toolset="mcp",
+        max_rows=200,
+        cache_ttl=600,
+        cache_size=256,
+        validate_sql=False,
+        max_estimated_rows=1_000_000,
+        max_repairs=2,
+        few_shot_k=3,
+        prompt_token_budget=1500,
+    ):
         super().__init__()
 
-        if llm_model == "openai/gpt-oss-20b":
-            llm_model = OpenAIModel(
-                model_name="openai/gpt-oss-20b",
-                provider=OpenRouterProvider(api_key=os.getenv("OPENROUTER_API_KEY")),
-            )
-
-        # ควรใช้ MCPServerSSE แทน MCPServerStdio เพื่อหลีกเลี่ยง error TaskGroup
-        self.mcp_mysql = MCPServerSSE(url=os.getenv("MCP_DB_SANDBOX"))
-
-        self.agent = Agent(
-            model=llm_model,
-            system_prompt=sys_prompt,
-            instructions="คุณชื่อ 'มะเฟือง' เป็นผู้หญิงที่มีความเชี่ยวชาญด้านฐานข้อมูลและการเขียนคำสั่ง SQL เวลาตอบคำถามให้ลงท้ายด้วย 'ค่ะ' เสมอ",
-            output_type=OutputType,
-            toolsets=[self.mcp_mysql],
+        self.few_shot_k = few_shot_k
+        self.few_shot = ""
+        # 0 = ส่ง sys_prompt.txt ทั้งไฟล์เหมือนเดิม
+        self.prompt_token_budget = prompt_token_budget
+        self.prompt_builder = (
+            PromptBuilder(sys_prompt, load_schema_catalog())
+            if prompt_token_budget > 0
+            else None
         )
+        self.schema_context = ""
+
+        self.trace_id = tracer.new_trace_id()
+        with tracer.span("agent_setup", trace_id=self.trace_id, toolset=str(toolset)):
+            self.setup_agents(
+                llm_model, db_config, toolset, max_rows, cache_ttl, cache_size
+            )
 
         self.user_input = user_input
         self.message_history = message_history
         self.new_message_history = []
 
+        self.db_config = db_config
+        self.validate_sql = validate_sql
+        self.max_estimated_rows = max_estimated_rows
+        self.max_repairs = max_repairs
+
+    def setup_agents(
+        self, llm_model, db_config, toolset, max_rows, cache_ttl, cache_size
+    ):
+        if isinstance(toolset, AbstractToolset):
+            # toolset ที่ส่งเข้ามาเอง เช่น DbToolset บน SQLite สำหรับ benchmark
+            self.mcp_mysql = toolset
+            cache_scope = f"{type(toolset).__name__}:{id(toolset)}"
+        elif toolset == "builtin" and db_config:
+            # เรียกฐานข้อมูลตรงผ่าน connection pool เดียวกับ QueryExecutor
+            self.mcp_mysql = DbToolset.for_mysql(db_config, max_rows=max_rows)
+            cache_scope = "{host}:{port}/{database}".format(**db_config)
+        else:
+            # ควรใช้ MCPServerSSE แทน MCPServerStdio เพื่อหลีกเลี่ยง error TaskGroup
+            self.mcp_mysql = MCPServerSSE(url=os.getenv("MCP_DB_SANDBOX"))
+            cache_scope = str(os.getenv("MCP_DB_SANDBOX"))
+
+        # จำผลลัพธ์ของ DESCRIBE / ข้อมูลตัวอย่างไว้ใช้ซ้ำข้ามคำถาม
+        tool_cache.configure(max_size=cache_size, ttl=cache_ttl)
+        self.cached_toolset = CachingToolset(self.mcp_mysql, scope=cache_scope)
+        traced_toolset = TracingToolset(self.cached_toolset)
+
+        # ส่ง list ของโมเดลเพื่อแข่งกันตอบ (racing mode) คำตอบแรกที่ผ่านการตรวจสอบชนะ
+        llm_models = llm_model if isinstance(llm_model, (list, tuple)) else [llm_model]
+        persona = "คุณชื่อ 'มะเฟือง' เป็นผู้หญิงที่มีความเชี่ยวชาญด้านฐานข้อมูลและการเขียนคำสั่ง SQL เวลาตอบคำถามให้ลงท้ายด้วย 'ค่ะ' เสมอ"
+        if self.prompt_builder:
+            # ส่วนคงที่อยู่ต้น instructions เสมอ เพื่อให้ provider ทำ prompt caching ได้
+            # ส่วนที่ขึ้นกับคำถาม (นิยามตาราง/โครงสร้าง/ตัวอย่าง SQL) ต่อท้าย
+            system_prompt = ()
+            instructions = [
+                self.prompt_builder.stable_prefix,
+                persona,
+                self.schema_instructions,  # รวมตัวอย่าง SQL ภายใต้ token budget แล้ว
+            ]
+        else:
+            system_prompt = sys_prompt
+            instructions = [persona, self.few_shot_instructions]
+
+        self.agents = {
+            model_label(model): Agent(
+                model=TracedModel(build_model(model)),
+                system_prompt=system_prompt,
+                instructions=instructions,
+                output_type=OutputType,
+                toolsets=[traced_toolset],
+            )
+            for model in llm_models
+        }
+        self.agent = next(iter(self.agents.values()))
+
+    def few_shot_instructions(self):
+        """Similar vetted queries from sql/, attached per question only."""
+        return self.few_shot
+
+    def schema_instructions(self):
+        """Synonyms, rules, table definitions and saved examples relevant to this question."""
+        return self.schema_context
+
+    async def check_output(self, output):
+        """Validate an agent answer: EXPLAIN when enabled, otherwise a syntax check."""
+        sql = getattr(output, "sql", "")
+        if not sql:
+            return ValidationResult(ok=bool(output.answer), reason="ไม่มีคำตอบ")
+        with tracer.span("sql_validate", sql_bytes=len(sql.encode())) as attrs:
+            if self.validate_sql and self.db_config:
+                check = await asyncio.to_thread(
+                    explain_sql, sql, self.db_config, self.max_estimated_rows
+                )
+            else:
+                check = check_syntax(sql)
+            attrs["ok"] = check.ok
+            attrs["estimated_rows"] = check.estimated_rows
+            return check
+
+    async def race(self):
+        """Send the question to every model at once and keep the first valid answer.
+
+        Returns (agent, result, check) of the winner, or of the first finisher
+        when no answer passes validation so the repair loop can still run on
+        it. Models cancelled by the win are recorded as censored latencies.
+        """
+        stats = RaceStats()
+        started = time.perf_counter()
+
+        async def run_one(label, agent):
+            with tracer.span("agent_run", model=label):
+                result = await agent.run(
+                    self.user_input, message_history=self.message_history
+                )
+            elapsed = time.perf_counter() - started
+            stats.record_latency(label, elapsed)
+            return label, result, await self.check_output(result.output), elapsed
+
+        tasks = {
+            asyncio.create_task(run_one(label, agent)): label
+            for label, agent in self.agents.items()
+        }
+        winner, fallback, last_error = None, None, None
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    label, result, check, elapsed = await next_done
+                except Exception as e:
+                    last_error = e
+                    print(f"Model race error: {e}")
+                    continue
+                print(f"Model race: {label} {elapsed:.2f}s valid={check.ok}")
+                if check.ok:
+                    winner = (label, result, check)
+                    break
+                fallback = fallback or (label, result, check)
+        finally:
+            cut_off = time.perf_counter() - started
+            for task, label in tasks.items():
+                if not task.done():
+                    stats.record_censored(label, cut_off)
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        stats.record_race(list(self.agents), winner[0] if winner else None)
+        label, result, check = winner or fallback or (None, None, None)
+        if result is None:
+            raise last_error or RuntimeError("ไม่มีโมเดลใดตอบกลับ")
+        self.signal_progress.emit(
+            f"{label} ตอบเร็วที่สุด ({time.perf_counter() - started:.1f}s)"
+        )
+        return self.agents[label], result, check
+
+    async def repair_sql(self, result, agent=None, check=None):
+        """Check the agent's SQL with EXPLAIN and let the agent fix it a few times.
+
+        `check` is an earlier validation of `result` (from the race), reused
+        instead of running EXPLAIN again. Returns the accepted result, or None
+        when the SQL is still rejected.
+        """
+        agent = agent or self.agent
+        if not self.validate_sql or not self.db_config:
+            return result
+
+        for attempt in range(self.max_repairs + 1):
+            sql = getattr(result.output, "sql", "")
+            if not sql:
+                return result
+
+            if attempt > 0 or check is None:
+                self.signal_progress.emit("กำลังตรวจสอบ SQL ด้วย EXPLAIN...")
+                check = await self.check_output(result.output)
+            if check.ok:
+                return result
+            print(f"SQL validation failed ({attempt + 1}): {check.reason}")
+            if attempt == self.max_repairs:
+                break
+
+            self.signal_progress.emit(
+                f"SQL ไม่ผ่านการตรวจสอบ กำลังให้ Ai แก้ไข ({attempt + 1}/{self.max_repairs})"
+            )
+            with tracer.span("sql_repair", attempt=attempt + 1):
+                result = await agent.run(
+                    repair_prompt.format(reason=check.reason, sql=sql),
+                    message_history=result.all_messages(),
+                )
+
+        self.signal_message_history.emit(result.all_messages())
+        self.signal_error.emit(
+            f"SQL ที่ Ai สร้างไม่ผ่านการตรวจสอบ: {check.reason}\n\n{sql}"
+        )
+        return None
+
     async def chat(self):
+        with tracer.span("chat", trace_id=self.trace_id) as attrs:
+            attrs["prompt_bytes"] = len(self.user_input.encode())
+            await self._chat()
+
+    async def _chat(self):
 
         try:
-            async with self.agent:
-                result = await self.agent.run(
-                    self.user_input, message_history=self.message_history
+            with tracer.span("few_shot_lookup", k=self.few_shot_k) as attrs:
+                examples = await asyncio.to_thread(
+                    few_shot_examples, self.user_input, self.few_shot_k
                 )
+                attrs["context_bytes"] = sum(len(example.encode()) for example in examples)
+
+            if self.prompt_builder:
+                # ตัวอย่าง SQL นับรวมใน token budget เดียวกับนิยามและโครงสร้างตาราง
+                with tracer.span(
+                    "prompt_build", budget=self.prompt_token_budget
+                ) as attrs:
+                    self.schema_context = self.prompt_builder.build(
+                        self.user_input,
+                        self.prompt_token_budget,
+                        examples=examples,
+                        examples_header=FEW_SHOT_HEADER,
+                    )
+                    attrs["context_bytes"] = len(self.schema_context.encode())
+            else:
+                self.few_shot = few_shot_context(examples)
+
+            async with AsyncExitStack() as stack:
+                with tracer.span("toolset_connect"):
+                    for agent in self.agents.values():
+                        await stack.enter_async_context(agent)
+
+                check = None
+                if len(self.agents) > 1:
+                    agent, result, check = await self.race()
+                else:
+                    agent = self.agent
+                    with tracer.span("agent_run", model=next(iter(self.agents))):
+                        result = await agent.run(
+                            self.user_input, message_history=self.message_history
+                        )
+                result = await self.repair_sql(result, agent, check)
+                if result is None:
+                    return
 
                 self.new_message_history = result.all_messages()
                 self.signal_message_history.emit(self.new_message_history)
 
-                self.signal_progress.emit("สำเร็จ")
+                cache_msg = (
+                    f"tool cache: hit {self.cached_toolset.hits}"
+                    f" / miss {self.cached_toolset.misses}"
+                )
+                print(f"{cache_msg} (total {tool_cache.stats()})")
+                self.signal_progress.emit(f"สำเร็จ ({cache_msg})")
                 if getattr(result.output, "sql", None):
                     self.signal_finished.emit(result.output.sql)
                 else:
@@ -80,7 +346,13 @@ class AgentDataWorker(QThread):
         except Exception as e:
             # Re-raise so run() catches it and logs
             # raise
-            err_msg = f"""
+            if isinstance(self.mcp_mysql, DbToolset):
+                err_msg = f"""
+            Ai agent run chat error : {str(e)}
+            or  check database settings in File > Settings.
+            """
+            else:
+                err_msg = f"""
             Ai agent run chat error : {str(e)}
             or  check mcp server is still working.
             browse to {os.getenv("MCP_DB_SANDBOX")}
@@ -0,0 +1,11 @@
+import os
+
+
+def app_data_path(*parts):
+    """Return a path inside the local `appdata` folder, creating parent folders.
+
+    Like the `sql/` library, local state lives next to the working directory.
+    """
+    path = os.path.join(os.getcwd(), "appdata", *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
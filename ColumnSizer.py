@@ -0,0 +1,196 @@
+import numpy as np
+from PyQt6.QtCore import QCoreApplication, QObject, QThread, QTimer, pyqtSignal
+
+
+# Rows whose widths are estimated right away instead of on a thread
+SYNC_ROWS = 2000
+# Rows per block of the lazy refit; scrolling into an unseen block refits the visible rows
+REFIT_BLOCK = 200
+CELL_PADDING = 16
+# Room for the sort indicator the model appends to the header text
+HEADER_PADDING = 28
+
+
+def sample_positions(row_count, size=1000, edge=100, seed=0):
+    """Row positions to measure: the first and last `edge` rows plus random rows in between."""
+    if row_count <= size:
+        return np.arange(row_count)
+    rng = np.random.default_rng(seed)
+    middle = rng.choice(np.arange(edge, row_count - edge), size - 2 * edge, replace=False)
+    return np.sort(np.concatenate([np.arange(edge), middle, np.arange(row_count - edge, row_count)]))
+
+
+def widest_texts(dataframe, positions, per_column=3):
+    """Per column, the `per_column` longest display texts among the rows at `positions`.
+
+    Lengths come from vectorized `str.len()` over the sample; only these few
+    candidates are then measured in pixels.
+    """
+    sample = dataframe.iloc[positions]
+    candidates = []
+    for column in range(sample.shape[1]):
+        values = sample.iloc[:, column]
+        texts = values.astype(str).where(values.notna(), "")
+        lengths = texts.str.len().to_numpy()
+        longest = np.argsort(lengths)[-per_column:]
+        candidates.append([texts.iloc[position] for position in longest])
+    return candidates
+
+
+class ColumnWidthWorker(QThread):
+    """Background sampling of the longest cell texts of a DataFrame."""
+
+    finished = pyqtSignal(list)  # per column: candidate texts
+    error = pyqtSignal(str)
+    progress = pyqtSignal(str)
+
+    def __init__(self, dataframe, sample_size=1000):
+        super().__init__()
+        self.dataframe = dataframe
+        self.sample_size = sample_size
+
+    def run(self):
+        try:
+            positions = sample_positions(len(self.dataframe), self.sample_size)
+            self.finished.emit(widest_texts(self.dataframe, positions))
+        except Exception as e:
+            self.error.emit(f"คำนวณความกว้างคอลัมน์ไม่สำเร็จ: {str(e)}")
+
+
+class ColumnSizer(QObject):
+    """Sizes the columns of a QTableView showing a PandasTableModel from a sample of rows.
+
+    Replaces `resizeColumnsToContents()`, which asks `data()` for every cell.
+    Headers are sized at once; cell widths come from a sample (first, last
+    and random rows) measured on a thread, capped at `max_width`. When the
+    user scrolls into rows not seen yet, the visible rows are measured and
+    columns only ever widen. Columns the user resized are left alone.
+    """
+
+    def __init__(self, table, max_width=400, sample_size=1000):
+        super().__init__(table)
+        self.table = table
+        self.max_width = max_width
+        self.sample_size = sample_size
+        self.worker = None
+        self._model = None
+        self._fitted_blocks = set()
+        self._manual = set()
+        self._resizing = False
+
+        self._refit_timer = QTimer(self)
+        self._refit_timer.setSingleShot(True)
+        self._refit_timer.setInterval(150)
+        self._refit_timer.timeout.connect(self.refit_visible)
+        table.verticalScrollBar().valueChanged.connect(self._schedule_refit)
+        table.horizontalHeader().sectionResized.connect(self._on_section_resized)
+
+    def fit(self, model):
+        """Size the columns of `model`, the table's new PandasTableModel."""
+        self._release_worker()
+        if self._model is not None:
+            for signal in (self._model.layoutChanged, self._model.modelReset):
+                try:
+                    signal.disconnect(self._on_rows_changed)
+                except TypeError:
+                    pass
+        self._model = model
+        self._fitted_blocks = set()
+        self._manual = set()
+        model.layoutChanged.connect(self._on_rows_changed)
+        model.modelReset.connect(self._on_rows_changed)
+
+        dataframe = model._dataframe
+        header = self.table.horizontalHeader()
+        metrics = header.fontMetrics()
+        header_widths = [
+            min(metrics.horizontalAdvance(str(name)) + HEADER_PADDING, self.max_width)
+            for name in dataframe.columns
+        ]
+        self._apply(header_widths, widen_only=False)
+
+        if len(dataframe) <= SYNC_ROWS:
+            self._apply_candidates(widest_texts(dataframe, np.arange(len(dataframe))))
+            self._fitted_blocks.update(range(len(dataframe) // REFIT_BLOCK + 1))
+            return
+        self._fitted_blocks.add(0)
+        self.worker = ColumnWidthWorker(dataframe, self.sample_size)
+        self.worker.finished.connect(self._on_sampled)
+        # A failed sample keeps the header widths
+        self.worker.error.connect(self._forget_worker)
+        self.worker.start()
+
+    def _apply(self, widths, widen_only=True):
+        self._resizing = True
+        try:
+            for column, width in enumerate(widths):
+                if column in self._manual:
+                    continue
+                if not widen_only or width > self.table.columnWidth(column):
+                    self.table.setColumnWidth(column, width)
+        finally:
+            self._resizing = False
+
+    def _on_sampled(self, candidates):
+        self._forget_worker()
+        self._apply_candidates(candidates)
+
+    def _forget_worker(self, *args):
+        # Its signals are emitted from run(); let the thread end before the last reference goes
+        worker, self.worker = self.worker, None
+        if worker is not None:
+            worker.wait()
+
+    def _apply_candidates(self, candidates):
+        """Widen columns to the widest candidate text, within the cap."""
+        # The stylesheet sets the cell font; polish so fontMetrics() reflects it
+        self.table.ensurePolished()
+        metrics = self.table.fontMetrics()
+        widths = [
+            min(
+                max([metrics.horizontalAdvance(text) for text in texts] + [0]) + CELL_PADDING,
+                self.max_width,
+            )
+            for texts in candidates
+        ]
+        self._apply(widths)
+
+    def _on_section_resized(self, column, old_width, new_width):
+        if not self._resizing:
+            self._manual.add(column)
+
+    def _on_rows_changed(self):
+        # Sorting or filtering brings other rows into view
+        self._fitted_blocks = set()
+        self._schedule_refit()
+
+    def _schedule_refit(self, *args):
+        if self._model is not None:
+            self._refit_timer.start()
+
+    def refit_visible(self):
+        """Measure the rows on screen if their block has not been measured yet."""
+        model = self._model
+        if model is None or self.table.model() is not model or model.rowCount() == 0:
+            return
+        first = max(self.table.rowAt(0), 0)
+        last = self.table.rowAt(self.table.viewport().height() - 1)
+        if last < 0:
+            last = model.rowCount() - 1
+        blocks = set(range(first // REFIT_BLOCK, last // REFIT_BLOCK + 1))
+        if blocks <= self._fitted_blocks:
+            return
+        self._fitted_blocks |= blocks
+        self._apply_candidates(widest_texts(model._dataframe, np.arange(first, last + 1)))
+
+    def _release_worker(self):
+        """Forget a running estimate without waiting; the application keeps it alive."""
+        worker, self.worker = self.worker, None
+        if worker is not None and worker.isRunning():
+            worker.finished.disconnect()
+            worker.error.disconnect()
+            worker.setParent(QCoreApplication.instance())
+
+    def stop(self):
+        self._refit_timer.stop()
+        self._release_worker()
@@ -0,0 +1,278 @@
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import pymysql
+
+
+CONNECT_KEYS = ("host", "port", "user", "password", "database", "ssl")
+# How long a replica lag reading is trusted, and how long a bad replica is skipped (seconds)
+LAG_CHECK_INTERVAL = 10
+REPLICA_RETRY_AFTER = 30
+
+
+def connect_kwargs(db_config):
+    """Build pymysql.connect keyword arguments from a db_config dict."""
+    params = {key: db_config[key] for key in CONNECT_KEYS if db_config.get(key)}
+    params["charset"] = "utf8mb4"
+    # Pooled connections are reused, so never keep a read snapshot open between checkouts.
+    params["autocommit"] = True
+    return params
+
+
+class ConnectionPool:
+    """Thread-safe pool of PyMySQL connections for a single database config."""
+
+    def __init__(self, db_config, max_size=5):
+        self.db_config = db_config
+        self.max_size = max_size
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def _connect(self):
+        return pymysql.connect(**connect_kwargs(self.db_config))
+
+    def acquire(self, timeout=None):
+        """Check out a connection, blocking while `max_size` are in use."""
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("หมดเวลารอการเชื่อมต่อฐานข้อมูลจาก pool")
+        try:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                return self._connect()
+            try:
+                connection.ping(reconnect=True)
+            except pymysql.Error:
+                connection = self._connect()
+            return connection
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection, discard=False):
+        """Return a connection to the pool, or close it when `discard` is set."""
+        try:
+            if discard or not connection.open:
+                connection.close()
+            else:
+                with self._lock:
+                    self._idle.append(connection)
+        except pymysql.Error:
+            pass
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and back in."""
+        connection = self.acquire()
+        try:
+            yield connection
+        except Exception:
+            self.release(connection, discard=True)
+            raise
+        else:
+            self.release(connection)
+
+    def warm(self, count):
+        """Open connections until `count` (at most `max_size`) are idle; return how many are."""
+        connections = []
+        try:
+            for _ in range(min(count, self.max_size)):
+                try:
+                    connections.append(self.acquire(timeout=0))
+                except TimeoutError:
+                    break  # the rest are in use
+        finally:
+            for connection in connections:
+                self.release(connection)
+        return len(connections)
+
+    def close_all(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            try:
+                connection.close()
+            except pymysql.Error:
+                pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_key(db_config):
+    return tuple(str(db_config.get(key, "")) for key in CONNECT_KEYS) + (
+        str(db_config.get("pool_size", "")),
+    )
+
+
+def profile_key(db_config):
+    """File-name-safe key identifying the database server and schema of `db_config`."""
+    raw = f"{db_config.get('host')}_{db_config.get('port')}_{db_config.get('database')}"
+    return re.sub(r"[^\w.-]+", "_", raw)
+
+
+def get_pool(db_config):
+    """Return the shared pool for `db_config`, creating it on first use."""
+    key = _pool_key(db_config)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(
+                db_config, max_size=int(db_config.get("pool_size") or 5)
+            )
+        return pool
+
+
+def close_all_pools():
+    """Close idle connections in every shared pool."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
+
+
+_replicas = {}  # pool key -> {"checked_at", "lag", "down_until"}
+_last_writes = {}  # profile_key -> time.monotonic() of the last write
+_notice_handlers = []
+
+
+def add_notice_handler(handler):
+    """Call `handler(message)` when a replica is skipped or its lag cannot be read.
+
+    Handlers run on whichever thread routed the query, so GUI code should
+    pass a signal's `emit`.
+    """
+    _notice_handlers.append(handler)
+
+
+def remove_notice_handler(handler):
+    if handler in _notice_handlers:
+        _notice_handlers.remove(handler)
+
+
+def _notify(message):
+    for handler in list(_notice_handlers):
+        try:
+            handler(message)
+        except Exception:
+            pass  # a notice must never fail the query being routed
+
+
+def replica_config(db_config):
+    """`db_config` pointed at the profile's read replica, or None when it has none."""
+    host = db_config.get("replica_host")
+    if not host:
+        return None
+    config = dict(db_config)
+    config["host"] = host
+    config["port"] = int(db_config.get("replica_port") or db_config.get("port") or 3306)
+    config["replica_host"] = ""
+    return config
+
+
+def replica_lag(connection):
+    """Seconds the server is behind its source: 0 if it is not a replica, None if replication stopped."""
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+        except pymysql.MySQLError:
+            # MySQL before 8.0.22 and MariaDB
+            cursor.execute("SHOW SLAVE STATUS")
+        status = cursor.fetchone()
+    if not status:
+        return 0
+    lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+    return None if lag is None else int(lag)
+
+
+def mark_replica_down(db_config, reason):
+    """Send reads for this profile to the primary for REPLICA_RETRY_AFTER seconds."""
+    replica = replica_config(db_config)
+    if replica is None:
+        return
+    with _pools_lock:
+        state = _replicas.setdefault(_pool_key(replica), {"checked_at": 0, "lag": None})
+        state["down_until"] = time.monotonic() + REPLICA_RETRY_AFTER
+    _notify(f"ข้าม replica {replica['host']}:{replica['port']} ใช้ primary แทน: {reason}")
+
+
+def note_write(db_config):
+    """Record a write so this profile's next reads see it on the primary."""
+    with _pools_lock:
+        _last_writes[profile_key(db_config)] = time.monotonic()
+
+
+def routed_pool(db_config, read_only=False):
+    """(pool, role) for a statement: reads go to a healthy replica, the rest to the primary.
+
+    The replica's lag is checked at most every LAG_CHECK_INTERVAL seconds; a
+    replica that is unreachable, has stopped replicating or lags more than
+    `max_replica_lag` seconds is skipped for REPLICA_RETRY_AFTER seconds.
+    Reads within `max_replica_lag` seconds of a write also use the primary so
+    they see that write.
+    """
+    replica = replica_config(db_config) if read_only else None
+    if replica is None:
+        return get_pool(db_config), "primary"
+
+    key = _pool_key(replica)
+    now = time.monotonic()
+    max_lag = int(db_config.get("max_replica_lag") or 30)
+    with _pools_lock:
+        state = _replicas.setdefault(key, {"checked_at": 0, "lag": None})
+        last_write = _last_writes.get(profile_key(db_config), -max_lag - 1)
+        use_primary = now < state.get("down_until", 0) or now - last_write <= max_lag
+        check = not use_primary and now - state["checked_at"] > LAG_CHECK_INTERVAL
+        if check:
+            state["checked_at"] = now
+    if use_primary:
+        return get_pool(db_config), "primary"
+
+    pool = get_pool(replica)
+    if check:
+        try:
+            with pool.connection() as connection:
+                lag = replica_lag(connection)
+        except pymysql.OperationalError as e:
+            mark_replica_down(db_config, str(e))
+            return get_pool(db_config), "primary"
+        except pymysql.MySQLError as e:
+            # No REPLICATION CLIENT privilege: the lag is unknown, keep using the replica
+            _notify(f"อ่านค่า lag ของ replica ไม่ได้ ใช้ replica ต่อไป: {e}")
+            lag = 0
+        state["lag"] = lag
+        if lag is None or lag > max_lag:
+            mark_replica_down(
+                db_config,
+                "replication stopped" if lag is None else f"lag {lag} s > {max_lag} s",
+            )
+            return get_pool(db_config), "primary"
+    return pool, "replica"
+
+
+@contextmanager
+def routed_connection(db_config, read_only=False):
+    """Check out (connection, role) from `routed_pool`, falling back to the primary."""
+    pool, role = routed_pool(db_config, read_only)
+    try:
+        connection = pool.acquire()
+    except pymysql.OperationalError as e:
+        if role != "replica":
+            raise
+        mark_replica_down(db_config, str(e))
+        pool, role = get_pool(db_config), "primary"
+        connection = pool.acquire()
+    try:
+        yield connection, role
+    except Exception:
+        pool.release(connection, discard=True)
+        raise
+    else:
+        pool.release(connection)
@@ -0,0 +1,153 @@
+import socket
+import time
+
+import pymysql
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from ConnectionPool import connect_kwargs, get_pool, replica_config, replica_lag
+
+
+class _TimedContext:
+    """SSLContext proxy that records how long the TLS handshake takes."""
+
+    def __init__(self, context, timings):
+        self._context = context
+        self._timings = timings
+
+    def wrap_socket(self, *args, **kwargs):
+        started = time.perf_counter()
+        wrapped = self._context.wrap_socket(*args, **kwargs)
+        self._timings["tls_ms"] = (time.perf_counter() - started) * 1000
+        return wrapped
+
+    def __getattr__(self, name):
+        return getattr(self._context, name)
+
+
+class _TimedConnection(pymysql.connections.Connection):
+    """Connection that notes when the TCP socket is up, before the server greeting."""
+
+    def _get_server_information(self):
+        self.socket_ready_at = time.perf_counter()
+        return super()._get_server_information()
+
+
+def measure_connection(db_config, timeout=10, replica=False):
+    """Open one connection and time each phase of it.
+
+    Returns a dict with DNS, TCP connect, TLS handshake, authentication and
+    first query (SELECT 1) times in ms, plus the server version and TLS cipher
+    (and the replication lag when `replica` is set).
+    """
+    timings = {"host": db_config.get("host"), "port": int(db_config.get("port") or 3306), "tls_ms": None}
+
+    started = time.perf_counter()
+    socket.getaddrinfo(timings["host"], timings["port"], type=socket.SOCK_STREAM)
+    timings["dns_ms"] = (time.perf_counter() - started) * 1000
+
+    params = connect_kwargs(db_config)
+    params["connect_timeout"] = timeout
+    connection = _TimedConnection(defer_connect=True, **params)
+    if getattr(connection, "ctx", None) is not None:
+        connection.ctx = _TimedContext(connection.ctx, timings)
+    started = time.perf_counter()
+    connection.connect()
+    connected = time.perf_counter()
+    try:
+        timings["tcp_ms"] = (connection.socket_ready_at - started) * 1000
+        timings["auth_ms"] = max(
+            0.0, (connected - connection.socket_ready_at) * 1000 - (timings["tls_ms"] or 0)
+        )
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        timings["query_ms"] = (time.perf_counter() - started) * 1000
+        timings["server"] = connection.get_server_info()
+        cipher = connection._sock.cipher() if hasattr(connection._sock, "cipher") else None
+        timings["cipher"] = cipher[0] if cipher else None
+        if replica:
+            timings["lag"] = replica_lag(connection)
+    finally:
+        connection.close()
+    return timings
+
+
+def format_timings(timings):
+    """Multi-line, human readable report of `measure_connection` results."""
+    lines = [
+        f"{timings['host']}:{timings['port']} (MySQL {timings.get('server', '?')})",
+        f"  DNS: {timings['dns_ms']:.1f} ms",
+        f"  TCP connect: {timings['tcp_ms']:.1f} ms",
+    ]
+    if timings["tls_ms"] is None:
+        lines.append("  TLS: not used")
+    else:
+        lines.append(f"  TLS handshake: {timings['tls_ms']:.1f} ms ({timings.get('cipher') or '?'})")
+    lines.append(f"  Authentication: {timings['auth_ms']:.1f} ms")
+    lines.append(f"  First query (SELECT 1): {timings['query_ms']:.1f} ms")
+    if "lag" in timings:
+        lines.append(
+            "  Replica lag: replication stopped"
+            if timings["lag"] is None
+            else f"  Replica lag: {timings['lag']} s"
+        )
+    return "\n".join(lines)
+
+
+class ConnectionTester(QThread):
+    """Background connection test of a profile and its read replica, if any."""
+
+    finished = pyqtSignal(list)  # [timings of primary, timings of replica]
+    error = pyqtSignal(str)
+    progress = pyqtSignal(str)
+
+    def __init__(self, db_config, timeout=10):
+        super().__init__()
+        self.db_config = db_config
+        self.timeout = timeout
+
+    def run(self):
+        results = []
+        targets = [("primary", self.db_config)]
+        replica = replica_config(self.db_config)
+        if replica is not None:
+            targets.append(("replica", replica))
+        for role, config in targets:
+            self.progress.emit(f"Testing {role} {config['host']}:{config.get('port') or 3306}...")
+            try:
+                results.append(measure_connection(config, self.timeout, replica=role == "replica"))
+            except (pymysql.Error, OSError) as e:
+                self.error.emit(f"Failed to connect to {role} {config['host']}: {str(e)}")
+                return
+            except Exception as e:
+                self.error.emit(f"An unexpected error occurred: {str(e)}")
+                return
+        self.finished.emit(results)
+
+
+class PoolWarmer(QThread):
+    """Background thread that opens pooled connections before the first query needs them."""
+
+    finished = pyqtSignal(int)  # connections ready
+    error = pyqtSignal(str)
+    progress = pyqtSignal(str)
+
+    def __init__(self, db_config, count):
+        super().__init__()
+        self.db_config = db_config
+        self.count = count
+
+    def run(self):
+        ready = 0
+        try:
+            configs = [self.db_config]
+            replica = replica_config(self.db_config)
+            if replica is not None:
+                configs.append(replica)
+            for config in configs:
+                ready += get_pool(config).warm(self.count)
+            self.progress.emit(f"เตรียมการเชื่อมต่อฐานข้อมูลพร้อมใช้ {ready} การเชื่อมต่อ")
+            self.finished.emit(ready)
+        except Exception as e:
+            self.error.emit(f"เตรียมการเชื่อมต่อฐานข้อมูลไม่สำเร็จ: {str(e)}")
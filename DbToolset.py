@@ -0,0 +1,157 @@
+import csv
+import io
+import re
+import sqlite3
+from contextlib import contextmanager
+
+import pymysql
+from pydantic_ai import ModelRetry
+from pydantic_ai.toolsets import FunctionToolset
+
+from ConnectionPool import routed_connection
+from StatementClassifier import READ_FIRST_WORDS, classify
+
+
+IDENTIFIER_RE = re.compile(r"^[A-Za-z0-9_$]+$")
+
+
+def ensure_read_only(sql):
+    """Raise ModelRetry unless `sql` is a single read-only statement."""
+    statement = classify(sql)
+    if len(statement.statements) != 1:
+        raise ModelRetry("ส่งคำสั่ง SQL ได้ครั้งละ 1 คำสั่งเท่านั้น")
+
+    if statement.first_words[0] not in READ_FIRST_WORDS:
+        raise ModelRetry(f"อนุญาตเฉพาะคำสั่งอ่านข้อมูล ({', '.join(sorted(READ_FIRST_WORDS))})")
+    if statement.reason == "INTO":
+        raise ModelRetry("ห้ามใช้ INTO ในคำสั่งอ่านข้อมูล")
+    if not statement.is_read or statement.locking:
+        raise ModelRetry(f"ห้ามใช้คำสั่ง {statement.reason or 'FOR UPDATE'} ที่เปลี่ยนแปลงฐานข้อมูล")
+
+
+def check_identifier(name):
+    """Validate a table name before it is quoted into SQL."""
+    if not IDENTIFIER_RE.match(name or ""):
+        raise ModelRetry(f"ชื่อตารางไม่ถูกต้อง: {name!r}")
+    return name
+
+
+@contextmanager
+def sqlite_connection(path):
+    """Open a SQLite database, used as a local stand-in for MySQL."""
+    connection = sqlite3.connect(path)
+    try:
+        yield connection
+    finally:
+        connection.close()
+
+
+class DbToolset(FunctionToolset):
+    """In-process database tools for the agent, an alternative to the SSE MCP server.
+
+    `connect` is a zero-argument context manager factory yielding a DB-API
+    connection. For MySQL it is the shared `ConnectionPool` used by
+    `QueryExecutor`; for tests it can be a SQLite file.
+    """
+
+    def __init__(self, connect, dialect="mysql", max_rows=200, max_chars=20000):
+        super().__init__(max_retries=2)
+        self.connect = connect
+        self.dialect = dialect
+        self.max_rows = max_rows
+        self.max_chars = max_chars
+
+        for func in (self.list_tables, self.describe_table, self.sample_rows, self.run_select):
+            self.add_function(func)
+
+    @classmethod
+    def for_mysql(cls, db_config, **kwargs):
+        # Every tool is read-only, so it may use the profile's read replica
+        @contextmanager
+        def connect():
+            with routed_connection(db_config, read_only=True) as (connection, _):
+                yield connection
+
+        return cls(connect, dialect="mysql", **kwargs)
+
+    @classmethod
+    def for_sqlite(cls, path, **kwargs):
+        return cls(lambda: sqlite_connection(path), dialect="sqlite", **kwargs)
+
+    def _fetch(self, sql, max_rows=None):
+        """Run `sql` and return the rows as capped CSV text.
+
+        MySQL rows come from an unbuffered cursor, so at most `max_rows` + 1
+        are transferred. When rows are left unread the connection is closed
+        rather than drained, and the pool replaces it.
+        """
+        max_rows = max_rows or self.max_rows
+        with self.connect() as connection:
+            mysql = self.dialect == "mysql"
+            cursor = connection.cursor(pymysql.cursors.SSCursor) if mysql else connection.cursor()
+            unread = False
+            try:
+                cursor.execute(sql)
+                columns = [desc[0] for desc in cursor.description or []]
+                rows = cursor.fetchmany(max_rows + 1)
+                unread = mysql and len(rows) > max_rows
+            finally:
+                if unread:
+                    connection.close()
+                else:
+                    cursor.close()
+
+        truncated = len(rows) > max_rows
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(columns)
+        writer.writerows(rows[:max_rows])
+        text = buffer.getvalue()
+
+        if len(text) > self.max_chars:
+            text = text[: self.max_chars].rsplit("\n", 1)[0] + "\n"
+            truncated = True
+        if truncated:
+            text += f"-- ผลลัพธ์ถูกตัดเหลือไม่เกิน {max_rows} แถว / {self.max_chars} ตัวอักษร\n"
+        return text
+
+    def list_tables(self) -> str:
+        """List the tables in the connected database."""
+        if self.dialect == "sqlite":
+            return self._fetch(
+                "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name",
+                max_rows=10000,
+            )
+        return self._fetch("SHOW TABLES", max_rows=10000)
+
+    def describe_table(self, table: str) -> str:
+        """Show the columns and data types of a table.
+
+        Args:
+            table: The table name, e.g. person.
+        """
+        table = check_identifier(table)
+        if self.dialect == "sqlite":
+            return self._fetch(f'PRAGMA table_info("{table}")', max_rows=10000)
+        return self._fetch(f"DESCRIBE `{table}`", max_rows=10000)
+
+    def sample_rows(self, table: str, limit: int = 5) -> str:
+        """Return a few sample rows of a table.
+
+        Args:
+            table: The table name, e.g. village.
+            limit: Number of rows to return (at most 20).
+        """
+        table = check_identifier(table)
+        limit = max(1, min(int(limit), 20))
+        quote = '"' if self.dialect == "sqlite" else "`"
+        return self._fetch(f"SELECT * FROM {quote}{table}{quote} LIMIT {limit}")
+
+    def run_select(self, sql: str) -> str:
+        """Run a read-only SELECT query and return the result as CSV.
+
+        Args:
+            sql: A single SELECT, WITH, SHOW, DESCRIBE or EXPLAIN statement.
+        """
+        ensure_read_only(sql)
+        return self._fetch(sql.strip().rstrip(";"))
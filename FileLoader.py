@@ -0,0 +1,65 @@
+import codecs
+import os
+import threading
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+
+class FileLoader(QThread):
+    """Background thread that reads a large SQL file in chunks.
+
+    Each decoded chunk is handed to the GUI through `chunk`; the GUI calls
+    `ack()` after appending it, and at most `max_pending` chunks wait in the
+    queue, so memory stays bounded however big the file is.
+    """
+
+    chunk = pyqtSignal(str)
+    progress = pyqtSignal(int, str)  # percent, message
+    finished = pyqtSignal(str)  # filename
+    error = pyqtSignal(str)
+
+    def __init__(self, filename, chunk_size=4 * 1024 * 1024, max_pending=2):
+        super().__init__()
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self._pending = threading.Semaphore(max_pending)
+        self._cancelled = False
+
+    def ack(self):
+        self._pending.release()
+
+    def cancel(self):
+        self._cancelled = True
+        self._pending.release()
+
+    def run(self):
+        try:
+            total = os.path.getsize(self.filename) or 1
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            carry = ""
+            read = 0
+            with open(self.filename, "rb") as file:
+                while not self._cancelled:
+                    data = file.read(self.chunk_size)
+                    final = not data
+                    text = carry + decoder.decode(data, final=final)
+                    # A "\r\n" may be split across chunks; keep a trailing "\r" for the next one
+                    carry = "" if final or not text.endswith("\r") else "\r"
+                    text = text[: len(text) - len(carry)].replace("\r\n", "\n")
+                    if text:
+                        self._pending.acquire()
+                        if self._cancelled:
+                            break
+                        self.chunk.emit(text)
+                    if final:
+                        break
+                    read += len(data)
+                    percent = min(100, read * 100 // total)
+                    self.progress.emit(
+                        percent,
+                        f"กำลังเปิดไฟล์ {read / (1024 * 1024):,.0f} / {total / (1024 * 1024):,.0f} MB ({percent}%)",
+                    )
+            if not self._cancelled:
+                self.finished.emit(self.filename)
+        except Exception as e:
+            self.error.emit(f"Cannot open SQL file: {str(e)}")
@@ -0,0 +1,160 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from SQLFormatter import format_edits, format_statement, statement_spans
+from Tracer import tracer
+
+
+# Below this much unformatted SQL, starting worker processes costs more than it saves
+POOL_MIN_STATEMENTS = 8
+POOL_MIN_BYTES = 64 * 1024
+
+
+class FormatCache:
+    """Thread-safe LRU of formatted output keyed by a hash of the statement text.
+
+    Formatted results are also stored under their own hash, so statements that
+    are already formatted are recognised and skipped on the next run.
+    """
+
+    def __init__(self, max_entries=20000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(sql):
+        return hashlib.sha1(sql.encode("utf-8")).hexdigest()
+
+    def get(self, sql):
+        key = self.key(sql)
+        with self._lock:
+            formatted = self._entries.get(key)
+            if formatted is not None:
+                self._entries.move_to_end(key)
+            return formatted
+
+    def put(self, sql, formatted):
+        with self._lock:
+            for key in (self.key(sql), self.key(formatted)):
+                self._entries[key] = formatted
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+format_cache = FormatCache()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_format_pool():
+    """Shared process pool for formatting; sqlparse is pure Python, so threads would not help.
+
+    Workers are spawned, not forked: forking this multi-threaded Qt process
+    could copy a lock held by another thread into the child and deadlock it.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=max(1, min(4, (os.cpu_count() or 2) - 1)),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_format_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def format_statements(statements, cache=format_cache):
+    """Return (formatted statements, number actually formatted), reusing cached output."""
+    results = [cache.get(sql) for sql in statements]
+    pending = [index for index, formatted in enumerate(results) if formatted is None]
+    sources = [statements[index] for index in pending]
+
+    if len(sources) >= POOL_MIN_STATEMENTS and sum(map(len, sources)) >= POOL_MIN_BYTES:
+        try:
+            chunksize = max(1, len(sources) // 32)
+            formatted = list(get_format_pool().map(format_statement, sources, chunksize=chunksize))
+        except (BrokenProcessPool, OSError) as e:
+            print(f"Format pool unavailable, formatting in-thread: {e}")
+            shutdown_format_pool()
+            formatted = [format_statement(sql) for sql in sources]
+    else:
+        formatted = [format_statement(sql) for sql in sources]
+
+    for index, sql, text in zip(pending, sources, formatted):
+        cache.put(sql, text)
+        results[index] = text
+    return results, len(pending)
+
+
+class FormatWorker(QThread):
+    """Background thread that formats a document statement by statement.
+
+    Only statements whose formatted text differs from the current text are
+    reported, as (start, end, text) edits against the snapshot given to the
+    worker, so the editor can patch them in place.
+    """
+
+    finished = pyqtSignal(list)  # [(start, end, formatted), ...]
+    error = pyqtSignal(str)
+    progress = pyqtSignal(str)
+
+    def __init__(self, sql, start=0, end=None, cursor=None, trace_id=None):
+        super().__init__()
+        self.sql = sql
+        self.start_offset = start
+        self.end_offset = len(sql) if end is None else end
+        self.cursor = cursor  # format only the statement containing this offset
+        self.trace_id = trace_id
+        self.revision = None
+
+    def _spans(self):
+        spans = [
+            (self.start_offset + begin, self.start_offset + end)
+            for begin, end in statement_spans(self.sql[self.start_offset : self.end_offset])
+        ]
+        if self.cursor is not None and spans:
+            containing = [span for span in spans if span[0] <= self.cursor <= span[1]]
+            preceding = [span for span in spans if span[1] <= self.cursor]
+            spans = containing[:1] or preceding[-1:] or spans[:1]
+        return spans
+
+    def run(self):
+        try:
+            with tracer.span(
+                "sql_format", trace_id=self.trace_id, sql_bytes=len(self.sql.encode())
+            ) as attrs:
+                self.progress.emit("กำลังจัดรูปแบบ SQL...")
+                spans = self._spans()
+                statements = [self.sql[begin:end] for begin, end in spans]
+                formatted, formatted_count = format_statements(statements)
+
+                edits = format_edits(self.sql, spans, formatted)
+
+                attrs.update(
+                    statements=len(statements), formatted=formatted_count, changed=len(edits)
+                )
+
+            self.progress.emit(
+                f"จัดรูปแบบ SQL สำเร็จ: {len(statements)} คำสั่ง "
+                f"(จัดใหม่ {formatted_count}, ใช้แคช {len(statements) - formatted_count})"
+            )
+            self.finished.emit(edits)
+        except Exception as e:
+            self.error.emit(f"จัดรูปแบบ SQL ไม่สำเร็จ: {e}")
@@ -0,0 +1,394 @@
+import json
+import re
+
+import pymysql
+import sqlparse
+from PyQt6.QtCore import QThread, pyqtSignal
+from sqlparse import tokens as T
+
+from ConnectionPool import routed_connection
+from SargableRewriter import rewrite_sargable
+from SchemaCatalog import table_aliases
+from StatementClassifier import classify
+
+
+# Access types that read a whole table or a whole index
+FULL_SCANS = {"ALL": "Full table scan", "index": "Full index scan"}
+# Operation nodes of EXPLAIN FORMAT=JSON (MySQL and MariaDB) and their labels
+OPERATIONS = {
+    "ordering_operation": "ORDER BY",
+    "grouping_operation": "GROUP BY",
+    "duplicates_removal": "DISTINCT",
+    "windowing": "WINDOW",
+    "filesort": "Filesort",
+    "temporary_table": "Temporary table",
+    "materialized_from_subquery": "Materialized subquery",
+    "union_result": "UNION",
+}
+RANGE_OPERATORS = {">", ">=", "<", "<="}
+# Functions whose comparisons become ranges once rewritten (see SargableRewriter)
+DATE_FUNCTIONS = {"YEAR", "MONTH", "DATE", "DATE_FORMAT"}
+COMPARISON_START = {"=", "IN", "IS", "BETWEEN", "LIKE"} | RANGE_OPERATORS
+# Columns an index suggestion may have; more rarely pays off
+MAX_INDEX_COLUMNS = 4
+
+ANALYZE_LINE_RE = re.compile(r"^(?P<indent>\s*)-> (?P<label>.*?)\s*(?:\(cost=|\(rows=|\(actual|\(never|$)")
+ANALYZE_ESTIMATE_RE = re.compile(r"\((?:cost=[^ ]+ )?rows=(?P<rows>[\d.e+]+)\)")
+ANALYZE_ACTUAL_RE = re.compile(r"\(actual time=[^ ]+ rows=(?P<rows>[\d.e+]+) loops=(?P<loops>\d+)\)")
+VERSION_RE = re.compile(r"(\d+)\.(\d+)\.(\d+)")
+
+
+def analyze_support(server_info):
+    """How the server measures actual rows: "explain_analyze" (MySQL 8.0.18+), "analyze" (MariaDB) or None."""
+    match = VERSION_RE.search(server_info or "")
+    if match is None:
+        return None
+    version = tuple(int(part) for part in match.groups())
+    if "mariadb" in server_info.lower():
+        return "analyze" if version >= (10, 1, 0) else None
+    return "explain_analyze" if version >= (8, 0, 18) else None
+
+
+def _node(label, rows=None, actual=None, notes="", children=None):
+    return {"label": label, "rows": rows, "actual": actual, "notes": notes, "children": children or []}
+
+
+def _table_node(table, problems):
+    name = table.get("table_name", "?")
+    access = table.get("access_type", "?")
+    key = table.get("key")
+    rows = table.get("rows_examined_per_scan", table.get("rows"))
+    actual = None
+    if "r_rows" in table:
+        actual = int(float(table["r_rows"] or 0) * float(table.get("r_loops") or 1))
+
+    label = f"{access} {name}" + (f" using {key}" if key else "")
+    notes = []
+    if access in FULL_SCANS:
+        problems.append(f"{FULL_SCANS[access]} on {name}" + (f" (~{int(rows):,} rows)" if rows else ""))
+        notes.append(FULL_SCANS[access])
+    if table.get("using_join_buffer"):
+        problems.append(f"Join buffer on {name}: no index for the join ({table['using_join_buffer']})")
+        notes.append("join buffer")
+    if table.get("attached_condition"):
+        notes.append(f"where {table['attached_condition']}")
+    return _node(label, rows, actual, "; ".join(notes), _plan_nodes(table, problems))
+
+
+def _plan_nodes(plan, problems):
+    """Tree nodes of an EXPLAIN FORMAT=JSON object; full scans, filesorts and temporary tables go to `problems`."""
+    nodes = []
+    for key, value in plan.items():
+        if key == "query_block":
+            cost = value.get("cost_info", {}).get("query_cost")
+            label = f"SELECT #{value.get('select_id', '?')}" + (f" (cost {cost})" if cost else "")
+            nodes.append(_node(label, children=_plan_nodes(value, problems)))
+        elif key == "table":
+            nodes.append(_table_node(value, problems))
+        elif key in OPERATIONS and isinstance(value, dict):
+            notes = []
+            if value.get("using_filesort") or key == "filesort":
+                problems.append(f"Filesort for {OPERATIONS[key]}")
+                notes.append("filesort")
+            if value.get("using_temporary_table") or key == "temporary_table":
+                problems.append(f"Temporary table for {OPERATIONS[key]}")
+                notes.append("temporary table")
+            nodes.append(_node(OPERATIONS[key], notes=", ".join(notes), children=_plan_nodes(value, problems)))
+        elif key == "nested_loop":
+            children = []
+            for item in value:
+                children.extend(_plan_nodes(item, problems))
+            nodes.append(_node("Nested loop", children=children))
+        elif isinstance(value, dict):
+            nodes.extend(_plan_nodes(value, problems))
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    nodes.extend(_plan_nodes(item, problems))
+    return nodes
+
+
+def plan_tables(plan):
+    """Every "table" object of an EXPLAIN FORMAT=JSON plan."""
+    tables = []
+    if isinstance(plan, dict):
+        for key, value in plan.items():
+            if key == "table":
+                tables.append(value)
+            tables.extend(plan_tables(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            tables.extend(plan_tables(item))
+    return tables
+
+
+def parse_explain_analyze(text):
+    """Tree nodes of MySQL's EXPLAIN ANALYZE output, with estimated and actual rows (rows x loops)."""
+    roots, stack = [], []
+    for line in text.splitlines():
+        match = ANALYZE_LINE_RE.match(line)
+        if match is None:
+            continue
+        estimate = ANALYZE_ESTIMATE_RE.search(line)
+        actual = ANALYZE_ACTUAL_RE.search(line)
+        node = _node(
+            match.group("label"),
+            rows=int(float(estimate.group("rows"))) if estimate else None,
+            actual=(
+                int(float(actual.group("rows")) * int(actual.group("loops")))
+                if actual
+                else 0 if "(never executed)" in line else None
+            ),
+        )
+        depth = len(match.group("indent"))
+        while stack and stack[-1][0] >= depth:
+            stack.pop()
+        (stack[-1][1]["children"] if stack else roots).append(node)
+        stack.append((depth, node))
+    return roots
+
+
+def _tokens(sql):
+    return [
+        token
+        for token in sqlparse.parse(sql)[0].flatten()
+        if not token.is_whitespace and token.ttype not in T.Comment
+    ]
+
+
+def _column_ref(tokens, i):
+    """(qualifier or None, column, index after) of a column reference at `i`, or None."""
+    if i >= len(tokens) or tokens[i].ttype not in T.Name:
+        return None
+    parts = [tokens[i].value.strip("`")]
+    i += 1
+    while i + 1 < len(tokens) and tokens[i].match(T.Punctuation, ".") and tokens[i + 1].ttype in T.Name:
+        parts.append(tokens[i + 1].value.strip("`"))
+        i += 2
+    if i < len(tokens) and tokens[i].match(T.Punctuation, "("):
+        return None  # a function call
+    return (parts[-2].lower() if len(parts) > 1 else None), parts[-1], i
+
+
+def _is_literal(token):
+    return token.ttype in T.Literal or (token.ttype in T.Keyword and token.normalized == "NULL")
+
+
+def predicate_columns(sql):
+    """Columns per table alias used by the predicates of `sql`.
+
+    Returns {alias: {"eq": [...], "range": [...], "join": [...], "order": [...]}}
+    for equality and IN filters, range filters (<, BETWEEN, LIKE 'abc%'),
+    join conditions and ORDER BY / GROUP BY. Unqualified columns count only
+    when the statement reads a single table.
+    """
+    aliases = table_aliases(sql)
+    single = next(iter(set(aliases.values())), None) if len(set(aliases.values())) == 1 else None
+    columns = {}
+
+    def add(qualifier, column, kind):
+        alias = qualifier or (single.lower() if single else None)
+        if alias is None or alias not in aliases:
+            return
+        entry = columns.setdefault(alias, {"eq": [], "range": [], "join": [], "order": []})
+        if column not in entry[kind]:
+            entry[kind].append(column)
+
+    tokens = _tokens(sql)
+    ordering = False
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        word = token.normalized.upper() if token.is_keyword else ""
+        if word in ("ORDER BY", "GROUP BY"):
+            ordering = True
+            i += 1
+            continue
+        if word in ("LIMIT", "HAVING", "WHERE", "ON", "UNION") or token.match(T.Punctuation, ")"):
+            ordering = False
+        if (
+            not ordering
+            and token.value.upper() in DATE_FUNCTIONS
+            and i + 1 < len(tokens)
+            and tokens[i + 1].match(T.Punctuation, "(")
+        ):
+            ref = _column_ref(tokens, i + 2)
+            if ref is not None:
+                add(ref[0], ref[1], "range")
+                i = ref[2]
+                continue
+        ref = _column_ref(tokens, i)
+        if ref is None:
+            i += 1
+            continue
+        qualifier, column, after = ref
+        if ordering:
+            add(qualifier, column, "order")
+            i = after
+            continue
+        if after >= len(tokens):
+            break
+        following = tokens[after]
+        operator = following.normalized.upper() if following.is_keyword else following.value
+        if after + 1 < len(tokens) and operator in COMPARISON_START:
+            other = _column_ref(tokens, after + 1)
+            if operator == "=" and other is not None:
+                add(qualifier, column, "join")
+                add(other[0], other[1], "join")
+                i = other[2]
+                continue
+            value = tokens[after + 1]
+            if operator == "=" and _is_literal(value):
+                add(qualifier, column, "eq")
+            elif operator == "IN" and value.match(T.Punctuation, "("):
+                add(qualifier, column, "eq")
+            elif operator == "IS" and value.normalized.upper() == "NULL":
+                add(qualifier, column, "eq")
+            elif operator in RANGE_OPERATORS or operator == "BETWEEN":
+                add(qualifier, column, "range")
+            elif operator == "LIKE" and value.ttype in T.Literal.String and not value.value[1:].startswith("%"):
+                add(qualifier, column, "range")
+        i = after
+    return columns
+
+
+def suggest_indexes(sql, plan, existing=None):
+    """Composite index candidates for tables the plan reads without a fitting index.
+
+    Columns go equality filters first, then one range column, then join
+    columns; with none of those, the ORDER BY / GROUP BY columns. A candidate
+    that is a leftmost prefix of an index in `existing` ({table: [[columns]]})
+    is dropped. Returns [{"table", "columns", "reason", "ddl"}, ...].
+    """
+    aliases = table_aliases(sql)
+    predicates = predicate_columns(sql)
+    existing = existing or {}
+    suggestions, seen = [], set()
+    for table in plan_tables(plan):
+        access = table.get("access_type")
+        if access not in FULL_SCANS and not table.get("using_join_buffer"):
+            continue
+        alias = str(table.get("table_name", "")).strip("`").lower()
+        name = aliases.get(alias)
+        entry = predicates.get(alias)
+        if name is None or entry is None:
+            continue
+        columns = list(entry["eq"])
+        columns += [column for column in entry["range"][:1] if column not in columns]
+        columns += [column for column in entry["join"] if column not in columns]
+        if not columns:
+            columns = list(entry["order"])
+        columns = columns[:MAX_INDEX_COLUMNS]
+        lowered = [column.lower() for column in columns]
+        if not columns or (name.lower(), tuple(lowered)) in seen:
+            continue
+        if any(
+            [column.lower() for column in index[: len(columns)]] == lowered
+            for index in existing.get(name, [])
+        ):
+            continue
+        seen.add((name.lower(), tuple(lowered)))
+        reason = FULL_SCANS.get(access) or "Join buffer"
+        suggestions.append(
+            {
+                "table": name,
+                "columns": columns,
+                "reason": f"{reason} on {alias}",
+                "ddl": (
+                    f"CREATE INDEX idx_{name}_{'_'.join(lowered)} ON `{name}` "
+                    f"({', '.join(f'`{column}`' for column in columns)})"
+                ),
+            }
+        )
+    return suggestions
+
+
+def existing_indexes(cursor, tables):
+    """{table: [[column, ...] per index]} from SHOW INDEX; tables that cannot be read are skipped."""
+    indexes = {}
+    for table in tables:
+        try:
+            cursor.execute(f"SHOW INDEX FROM `{table}`")
+        except pymysql.MySQLError:
+            continue
+        by_name = {}
+        for row in cursor.fetchall():
+            by_name.setdefault(row["Key_name"], []).append((row["Seq_in_index"], row["Column_name"]))
+        indexes[table] = [[column for _, column in sorted(parts)] for parts in by_name.values()]
+    return indexes
+
+
+class PlanAnalyzer(QThread):
+    """Background EXPLAIN FORMAT=JSON of a query, optionally with actual rows.
+
+    With `analyze` set the query really runs (EXPLAIN ANALYZE on MySQL 8.0.18+,
+    ANALYZE FORMAT=JSON on MariaDB), so it is only allowed for plain reads.
+    Emits {"tree", "problems", "suggestions", "analyzed", "analyze_mode", "server"}.
+    """
+
+    finished = pyqtSignal(dict)
+    error = pyqtSignal(str)
+    progress = pyqtSignal(str)
+
+    def __init__(self, sql, db_config, analyze=False):
+        super().__init__()
+        self.sql = sql.strip().rstrip(";")
+        self.db_config = db_config
+        self.analyze = analyze
+
+    def run(self):
+        try:
+            statement = classify(self.sql)
+            if (
+                statement.multi
+                or statement.first_words[:1] not in (("SELECT",), ("WITH",))
+                or statement.kind != "read"
+                or statement.reason == "INTO"
+            ):
+                self.error.emit("วิเคราะห์แผนการทำงานได้เฉพาะคำสั่ง SELECT ทีละคำสั่ง")
+                return
+            self.progress.emit("กำลังวิเคราะห์แผนการทำงาน (EXPLAIN)...")
+            with routed_connection(self.db_config, read_only=True) as (connection, _):
+                server = connection.get_server_info()
+                mode = analyze_support(server) if not statement.locking else None
+                with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+                    cursor.execute(f"EXPLAIN FORMAT=JSON {self.sql}")
+                    plan = json.loads(next(iter(cursor.fetchone().values())))
+                    problems = []
+                    tree = _plan_nodes(plan, problems)
+                    problems.extend(
+                        f"{' '.join(rewrite.before.split())}: can be rewritten ({rewrite.rule}) "
+                        "to use an index (Query > Optimize Query...)"
+                        for rewrite in rewrite_sargable(self.sql)[1]
+                    )
+
+                    analyzed = False
+                    if self.analyze and mode:
+                        self.progress.emit("กำลังรันคำสั่งเพื่อวัดจำนวนแถวจริง (ANALYZE)...")
+                        if mode == "analyze":
+                            cursor.execute(f"ANALYZE FORMAT=JSON {self.sql}")
+                            tree = _plan_nodes(json.loads(next(iter(cursor.fetchone().values()))), [])
+                        else:
+                            cursor.execute(f"EXPLAIN ANALYZE {self.sql}")
+                            tree = parse_explain_analyze(next(iter(cursor.fetchone().values())))
+                        analyzed = True
+
+                    suggestions = suggest_indexes(self.sql, plan)
+                    existing = existing_indexes(cursor, {item["table"] for item in suggestions})
+                    suggestions = suggest_indexes(self.sql, plan, existing)
+
+            self.progress.emit(f"วิเคราะห์เสร็จ พบปัญหา {len(problems)} จุด")
+            self.finished.emit(
+                {
+                    "tree": tree,
+                    "problems": problems,
+                    "suggestions": suggestions,
+                    "analyzed": analyzed,
+                    "analyze_mode": mode,
+                    "server": server,
+                }
+            )
+        except pymysql.MySQLError as e:
+            self.error.emit(f"EXPLAIN ไม่สำเร็จ: {str(e)}")
+        except Exception as e:
+            self.error.emit(f"เกิดข้อผิดพลาด: {str(e)}")
@@ -0,0 +1,93 @@
+import json
+import math
+import os
+import threading
+
+from AppData import app_data_path
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of `values` (pct in 0-100); 0.0 when empty."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class RaceStats:
+    """Per-model win counts and latencies of racing mode, persisted as JSON.
+
+    A model still running when a race ends is cancelled; the time it had
+    taken so far is kept as a censored sample (its real latency is at least
+    that long), so the percentiles do not only count races it finished.
+    """
+
+    max_samples = 500
+
+    def __init__(self, path=None):
+        self.path = path or app_data_path("race_stats.json")
+        self._lock = threading.Lock()
+        self.models = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                self.models = json.load(file)
+        except (OSError, ValueError):
+            self.models = {}
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self.models, file, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def _entry(self, model):
+        return self.models.setdefault(model, {"races": 0, "wins": 0, "latencies": []})
+
+    def record_latency(self, model, seconds):
+        """Record how long `model` took to return an answer."""
+        with self._lock:
+            latencies = self._entry(model)["latencies"]
+            latencies.append(round(seconds, 3))
+            del latencies[: -self.max_samples]
+
+    def record_censored(self, model, seconds):
+        """Record that `model` had not answered after `seconds` when it was cancelled."""
+        with self._lock:
+            censored = self._entry(model).setdefault("censored", [])
+            censored.append(round(seconds, 3))
+            del censored[: -self.max_samples]
+
+    def record_race(self, models, winner):
+        """Record one race between `models`; `winner` may be None."""
+        with self._lock:
+            for model in models:
+                entry = self._entry(model)
+                entry["races"] += 1
+                if model == winner:
+                    entry["wins"] += 1
+            self.save()
+
+    def summary(self):
+        """Rows of (model, races, win rate, p50 seconds, p95 seconds).
+
+        Censored samples count at the time they were cut off, so for a model
+        that is often cancelled the percentiles are lower bounds.
+        """
+        with self._lock:
+            rows = []
+            for model, entry in sorted(self.models.items()):
+                samples = entry["latencies"] + entry.get("censored", [])
+                rows.append(
+                    (
+                        model,
+                        entry["races"],
+                        entry["wins"] / entry["races"] if entry["races"] else 0.0,
+                        percentile(samples, 50),
+                        percentile(samples, 95),
+                    )
+                )
+            return rows
@@ -0,0 +1,226 @@
+import json
+import math
+import re
+from collections import deque
+from dataclasses import dataclass, field
+
+from AppData import app_data_path
+
+
+SECTION_RE = re.compile(r"^\s*(\d+)\.(.*)$")
+JOIN_RE = re.compile(r"^\s*-\s*(\w+)\s*<->\s*(\w+)\s+via\b", re.I)
+KEYWORD_SPLIT_RE = re.compile(r"[,()\s/]+")
+
+
+def estimate_tokens(text):
+    """Rough token count: ~4 ASCII chars or ~2 Thai chars per token."""
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 2)
+
+
+def load_schema_catalog(path=None):
+    """Load {table: [[column, type], ...]} saved by the schema catalog loader, if any."""
+    try:
+        with open(path or app_data_path("schema_catalog.json"), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+@dataclass
+class PromptLine:
+    section: int
+    text: str
+    tables: set = field(default_factory=set)
+    keywords: list = field(default_factory=list)
+    join: tuple = None
+
+
+class PromptBuilder:
+    """Split sys_prompt.txt into a stable prefix and question-specific context.
+
+    Lines that mention no table (capabilities, general SQL rules, security and
+    output format) and the whole join graph form the stable prefix, which is
+    byte-identical on every request so provider-side prompt caching can reuse
+    it. The join graph stays there because keyword matching can miss tables a
+    question needs (หมู่บ้าน names no synonym of village). Synonym
+    definitions, table-specific rules, schema definitions and similar saved
+    queries are picked per question by matching it against the Thai synonym
+    map, then added in priority order until the token budget is used.
+    """
+
+    def __init__(self, text, catalog=None):
+        self.catalog = catalog or {}
+        self.headers = {}
+        self.lines = []
+        self._parse(text)
+
+    def _parse(self, text):
+        section = 0
+        raw_lines = []
+        for line in text.splitlines():
+            match = SECTION_RE.match(line)
+            if match:
+                section = int(match.group(1))
+                self.headers[section] = line.strip()
+            elif line.strip():
+                raw_lines.append((section, line.rstrip()))
+
+        # Tables are the right-hand side of definitions, join ends and catalog entries
+        self.tables = set(self.catalog)
+        for _, line in raw_lines:
+            join = JOIN_RE.match(line)
+            if join:
+                self.tables.update(name.lower() for name in join.groups())
+            elif "=" in line:
+                rhs = line.split("=", 1)[1]
+                name = re.match(r"\s*(\w+)", rhs)
+                if name and re.match(r"^[a-z_][a-z0-9_]*$", name.group(1)):
+                    self.tables.add(name.group(1).lower())
+        self.tables.discard("in")
+
+        self._table_re = re.compile(
+            r"\b(" + "|".join(sorted(map(re.escape, self.tables), key=len, reverse=True)) + r")\b",
+            re.I,
+        ) if self.tables else None
+
+        for section, line in raw_lines:
+            tables = {t.lower() for t in self._table_re.findall(line)} if self._table_re else set()
+            join = JOIN_RE.match(line)
+            keywords = []
+            if not join and "=" in line:
+                lhs = line.lstrip(" -").split("=", 1)[0]
+                keywords = [k for k in KEYWORD_SPLIT_RE.split(lhs) if len(k) >= 2]
+            self.lines.append(
+                PromptLine(
+                    section=section,
+                    text=line,
+                    tables=tables,
+                    keywords=keywords,
+                    join=tuple(name.lower() for name in join.groups()) if join else None,
+                )
+            )
+
+    @property
+    def stable_prefix(self):
+        """Every line that does not depend on which tables the question needs, plus the join graph."""
+        return self._render(
+            [line for line in self.lines if line.join or (not line.tables and not line.keywords)]
+        )
+
+    def _render(self, lines):
+        parts = []
+        current = None
+        for line in sorted(lines, key=lambda l: (l.section, self.lines.index(l))):
+            if line.section != current:
+                current = line.section
+                if parts:
+                    parts.append("")
+                if current in self.headers:
+                    parts.append(self.headers[current])
+            parts.append(line.text)
+        return "\n".join(parts)
+
+    def _join_path(self, tables):
+        """Tables and join lines that connect `tables` through the join graph."""
+        graph = {}
+        for line in self.lines:
+            if line.join:
+                a, b = line.join
+                graph.setdefault(a, []).append((b, line))
+                graph.setdefault(b, []).append((a, line))
+
+        ordered = sorted(tables)
+        needed_tables, needed_joins = set(tables), []
+        for index, start in enumerate(ordered):
+            for goal in ordered[index + 1 :]:
+                previous = {start: None}
+                queue = deque([start])
+                while queue and goal not in previous:
+                    node = queue.popleft()
+                    for neighbour, line in graph.get(node, []):
+                        if neighbour not in previous:
+                            previous[neighbour] = (node, line)
+                            queue.append(neighbour)
+                node = goal
+                while previous.get(node):
+                    node, line = previous[node]
+                    needed_tables.add(node)
+                    if line not in needed_joins:
+                        needed_joins.append(line)
+        return needed_tables, needed_joins
+
+    def _schema_lines(self, tables):
+        lines = []
+        for table in sorted(tables):
+            columns = self.catalog.get(table)
+            if columns:
+                text = f"- {table}(" + ", ".join(f"{name} {kind}" for name, kind in columns) + ")"
+                lines.append(PromptLine(section=99, text=text, tables={table}))
+        return lines
+
+    def relevant_tables(self, question):
+        question_lower = question.lower()
+        tables = set()
+        for line in self.lines:
+            if line.keywords and any(k.lower() in question_lower for k in line.keywords):
+                tables.update(line.tables)
+        if self._table_re:
+            tables.update(t.lower() for t in self._table_re.findall(question))
+        return tables
+
+    def build(self, question, token_budget=1500, examples=(), examples_header=""):
+        """Question-specific context (definitions, rules, schema, examples) under the budget.
+
+        `examples` are few-shot blocks, best first; each is included whole or
+        not at all, after the schema. Join lines are in the stable prefix
+        already and are not repeated.
+        """
+        question_lower = question.lower()
+        matched = [
+            line
+            for line in self.lines
+            if line.keywords and any(k.lower() in question_lower for k in line.keywords)
+        ]
+        tables = self.relevant_tables(question)
+        example_lines = [PromptLine(section=100, text=example) for example in examples]
+
+        if tables:
+            tables, _ = self._join_path(tables)
+            rules = [
+                line
+                for line in self.lines
+                if line.tables & tables and not line.keywords and not line.join
+            ]
+            other_definitions = [
+                line for line in self.lines if line.keywords and line.tables & tables
+            ]
+            tiers = [matched, rules, self._schema_lines(tables), example_lines, other_definitions]
+        else:
+            # Nothing recognised: offer the synonym map itself so the agent can still map terms
+            tiers = [matched, example_lines, [line for line in self.lines if line.keywords]]
+
+        chosen, used = [], 0
+        for tier in tiers:
+            for line in tier:
+                if line in chosen:
+                    continue
+                cost = estimate_tokens(line.text)
+                if line.section == 100 and not any(other.section == 100 for other in chosen):
+                    cost += estimate_tokens(examples_header)  # the header comes with the first
+                if used + cost > token_budget:
+                    continue
+                chosen.append(line)
+                used += cost
+
+        if not chosen:
+            return ""
+        known = [line for line in chosen if line in self.lines]
+        schema = [line for line in chosen if line.section == 99 and line not in self.lines]
+        shots = [line.text for line in example_lines if line in chosen]
+        text = self._render(known)
+        if schema:
+            text += "\n\nโครงสร้างตารางที่เกี่ยวข้อง:\n" + "\n".join(line.text for line in schema)
+        if shots:
+            text += "\n\n" + "\n\n".join(([examples_header] if examples_header else []) + shots)
+        return text.strip()
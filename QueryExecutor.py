@@ -1,75 +1,247 @@
-from PyQt6.QtCore import QThread, pyqtSignal
+import csv
+import time
+
 import pymysql
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from ConnectionPool import note_write, profile_key, routed_connection
+from QueryHistory import estimate_bytes, query_history
+from QueryProfile import ms_since
+from SQLValidator import estimate_rows
+from StatementClassifier import classify
+
+
+# Rows fetched per round trip when streaming or exporting
+STREAM_CHUNK = 5000
 
 
 class QueryExecutor(QThread):
-    """Background thread for executing SQL queries."""
+    """Background thread for executing SQL queries.
+
+    `mode` decides how a SELECT is fetched:
+      "guard"   - EXPLAIN first; above `max_rows` estimated rows emit
+                  `large_result` instead of running it (the default)
+      "all"     - fetch everything without a check
+      "preview" - only the first `preview_rows` rows
+      "stream"  - fetch everything in chunks on an unbuffered cursor
+      "export"  - stream straight into the CSV file `export_path`
+    """
 
     finished = pyqtSignal(list, list)  # results, columns
     error = pyqtSignal(str)
     progress = pyqtSignal(str)
+    large_result = pyqtSignal(int)  # estimated rows; the query was not run
 
-    def __init__(self, sql_command, db_config):
+    def __init__(
+        self,
+        sql_command,
+        db_config,
+        mode="guard",
+        max_rows=100_000,
+        preview_rows=1000,
+        export_path=None,
+        source="editor",
+    ):
         super().__init__()
         self.sql_command = sql_command
         self.db_config = db_config
+        self.statement = classify(sql_command)
+        self.role = None  # "primary" or "replica" once connected
+        self.mode = mode
+        self.max_rows = max_rows
+        self.preview_rows = preview_rows
+        self.export_path = export_path
+        self.estimated_rows = None
+        self.source = source  # "editor", "agent" or "script", for the query history
+        self.timings = {}  # connect/execute/fetch/total ms of the last run
+        self.result_bytes = None
+        self._cancelled = False
+
+    def cancel(self):
+        """Stop a streaming fetch or export after the current chunk."""
+        self._cancelled = True
 
-        self.effect_keywords = [
-            "INSERT",
-            "UPDATE",
-            "DELETE",
-            "ALTER",
-            "CREATE",
-            "DROP",
-            "TRUNCATE",
-        ]
+    def _is_guarded_select(self):
+        statement = self.statement
+        return (
+            statement.is_read
+            and not statement.multi
+            and not statement.locking
+            and statement.first_words[0] in ("SELECT", "WITH")
+            and (statement.limit is None or statement.limit > self.max_rows)
+        )
 
     def run(self):
         """Execute the SQL query in background."""
+        started = time.perf_counter()
+        self.timings = {}
+        rows = error = None
         try:
             self.progress.emit("กำลังเชื่อมต่อฐานข้อมูล...")
 
-            # Connect to database
-            connection = pymysql.connect(
-                host=self.db_config["host"],
-                port=self.db_config["port"],
-                user=self.db_config["user"],
-                password=self.db_config["password"],
-                database=self.db_config["database"],
-                charset="utf8mb4",
-            )
-
-            self.progress.emit("กำลังดำเนินการ...")
-            # check sql_command in effect_keywords
-            # do execute and commit only
-            if any(
-                keyword in self.sql_command.upper() for keyword in self.effect_keywords
-            ):
-                with connection.cursor() as cursor:
-                    cursor.execute(self.sql_command)
-                    connection.commit()
-                    #หาจำนวน effect rows
-                    effect_rows = cursor.rowcount
-                self.progress.emit(f"ปรับปรุงฐานข้อมูลสำเร็จ")
-                self.finished.emit([effect_rows], ["effect"])
-                return
-
-            with connection.cursor() as cursor:
-                cursor.execute(self.sql_command)
-                results = cursor.fetchall()
-                columns = (
-                    [desc[0] for desc in cursor.description]
-                    if cursor.description
-                    else []
+            # Borrow a pooled connection: plain reads from the replica, the rest from the primary
+            with routed_connection(
+                self.db_config, read_only=not self.statement.needs_primary
+            ) as (connection, role):
+                self.timings["connect_ms"] = ms_since(started)
+                self.role = role
+                self.progress.emit(
+                    "กำลังดำเนินการ (replica)..." if role == "replica" else "กำลังดำเนินการ..."
                 )
+                # Writes execute and commit only; reads never pay for a commit
+                if self.statement.is_write:
+                    with connection.cursor() as cursor:
+                        phase = time.perf_counter()
+                        cursor.execute(self.sql_command)
+                        # CALL may return result sets: keep the first, drain the rest before committing
+                        results = list(cursor.fetchall()) if cursor.description else None
+                        columns = [desc[0] for desc in cursor.description] if cursor.description else []
+                        while cursor.nextset():
+                            pass
+                        connection.commit()
+                        self.timings["execute_ms"] = ms_since(phase)
+                        note_write(self.db_config)
+                        #หาจำนวน effect rows
+                        effect_rows = rows = cursor.rowcount
+                    if results is not None:
+                        rows = len(results)
+                        self.result_bytes = estimate_bytes(results)
+                        self.progress.emit("ดึงข้อมูลสำเร็จ")
+                        self.finished.emit(results, columns)
+                    else:
+                        self.progress.emit(f"ปรับปรุงฐานข้อมูลสำเร็จ")
+                        self.finished.emit([effect_rows], ["effect"])
+                    return
 
-            connection.close()
+                if self.mode == "guard" and self._is_guarded_select():
+                    self.estimated_rows = estimate_rows(
+                        connection, self.statement, profile_key(self.db_config)
+                    )
+                    if self.estimated_rows > self.max_rows:
+                        self.progress.emit(
+                            f"คาดว่าจะได้ผลลัพธ์ประมาณ {self.estimated_rows:,} แถว"
+                        )
+                        self.timings = None  # nothing ran; not worth a history entry
+                        self.large_result.emit(self.estimated_rows)
+                        return
+
+                if self.mode in ("stream", "export") or (
+                    self.mode == "preview" and self.statement.limit is not None
+                ):
+                    results, columns = self._fetch_unbuffered(connection)
+                    if self._cancelled:
+                        error = "cancelled"
+                        self.error.emit("ยกเลิกการดึงข้อมูลแล้ว")
+                        return
+                    if self.mode == "export":
+                        rows = results[0][0]
+                        self.progress.emit(f"ส่งออกข้อมูล {rows:,} แถวสำเร็จ")
+                        self.finished.emit(results, columns)
+                        return
+                else:
+                    sql = self.sql_command
+                    if self.mode == "preview":
+                        # On its own line so a trailing -- comment cannot swallow it
+                        sql = f"{sql.rstrip().rstrip(';')}\nLIMIT {int(self.preview_rows)}"
+                    # Unbuffered, so the server's execute time and the transfer are timed apart
+                    with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+                        phase = time.perf_counter()
+                        cursor.execute(sql)
+                        self.timings["execute_ms"] = ms_since(phase)
+                        phase = time.perf_counter()
+                        results = cursor.fetchall()
+                        self.timings["fetch_ms"] = ms_since(phase)
+                        columns = (
+                            [desc[0] for desc in cursor.description]
+                            if cursor.description
+                            else []
+                        )
+                    self.result_bytes = estimate_bytes(results)
 
+            rows = len(results)
             if results:
                 self.progress.emit("ดึงข้อมูลสำเร็จ")
-                self.finished.emit(results, columns)
+                self.finished.emit(list(results), columns)
             else:
                 self.finished.emit([], [])
 
         except Exception as e:
+            error = str(e)
             self.error.emit(f"เกิดข้อผิดพลาด: {str(e)}")
+        finally:
+            if self.timings is not None:
+                self.timings["total_ms"] = ms_since(started)
+                self._record_history(rows, error)
+
+    def _record_history(self, rows, error):
+        """Queue this run for the local query history; never fails the query."""
+        try:
+            query_history.record(
+                {
+                    "profile": self.db_config.get("profile") or profile_key(self.db_config),
+                    "source": self.source,
+                    "role": self.role,
+                    "mode": self.mode,
+                    "digest": self.statement.digest,
+                    "fingerprint": self.statement.fingerprint,
+                    "sql": self.sql_command,
+                    "rows": rows,
+                    "bytes": self.result_bytes,
+                    "connect_ms": self.timings.get("connect_ms"),
+                    "execute_ms": self.timings.get("execute_ms"),
+                    "fetch_ms": self.timings.get("fetch_ms"),
+                    "total_ms": self.timings["total_ms"],
+                    "error": error,
+                }
+            )
+        except Exception as e:
+            print(f"บันทึกประวัติคิวรีไม่สำเร็จ: {e}")
+
+    def _fetch_unbuffered(self, connection):
+        """Fetch chunk by chunk on an SSCursor; in export mode write rows to CSV instead.
+
+        A preview or cancelled fetch leaves rows unread, so the connection is
+        closed rather than drained and the pool replaces it.
+        """
+        results, count = [], 0
+        limit = self.preview_rows if self.mode == "preview" else None
+        writer = file = None
+        cursor = connection.cursor(pymysql.cursors.SSCursor)
+        size_bytes = 0
+        try:
+            phase = time.perf_counter()
+            cursor.execute(self.sql_command)
+            self.timings["execute_ms"] = ms_since(phase)
+            phase = time.perf_counter()
+            columns = [desc[0] for desc in cursor.description] if cursor.description else []
+            if self.mode == "export":
+                # utf-8-sig so Excel opens Thai text correctly
+                file = open(self.export_path, "w", newline="", encoding="utf-8-sig")
+                writer = csv.writer(file)
+                writer.writerow(columns)
+            while not self._cancelled:
+                size = STREAM_CHUNK if limit is None else min(STREAM_CHUNK, limit - count)
+                rows = cursor.fetchmany(size) if size > 0 else []
+                if not rows:
+                    break
+                count += len(rows)
+                size_bytes += estimate_bytes(rows)
+                if writer is not None:
+                    writer.writerows(rows)
+                    self.progress.emit(f"กำลังส่งออกข้อมูล {count:,} แถว...")
+                else:
+                    results.extend(rows)
+                    self.progress.emit(f"กำลังดึงข้อมูล {count:,} แถว...")
+            unread = self._cancelled or (limit is not None and count >= limit)
+            self.timings["fetch_ms"] = ms_since(phase)
+            self.result_bytes = size_bytes
+        finally:
+            if file is not None:
+                file.close()
+        if unread:
+            connection.close()
+        else:
+            cursor.close()
+        if self.mode == "export":
+            return [[count, self.export_path]], ["exported rows", "file"]
+        return results, columns
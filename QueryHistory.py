@@ -0,0 +1,220 @@
+import queue
+import sqlite3
+import threading
+import time
+
+from AppData import app_data_path
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS executions (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    profile TEXT,
+    source TEXT,
+    role TEXT,
+    mode TEXT,
+    digest TEXT,
+    fingerprint TEXT,
+    sql TEXT,
+    rows INTEGER,
+    bytes INTEGER,
+    connect_ms REAL,
+    execute_ms REAL,
+    fetch_ms REAL,
+    total_ms REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS executions_digest ON executions (digest, total_ms);
+CREATE INDEX IF NOT EXISTS executions_ts ON executions (ts);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS executions_fts USING fts5 (
+    sql, content='executions', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS executions_ai AFTER INSERT ON executions BEGIN
+    INSERT INTO executions_fts (rowid, sql) VALUES (new.id, new.sql);
+END;
+CREATE TRIGGER IF NOT EXISTS executions_ad AFTER DELETE ON executions BEGIN
+    INSERT INTO executions_fts (executions_fts, rowid, sql) VALUES ('delete', old.id, old.sql);
+END;
+
+-- Successful runs per fingerprint, slowest total first; p95 is the nearest-rank percentile
+CREATE VIEW IF NOT EXISTS fingerprint_stats AS
+WITH ranked AS (
+    SELECT digest, fingerprint, profile, rows, total_ms, ts,
+           ROW_NUMBER() OVER (PARTITION BY digest ORDER BY total_ms) AS position,
+           COUNT(*) OVER (PARTITION BY digest) AS runs
+    FROM executions
+    WHERE error IS NULL
+)
+SELECT digest,
+       MAX(fingerprint) AS fingerprint,
+       GROUP_CONCAT(DISTINCT profile) AS profiles,
+       MAX(runs) AS runs,
+       ROUND(SUM(total_ms), 1) AS total_ms,
+       ROUND(AVG(total_ms), 1) AS avg_ms,
+       MAX(CASE WHEN position = (95 * runs + 99) / 100 THEN total_ms END) AS p95_ms,
+       MAX(total_ms) AS max_ms,
+       ROUND(AVG(rows)) AS avg_rows,
+       MAX(ts) AS last_run
+FROM ranked
+GROUP BY digest
+ORDER BY total_ms DESC;
+"""
+
+COLUMNS = (
+    "ts", "profile", "source", "role", "mode", "digest", "fingerprint", "sql",
+    "rows", "bytes", "connect_ms", "execute_ms", "fetch_ms", "total_ms", "error",
+)
+INSERT_SQL = f"INSERT INTO executions ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+
+def estimate_bytes(rows, sample_size=200):
+    """Approximate size of result rows as text, from up to `sample_size` evenly spaced rows."""
+    if not rows:
+        return 0
+    step = max(1, len(rows) // sample_size)
+    sample = rows[::step][:sample_size]
+    sampled = sum(
+        len(value) if isinstance(value, (bytes, bytearray)) else len(str(value).encode("utf-8"))
+        for row in sample
+        for value in row
+        if value is not None
+    )
+    return int(sampled / len(sample) * len(rows))
+
+
+class QueryHistory:
+    """Local SQLite log of every query run, written in batches on a background thread.
+
+    `record` only puts the entry on a queue, so callers (the query threads)
+    never wait for the disk. The writer commits whatever has queued up, at
+    most every `flush_interval` seconds, and keeps the newest `max_rows`.
+    """
+
+    def __init__(self, path=None, flush_interval=1.0, batch_size=500, max_rows=200_000):
+        self._path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_rows = max_rows
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._writer = None
+        self._since_prune = 0
+
+    @property
+    def path(self):
+        if self._path is None:
+            self._path = app_data_path("history", "query_history.sqlite3")
+        return self._path
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=10)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+        return connection
+
+    def record(self, entry):
+        """Queue one execution ({column: value} with the keys of COLUMNS) for writing."""
+        entry.setdefault("ts", time.time())
+        self._queue.put(tuple(entry.get(column) for column in COLUMNS))
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name="QueryHistory", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        try:
+            connection = self._connect()
+        except sqlite3.Error as e:
+            # Keep draining the queue so flush() never waits on a dead writer
+            print(f"เปิดไฟล์ประวัติคิวรีไม่สำเร็จ: {e}")
+            connection = None
+        try:
+            while True:
+                batch = [self._queue.get()]
+                deadline = time.monotonic() + self.flush_interval
+                while batch[-1] is not None and len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                    except queue.Empty:
+                        break
+                stop = batch[-1] is None
+                rows = [row for row in batch if row is not None]
+                if rows and connection is not None:
+                    try:
+                        with connection:
+                            connection.executemany(INSERT_SQL, rows)
+                        self._prune(connection, len(rows))
+                    except sqlite3.Error as e:
+                        print(f"บันทึกประวัติคิวรีไม่สำเร็จ: {e}")
+                for _ in batch:
+                    self._queue.task_done()
+                if stop:
+                    return
+        finally:
+            if connection is not None:
+                connection.close()
+
+    def _prune(self, connection, added):
+        self._since_prune += added
+        if self._since_prune < 1000:
+            return
+        self._since_prune = 0
+        with connection:
+            connection.execute(
+                "DELETE FROM executions WHERE id <= (SELECT MAX(id) FROM executions) - ?",
+                (self.max_rows,),
+            )
+
+    def flush(self):
+        """Wait until everything recorded so far is on disk."""
+        self._queue.join()
+
+    def close(self):
+        """Write what is queued and stop the writer thread."""
+        with self._lock:
+            writer = self._writer
+            self._writer = None
+        if writer is not None and writer.is_alive():
+            self._queue.put(None)
+            writer.join()
+
+    def search(self, text, limit=200):
+        """Newest executions whose SQL matches the full-text query `text` (all of them when empty)."""
+        connection = self._connect()
+        try:
+            if text.strip():
+                # Each word is matched as a prefix; quoting keeps FTS syntax out of user input
+                terms = " ".join('"' + word.replace('"', '""') + '"*' for word in text.split())
+                cursor = connection.execute(
+                    "SELECT e.ts, e.profile, e.source, e.rows, e.total_ms, e.error, e.sql "
+                    "FROM executions_fts f JOIN executions e ON e.id = f.rowid "
+                    "WHERE executions_fts MATCH ? ORDER BY e.id DESC LIMIT ?",
+                    (terms, limit),
+                )
+            else:
+                cursor = connection.execute(
+                    "SELECT ts, profile, source, rows, total_ms, error, sql "
+                    "FROM executions ORDER BY id DESC LIMIT ?",
+                    (limit,),
+                )
+            return cursor.fetchall()
+        finally:
+            connection.close()
+
+    def ranking(self, limit=100):
+        """Rows of the fingerprint_stats view: slowest fingerprints by total time first."""
+        connection = self._connect()
+        try:
+            cursor = connection.execute(
+                "SELECT fingerprint, profiles, runs, total_ms, avg_ms, p95_ms, max_ms, avg_rows, last_run "
+                "FROM fingerprint_stats LIMIT ?",
+                (limit,),
+            )
+            return cursor.fetchall()
+        finally:
+            connection.close()
+
+
+query_history = QueryHistory()
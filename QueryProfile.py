@@ -0,0 +1,90 @@
+import json
+import time
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from AppData import app_data_path
+
+
+# Phases of one query run, in order, with their short and long labels
+PHASES = (
+    ("connect_ms", "conn", "Connect (pool checkout)"),
+    ("execute_ms", "exec", "Server execute"),
+    ("fetch_ms", "fetch", "Fetch rows"),
+    ("dataframe_ms", "df", "Build DataFrame"),
+    ("model_ms", "model", "Model reset"),
+    ("autosize_ms", "fit", "Column auto-size"),
+)
+
+
+def ms_since(started):
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:,.0f} {unit}" if unit == "B" else f"{size:,.1f} {unit}"
+        size /= 1024
+
+
+def format_profile(profile):
+    """One-line status bar readout, e.g. "1,234 rows · conn 2 · exec 120 · ... ms · 12.3 MB"."""
+    parts = [f"{profile.get('rows') or 0:,} rows"]
+    parts += [
+        f"{short} {profile[key]:,.0f}"
+        for key, short, _ in PHASES
+        if profile.get(key) is not None
+    ]
+    text = " · ".join(parts) + " ms"
+    if profile.get("memory_bytes") is not None:
+        text += f" · {format_bytes(profile['memory_bytes'])}"
+    return text
+
+
+def profile_details(profile):
+    """Multi-line breakdown of a profile for the details popup."""
+    total = profile.get("total_ms") or 0
+    lines = [
+        f"Rows: {profile.get('rows') or 0:,} x {profile.get('columns') or 0} columns"
+        f" ({profile.get('mode')}, {profile.get('role') or '-'})",
+    ]
+    for key, _, label in PHASES:
+        value = profile.get(key)
+        if value is None:
+            continue
+        share = f" {value / total * 100:5.1f}%" if total else ""
+        lines.append(f"  {label:<26}{value:>12,.2f} ms{share}")
+    lines.append(f"  {'Total (queued to shown)':<26}{total:>12,.2f} ms")
+    if profile.get("memory_bytes") is not None:
+        lines.append(f"DataFrame memory (deep): {format_bytes(profile['memory_bytes'])}")
+    else:
+        lines.append("DataFrame memory (deep): measuring...")
+    return "\n".join(lines)
+
+
+def dump_profile(profile):
+    """Append `profile` as one JSON line to appdata/profiles/query_profiles.jsonl."""
+    line = json.dumps(profile, ensure_ascii=False, default=str)
+    with open(app_data_path("profiles", "query_profiles.jsonl"), "a", encoding="utf-8") as file:
+        file.write(line + "\n")
+
+
+class MemoryProbe(QThread):
+    """Background `memory_usage(deep=True)` of a DataFrame; deep sizing walks every object value."""
+
+    finished = pyqtSignal(dict)  # {"memory_bytes": int, "memory_ms": float}
+    error = pyqtSignal(str)
+    progress = pyqtSignal(str)
+
+    def __init__(self, dataframe):
+        super().__init__()
+        self.dataframe = dataframe
+
+    def run(self):
+        try:
+            started = time.perf_counter()
+            size = int(self.dataframe.memory_usage(deep=True).sum())
+            self.finished.emit({"memory_bytes": size, "memory_ms": ms_since(started)})
+        except Exception as e:
+            self.error.emit(f"วัดขนาดหน่วยความจำไม่สำเร็จ: {str(e)}")
@@ -0,0 +1,64 @@
+from collections import deque
+
+from PyQt6.QtCore import QObject, QThread
+
+
+class QueryScheduler(QObject):
+    """Start query executors in order while bounding how many run at once.
+
+    At most `max_total` executors run overall and `per_profile` per database
+    profile (or that profile's own limit from `set_limit`), so concurrent tabs
+    never wait on an exhausted connection pool.
+    Executors are QThreads; a slot is released when the thread itself ends,
+    so callers may disconnect the executor's own signals at any time.
+    """
+
+    def __init__(self, max_total=6, per_profile=3, parent=None):
+        super().__init__(parent)
+        self.max_total = max_total
+        self.per_profile = per_profile
+        self.limits = {}  # profile -> max running
+        self._queue = deque()  # (executor, profile)
+        self._running = {}  # executor -> profile
+
+    def set_limit(self, profile, limit):
+        self.limits[profile] = max(1, int(limit))
+        self._start_ready()
+
+    def limit(self, profile):
+        return self.limits.get(profile, self.per_profile)
+
+    def submit(self, executor, profile):
+        # QThread.finished, which executors shadow with their result signal
+        QThread.finished.__get__(executor, QThread).connect(lambda: self._done(executor))
+        self._queue.append((executor, profile))
+        self._start_ready()
+
+    def cancel(self, executor):
+        """Drop a queued executor; one that is already running is left to finish."""
+        self._queue = deque(item for item in self._queue if item[0] is not executor)
+
+    def is_queued(self, executor):
+        return any(item[0] is executor for item in self._queue)
+
+    def running_count(self, profile=None):
+        if profile is None:
+            return len(self._running)
+        return sum(1 for value in self._running.values() if value == profile)
+
+    def _done(self, executor):
+        # finished is emitted just before the thread stops; let it stop before the last reference goes
+        executor.wait()
+        if self._running.pop(executor, None) is not None:
+            self._start_ready()
+
+    def _start_ready(self):
+        waiting = deque()
+        while self._queue and len(self._running) < self.max_total:
+            executor, profile = self._queue.popleft()
+            if self.running_count(profile) >= self.limit(profile):
+                waiting.append((executor, profile))
+                continue
+            self._running[executor] = profile
+            executor.start()
+        self._queue = waiting + self._queue
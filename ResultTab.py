@@ -0,0 +1,433 @@
+import time
+
+import pandas as pd
+from datetime import datetime
+
+from PyQt6.QtCore import QSettings, Qt, QThread, pyqtSignal
+from PyQt6.QtGui import QStandardItem, QStandardItemModel
+from PyQt6.QtWidgets import (
+    QApplication,
+    QFileDialog,
+    QInputDialog,
+    QMenu,
+    QMessageBox,
+    QTableView,
+    QVBoxLayout,
+    QWidget,
+)
+
+from ColumnSizer import ColumnSizer
+from ConnectionPool import profile_key
+from PandasTableModel import PandasTableModel
+from QueryExecutor import QueryExecutor
+from QueryProfile import MemoryProbe, dump_profile, ms_since
+
+
+class ResultTab(QWidget):
+    """One results tab: its own query executor, table model, filters and status."""
+
+    status_changed = pyqtSignal(str)
+    state_changed = pyqtSignal()  # started, finished or failed
+    profile_changed = pyqtSignal()  # performance profile of the last run updated
+    closing = pyqtSignal()  # the tab is about to be closed
+
+    def __init__(self, title, parent=None):
+        super().__init__(parent)
+        self.title = title
+        self.sql = ""
+        self.source = "editor"
+        self.status = ""
+        self.executor = None
+        self.running = False
+        self.started_at = None
+        self.elapsed = None
+        self.error = ""
+        self.pandas_model = None
+        self.results_data = []
+        self.columns_data = []
+        self.db_config = None
+        self.scheduler = None
+        # How to fetch a SELECT estimated above the row threshold; None asks each time
+        self.large_result_choice = None
+        # Per-phase timings and memory of the last run (see QueryProfile)
+        self.performance = None
+        self.display_timings = {}
+        self.queued_at = None
+        self.memory_probe = None
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.table = QTableView()
+        self.table.setMinimumHeight(100)  # Minimum height when collapsed
+        self.table.setStyleSheet(
+            """
+            QTableView {
+                background-color: white;
+                color: black;
+                border: 1px solid #cccccc;
+                gridline-color: #e0e0e0;
+                font-family: 'Consolas', monospace;
+            }
+            QHeaderView::section {
+                background-color: #f0f0f0;
+                color: black;
+                padding: 4px;
+                border: 1px solid #cccccc;
+                font-weight: bold;
+            }
+        """
+        )
+        self.table.setModel(QStandardItemModel())
+        layout.addWidget(self.table)
+        # Sample-based column widths; resizeColumnsToContents() reads every cell
+        self.column_sizer = ColumnSizer(self.table)
+
+        # Setup table context menu
+        header = self.table.horizontalHeader()
+        header.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        header.customContextMenuRequested.connect(self.show_header_context_menu)
+
+    def set_status(self, message):
+        self.status = message
+        self.status_changed.emit(message)
+
+    def start_query(self, sql, db_config, scheduler, mode="guard", export_path=None, source="editor"):
+        """Queue `sql` on the scheduler; results land in this tab."""
+        settings = QSettings("AiSQL", "DatabaseSettings")
+        self.clear()
+        self.sql = sql
+        self.source = source
+        self.db_config = db_config
+        self.scheduler = scheduler
+        self.running = True
+        self.started_at = None
+        self.elapsed = None
+        self.error = ""
+        self.performance = None
+        self.queued_at = time.perf_counter()
+        self.executor = QueryExecutor(
+            sql,
+            db_config,
+            mode=mode,
+            max_rows=int(settings.value("large_result_rows", 100000)),
+            preview_rows=int(settings.value("preview_rows", 1000)),
+            export_path=export_path,
+            source=source,
+        )
+        self.executor.finished.connect(self.on_query_finished)
+        self.executor.error.connect(self.on_query_error)
+        self.executor.progress.connect(self.on_progress)
+        self.executor.large_result.connect(self.on_large_result)
+        self.set_status("รอคิวการเชื่อมต่อ...")
+        self.state_changed.emit()
+        scheduler.submit(self.executor, profile_key(db_config))
+
+    def on_large_result(self, estimated_rows):
+        """Ask how to fetch a SELECT estimated to return too many rows."""
+        choice = self.large_result_choice or self.ask_large_result(estimated_rows)
+        if choice is None:
+            self.running = False
+            self.show_message(
+                "Result", f"ยกเลิก: คาดว่าจะได้ผลลัพธ์ประมาณ {estimated_rows:,} แถว"
+            )
+            self.set_status(f"ยกเลิกคิวรีที่คาดว่าจะได้ {estimated_rows:,} แถว")
+            self.state_changed.emit()
+            return
+        mode, export_path = choice
+        self.start_query(self.sql, self.db_config, self.scheduler, mode, export_path, self.source)
+
+    def ask_large_result(self, estimated_rows):
+        """(mode, export_path) chosen by the user, or None to cancel."""
+        preview_rows = int(QSettings("AiSQL", "DatabaseSettings").value("preview_rows", 1000))
+        box = QMessageBox(self)
+        box.setIcon(QMessageBox.Icon.Warning)
+        box.setWindowTitle("Large Result")
+        box.setText(
+            f"คาดว่าคิวรีนี้จะได้ผลลัพธ์ประมาณ {estimated_rows:,} แถว\nต้องการดึงข้อมูลอย่างไร?"
+        )
+        preview = box.addButton(f"Preview {preview_rows:,} rows", QMessageBox.ButtonRole.AcceptRole)
+        stream = box.addButton("Stream all rows", QMessageBox.ButtonRole.AcceptRole)
+        export = box.addButton("Export to CSV...", QMessageBox.ButtonRole.AcceptRole)
+        box.addButton(QMessageBox.StandardButton.Cancel)
+        box.setDefaultButton(preview)
+        box.exec()
+        clicked = box.clickedButton()
+        if clicked is preview:
+            return "preview", None
+        if clicked is stream:
+            return "stream", None
+        if clicked is export:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename, _ = QFileDialog.getSaveFileName(
+                self, "Export Query Result", f"query_results_{timestamp}.csv", "CSV Files (*.csv)"
+            )
+            return ("export", filename) if filename else None
+        return None
+
+    def detach(self, scheduler):
+        """Forget the executor before the tab is closed; a running query just finishes unseen."""
+        self.closing.emit()
+        if self.executor is None:
+            return
+        scheduler.cancel(self.executor)
+        self.executor.cancel()
+        # Only this tab's slots; the scheduler keeps its own to free the slot
+        for signal, slot in (
+            (self.executor.finished, self.on_query_finished),
+            (self.executor.error, self.on_query_error),
+            (self.executor.progress, self.on_progress),
+            (self.executor.large_result, self.on_large_result),
+        ):
+            try:
+                signal.disconnect(slot)
+            except TypeError:
+                pass
+        self.executor = None
+        self.running = False
+        self._release_memory_probe()
+        self.column_sizer.stop()
+
+    def show_results(self, sql, results, columns, source="editor"):
+        """Show rows fetched elsewhere, e.g. by a script run on one session, as this tab's result."""
+        self.clear()
+        self.sql = sql
+        self.source = source
+        self.error = ""
+        self.performance = None
+        self.queued_at = None
+        self.on_query_finished(results, columns)
+
+    def on_progress(self, message):
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+        self.set_status(message)
+
+    def _elapsed(self):
+        if self.started_at is None:
+            return ""
+        self.elapsed = time.perf_counter() - self.started_at
+        return f" ({self.elapsed:.2f} s)"
+
+    def on_query_finished(self, results, columns):
+        """Handle successful query completion."""
+        self.running = False
+        executor = self.executor
+        mode = executor.mode if executor is not None else "all"
+        profile = dict(executor.timings or {}) if executor is not None else {}
+        profile.update(
+            rows=results[0][0] if mode == "export" and results else len(results),
+            columns=len(columns),
+            mode=mode,
+            role=executor.role if executor is not None else None,
+        )
+        if not results:
+            self.show_message("Result", "ไม่พบข้อมูลที่ตรงตามเงื่อนไข")
+            self.set_status("ไม่พบข้อมูล" + self._elapsed())
+            self._finish_profile(profile, None)
+            self.state_changed.emit()
+            return
+
+        # Convert results to pandas DataFrame
+        phase = time.perf_counter()
+        dataframe = pd.DataFrame(results, columns=columns)
+        profile["dataframe_ms"] = ms_since(phase)
+        self.show_dataframe(dataframe, results, columns)
+        profile.update(self.display_timings)
+        if mode == "export":
+            status = f"ส่งออกข้อมูล {results[0][0]:,} แถวไปที่ {results[0][1]}"
+        elif mode == "preview":
+            status = f"Preview: first {len(results):,} records"
+        else:
+            status = f"Found {len(results)} records"
+        self.set_status(status + self._elapsed())
+        self._finish_profile(profile, dataframe if mode != "export" else None)
+        self.state_changed.emit()
+
+    def _finish_profile(self, profile, dataframe):
+        """Store the run's profile; the DataFrame's deep memory size is measured in the background."""
+        profile["total_ms"] = ms_since(self.queued_at) if self.queued_at is not None else None
+        profile["sql"] = self.sql
+        self.performance = profile
+        self._release_memory_probe()
+        if dataframe is None:
+            self._profile_complete()
+            return
+        self.memory_probe = MemoryProbe(dataframe)
+        self.memory_probe.finished.connect(self.on_memory_measured)
+        self.memory_probe.error.connect(self.on_memory_error)
+        self.memory_probe.start()
+        self.profile_changed.emit()
+
+    def on_memory_measured(self, measured):
+        if self.performance is not None:
+            self.performance.update(measured)
+        self._forget_memory_probe()
+        self._profile_complete()
+
+    def on_memory_error(self, error_message):
+        print(error_message)
+        self._forget_memory_probe()
+        self._profile_complete()
+
+    def _profile_complete(self):
+        self.profile_changed.emit()
+        if self.performance is None:
+            return
+        if str(QSettings("AiSQL", "DatabaseSettings").value("dump_query_profile", "false")).lower() == "true":
+            try:
+                dump_profile(self.performance)
+            except OSError as e:
+                print(f"บันทึก query profile ไม่สำเร็จ: {e}")
+
+    def _forget_memory_probe(self):
+        # Its signal is emitted from run(); let the thread end before the last reference goes
+        probe, self.memory_probe = self.memory_probe, None
+        if probe is not None:
+            probe.wait()
+
+    def _release_memory_probe(self):
+        """Forget a running memory probe without waiting; the application keeps it alive until it ends."""
+        probe, self.memory_probe = self.memory_probe, None
+        if probe is not None and probe.isRunning():
+            probe.finished.disconnect()
+            probe.error.disconnect()
+            probe.setParent(QApplication.instance())
+            # QThread.finished, which MemoryProbe shadows with its result signal
+            QThread.finished.__get__(probe, QThread).connect(probe.deleteLater)
+            if probe.isFinished():
+                probe.deleteLater()
+
+    def on_query_error(self, error_message):
+        """Handle query error."""
+        self.running = False
+        self.error = error_message
+        self._elapsed()
+        self.show_message("Error", error_message)
+        self.set_status(error_message)
+        self.state_changed.emit()
+        # Show error in a message box
+        QMessageBox.critical(self, "Error", error_message)
+
+    def show_dataframe(self, df, results, columns):
+        # Create pandas model
+        phase = time.perf_counter()
+        self.pandas_model = PandasTableModel(df)
+
+        # Set model to table and enable sorting
+        self.table.setModel(self.pandas_model)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+        model_ms = ms_since(phase)
+        phase = time.perf_counter()
+        self.column_sizer.max_width = int(
+            QSettings("AiSQL", "DatabaseSettings").value("max_column_width", 400)
+        )
+        self.column_sizer.fit(self.pandas_model)
+        self.display_timings = {"model_ms": model_ms, "autosize_ms": ms_since(phase)}
+
+        self.results_data = results
+        self.columns_data = columns
+
+    def show_message(self, header, message):
+        model = QStandardItemModel(1, 1)
+        model.setHorizontalHeaderLabels([header])
+        item = QStandardItem(message)
+        item.setEditable(False)
+        model.setItem(0, 0, item)
+        self.table.setModel(model)
+        self.pandas_model = None
+        self.results_data = []
+        self.columns_data = []
+
+    def clear(self):
+        self.table.setModel(QStandardItemModel())
+        self.pandas_model = None
+        self.results_data = []
+        self.columns_data = []
+
+    def export_dataframe(self):
+        """The rows to export: filtered view if any, otherwise the raw results."""
+        if self.pandas_model is not None:
+            return self.pandas_model._dataframe
+        return pd.DataFrame(self.results_data, columns=self.columns_data)
+
+    def show_header_context_menu(self, position):
+        """Show context menu on header right-click."""
+        if self.pandas_model is None:
+            return
+
+        header = self.table.horizontalHeader()
+        logical_index = header.logicalIndexAt(position)
+
+        if logical_index < 0:
+            return
+
+        column_name = self.pandas_model._dataframe.columns[logical_index]
+
+        menu = QMenu(self)
+
+        # Filter action
+        filter_action = menu.addAction(f"Filter column '{column_name}'")
+        filter_action.triggered.connect(lambda: self.show_filter_dialog(column_name))
+
+        # Clear filter action (only if filter exists)
+        if column_name in self.pandas_model.column_filters:
+            clear_action = menu.addAction(f"Clear filter for '{column_name}'")
+            clear_action.triggered.connect(
+                lambda: self.clear_column_filter(column_name)
+            )
+
+        # Clear all filters action (only if any filters exist)
+        if self.pandas_model.column_filters:
+            menu.addSeparator()
+            clear_all_action = menu.addAction("Clear all filters")
+            clear_all_action.triggered.connect(self.clear_all_filters)
+
+        menu.exec(header.mapToGlobal(position))
+
+    def show_filter_dialog(self, column_name):
+        """Show simple filter dialog for a column."""
+        if not self.pandas_model:
+            return
+
+        # Get current filter text if exists
+        current_filter = self.pandas_model.column_filters.get(column_name, "")
+
+        text, ok = QInputDialog.getText(
+            self,
+            "Filter Column",
+            f"Enter filter text for '{column_name}':",
+            text=current_filter,
+        )
+
+        if ok:
+            self.pandas_model.set_column_filter(column_name, text.strip())
+            self.update_status_after_filter()
+
+    def clear_column_filter(self, column_name):
+        """Clear filter for a specific column."""
+        if self.pandas_model and column_name in self.pandas_model.column_filters:
+            del self.pandas_model.column_filters[column_name]
+            self.pandas_model.apply_filters()
+            self.update_status_after_filter()
+
+    def clear_all_filters(self):
+        """Clear all column filters."""
+        if self.pandas_model:
+            self.pandas_model.column_filters.clear()
+            self.pandas_model.apply_filters()
+            self.update_status_after_filter()
+
+    def update_status_after_filter(self):
+        """Update status label after filtering."""
+        if self.pandas_model:
+            filtered_count = self.pandas_model.rowCount()
+            total_count = len(self.pandas_model._original_dataframe)
+
+            if filtered_count == total_count:
+                self.set_status(f"Found {total_count} records")
+            else:
+                self.set_status(
+                    f"Showing {filtered_count} of {total_count} records (filtered)"
+                )
@@ -9,6 +9,52 @@ import re
 from sqlparse import format as sql_format
 
 
+# Strings, quoted identifiers and comments may contain ';' that does not end a statement
+STATEMENT_SCAN_RE = re.compile(
+    r"'(?:[^'\\]|\\.|'')*'"
+    r'|"(?:[^"\\]|\\.|"")*"'
+    r"|`[^`]*`"
+    r"|(?:--|#)[^\n]*"
+    r"|/\*.*?\*/"
+    r"|(?P<end>;)",
+    re.DOTALL,
+)
+
+
+def statement_spans(sql):
+    """Return (start, end) offsets of each statement in `sql`, trimmed of surrounding whitespace.
+
+    Each span includes its leading comments and the terminating ';'. Only a
+    regex scan is done, so this stays cheap on very large scripts.
+    """
+    spans = []
+    start = 0
+    for match in STATEMENT_SCAN_RE.finditer(sql):
+        if match.group("end"):
+            spans.append((start, match.end()))
+            start = match.end()
+    spans.append((start, len(sql)))
+
+    trimmed = []
+    for begin, end in spans:
+        chunk = sql[begin:end]
+        stripped = chunk.strip()
+        if stripped:
+            begin += len(chunk) - len(chunk.lstrip())
+            trimmed.append((begin, begin + len(stripped)))
+    return trimmed
+
+
+# Options used by the editor's Format SQL command
+DEFAULT_FORMAT_OPTIONS = {
+    "keyword_case": "upper",
+    "identifier_case": "lower",
+    "reindent": True,
+    "indent_width": 4,
+    "use_space_around_operators": True,
+}
+
+
 class MySQLFormatter:
     """MySQL-specific SQL formatter"""
 
@@ -56,6 +102,19 @@ class MySQLFormatter:
             "ZEROFILL",
         }
 
+        # MySQL-specific functions
+        self.mysql_functions = {
+            "CONCAT",
+            "SUBSTRING",
+            "IFNULL",
+            "COALESCE",
+            "UNIX_TIMESTAMP",
+            "FROM_UNIXTIME",
+        }
+
+        self._casing_words = None
+        self._casing_re = None
+
     def format_sql(
         self,
         sql: str,
@@ -91,38 +150,109 @@ class MySQLFormatter:
         except Exception as e:
             raise ValueError(f"Error formatting MySQL SQL: {str(e)}")
 
+    def _casing_pattern(self):
+        """One alternation regex for every keyword and function.
+
+        Strings, backtick identifiers and comments are matched first so the
+        words inside them are never re-cased; `#` comments are captured so they
+        can be rewritten to `--` in the same pass. Compiled once and reused
+        until the keyword sets change.
+        """
+        words = frozenset(self.mysql_keywords) | frozenset(self.mysql_functions)
+        if self._casing_words != words:
+            alternation = "|".join(
+                re.escape(word) for word in sorted(words, key=len, reverse=True)
+            )
+            self._casing_re = re.compile(
+                r"(?P<skip>'(?:[^'\\]|\\.|'')*'"
+                r'|"(?:[^"\\]|\\.|"")*"'
+                r"|`[^`]*`"
+                r"|--[^\n]*"
+                r"|/\*.*?\*/)"
+                r"|#(?P<hash>[^\n]*)"
+                r"|\b(?P<word>" + alternation + r")\b",
+                re.IGNORECASE | re.DOTALL,
+            )
+            self._casing_words = words
+        return self._casing_re
+
     def _apply_mysql_formatting(self, sql: str, keyword_case: str) -> str:
-        """Apply MySQL-specific formatting rules"""
-        # Handle MySQL-specific keywords
-        for keyword in self.mysql_keywords:
-            if keyword_case == "upper":
-                pattern = re.compile(r"\b" + re.escape(keyword) + r"\b", re.IGNORECASE)
-                sql = pattern.sub(keyword.upper(), sql)
-            elif keyword_case == "lower":
-                pattern = re.compile(r"\b" + re.escape(keyword) + r"\b", re.IGNORECASE)
-                sql = pattern.sub(keyword.lower(), sql)
-
-        # Handle MySQL backticks for identifiers (preserve them)
-        sql = re.sub(r"`([^`]+)`", r"`\1`", sql)
-
-        # Handle MySQL-specific functions
-        mysql_functions = [
-            "CONCAT",
-            "SUBSTRING",
-            "IFNULL",
-            "COALESCE",
-            "UNIX_TIMESTAMP",
-            "FROM_UNIXTIME",
-        ]
-        for func in mysql_functions:
-            if keyword_case == "upper":
-                pattern = re.compile(r"\b" + re.escape(func) + r"\b", re.IGNORECASE)
-                sql = pattern.sub(func.upper(), sql)
-            elif keyword_case == "lower":
-                pattern = re.compile(r"\b" + re.escape(func) + r"\b", re.IGNORECASE)
-                sql = pattern.sub(func.lower(), sql)
-
-        # Handle MySQL comment styles
-        sql = re.sub(r"#([^\n]*)", r"-- \1", sql)  # Convert # comments to -- comments
-
-        return sql
+        """Apply MySQL-specific formatting rules in a single pass"""
+        pattern = self._casing_pattern()
+
+        def replace(match):
+            word = match.group("word")
+            if word is not None:
+                # Handle MySQL-specific keywords and functions
+                if keyword_case == "upper":
+                    return word.upper()
+                if keyword_case == "lower":
+                    return word.lower()
+                return word
+            if match.group("hash") is not None:
+                # Convert # comments to -- comments
+                return "-- " + match.group("hash")
+            # Strings, backtick identifiers and comments are preserved as-is
+            return match.group(0)
+
+        return pattern.sub(replace, sql)
+
+
+def simple_format(sql):
+    """Fallback formatting when sqlparse fails: break lines before the main clauses."""
+    formatted = re.sub(r"\bSELECT\b", "\nSELECT", sql, flags=re.IGNORECASE)
+    formatted = re.sub(r"\bFROM\b", "\nFROM", formatted, flags=re.IGNORECASE)
+    formatted = re.sub(r"\bWHERE\b", "\nWHERE", formatted, flags=re.IGNORECASE)
+    formatted = re.sub(r"\bORDER BY\b", "\nORDER BY", formatted, flags=re.IGNORECASE)
+    formatted = re.sub(r"\bGROUP BY\b", "\nGROUP BY", formatted, flags=re.IGNORECASE)
+    formatted = re.sub(r";\s*$", ";\n", formatted, flags=re.MULTILINE)
+    return formatted
+
+
+_statement_formatter = None
+
+
+def format_statement(sql, options=None):
+    """Format one statement with the editor defaults; safe to run in a worker process."""
+    global _statement_formatter
+    if _statement_formatter is None:
+        _statement_formatter = MySQLFormatter()
+    try:
+        return _statement_formatter.format_sql(sql=sql, **(options or DEFAULT_FORMAT_OPTIONS))
+    except ValueError:
+        return simple_format(sql).strip()
+
+
+def format_edits(sql, spans, formatted):
+    """(start, end, text) replacements turning the statements at `spans` into `formatted`.
+
+    Statements that shared a line with the previous one are moved to their own
+    line; unchanged statements produce no edit.
+    """
+    edits = []
+    previous_end = None
+    for (begin, end), text in zip(spans, formatted):
+        if previous_end is not None and "\n" not in sql[previous_end:begin]:
+            edits.append((previous_end, end, "\n" + text))
+        elif text != sql[begin:end]:
+            edits.append((begin, end, text))
+        previous_end = end
+    return edits
+
+
+def apply_edits(sql, edits):
+    parts = []
+    position = 0
+    for start, end, text in edits:
+        parts.append(sql[position:start])
+        parts.append(text)
+        position = end
+    parts.append(sql[position:])
+    return "".join(parts)
+
+
+def format_script(sql, options=None):
+    """Format every statement of a script the way the editor's Format SQL does."""
+    spans = statement_spans(sql)
+    formatted = [format_statement(sql[begin:end], options) for begin, end in spans]
+    return apply_edits(sql, format_edits(sql, spans, formatted))
@@ -0,0 +1,243 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import pymysql
+import sqlparse
+from sqlparse import tokens as T
+
+from ConnectionPool import routed_connection
+
+
+EXPLAINABLE_RE = re.compile(r"^\s*(SELECT|WITH)\b", re.I)
+# Client-side errors where the server never judged the SQL (cannot connect, lost connection...)
+UNAVAILABLE_ERRORS = {2003, 2006, 2013, 1045, 1049}
+# A bare aggregate (no GROUP BY) returns one row however many it reads
+AGGREGATE_FUNCTIONS = {
+    "COUNT", "SUM", "AVG", "MIN", "MAX", "GROUP_CONCAT", "JSON_ARRAYAGG", "JSON_OBJECTAGG",
+    "STD", "STDDEV", "STDDEV_POP", "STDDEV_SAMP", "VARIANCE", "VAR_POP", "VAR_SAMP",
+    "BIT_AND", "BIT_OR", "BIT_XOR",
+}
+# EXPLAIN rows of the outermost query blocks; the rest feed them
+RESULT_SELECT_TYPES = {"SIMPLE", "PRIMARY", "UNION"}
+
+
+@dataclass
+class ValidationResult:
+    ok: bool
+    reason: str = ""
+    estimated_rows: int = 0
+    skipped: bool = False
+
+
+def check_syntax(sql):
+    """Cheap offline sanity check used when no database is available for EXPLAIN."""
+    statements = [s for s in sqlparse.parse(sql) if s.token_first(skip_cm=True)]
+    if len(statements) != 1:
+        return ValidationResult(ok=False, reason="ต้องเป็นคำสั่ง SQL เดียว")
+    if statements[0].get_type() == "UNKNOWN":
+        return ValidationResult(ok=False, reason="ไม่รู้จักประเภทคำสั่ง SQL")
+
+    depth = 0
+    for token in statements[0].flatten():
+        if token.match(sqlparse.tokens.Punctuation, "("):
+            depth += 1
+        elif token.match(sqlparse.tokens.Punctuation, ")"):
+            depth -= 1
+        if depth < 0:
+            break
+        if token.ttype in sqlparse.tokens.Error:
+            return ValidationResult(ok=False, reason=f"พบอักขระไม่ถูกต้อง: {token.value}")
+    if depth != 0:
+        return ValidationResult(ok=False, reason="วงเล็บไม่ครบคู่")
+    return ValidationResult(ok=True)
+
+
+def explain_sql(sql, db_config, max_estimated_rows=1_000_000):
+    """Run EXPLAIN on a candidate SELECT and judge it before it reaches QueryExecutor.
+
+    Rejects syntax/semantic errors reported by the server and plans where any
+    table access is estimated to read more than `max_estimated_rows` rows.
+    """
+    sql = sql.strip().rstrip(";")
+    if not EXPLAINABLE_RE.match(sql):
+        return ValidationResult(ok=True, skipped=True)
+
+    try:
+        with routed_connection(db_config, read_only=True) as (connection, _):
+            with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+                cursor.execute(f"EXPLAIN {sql}")
+                plan = cursor.fetchall()
+    except pymysql.MySQLError as e:
+        code = e.args[0] if e.args else None
+        if code in UNAVAILABLE_ERRORS:
+            return ValidationResult(ok=True, reason=str(e), skipped=True)
+        return ValidationResult(ok=False, reason=f"MySQL ตอบกลับข้อผิดพลาด: {e}")
+
+    worst = max(plan, key=lambda row: int(row.get("rows") or 0), default=None)
+    if worst is None:
+        return ValidationResult(ok=True)
+
+    estimated_rows = int(worst.get("rows") or 0)
+    if estimated_rows > max_estimated_rows:
+        return ValidationResult(
+            ok=False,
+            reason=(
+                f"แผนการทำงานต้องอ่านตาราง {worst.get('table')} ประมาณ {estimated_rows:,} แถว "
+                f"(type={worst.get('type')}, key={worst.get('key')}) "
+                f"เกินกำหนด {max_estimated_rows:,} แถว"
+            ),
+            estimated_rows=estimated_rows,
+        )
+    return ValidationResult(ok=True, estimated_rows=estimated_rows)
+
+
+def _closing_paren(tokens, index):
+    """Index of the ")" matching the "(" at tokens[index]."""
+    depth = 0
+    for position in range(index, len(tokens)):
+        if tokens[position].match(T.Punctuation, "("):
+            depth += 1
+        elif tokens[position].match(T.Punctuation, ")"):
+            depth -= 1
+            if depth == 0:
+                return position
+    return len(tokens) - 1
+
+
+def result_shape(sql):
+    """How the outermost query shapes its rows: "aggregate", "grouped" or "rows".
+
+    "aggregate" is one row per SELECT (an aggregate without GROUP BY);
+    "grouped" has GROUP BY or DISTINCT. Only tokens outside parentheses
+    count, so subqueries and CTE bodies do not. An aggregate followed by
+    OVER is a window function and keeps every row.
+    """
+    statements = sqlparse.parse(sql)
+    if not statements:
+        return "rows"
+    tokens = [
+        token
+        for token in statements[0].flatten()
+        if not token.is_whitespace and token.ttype not in T.Comment
+    ]
+    blocks = []  # per outer SELECT: has a plain aggregate
+    in_select = False
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token.match(T.Punctuation, "("):
+            index = _closing_paren(tokens, index) + 1
+            continue
+        word = " ".join(token.normalized.upper().split()) if token.is_keyword else ""
+        if word in ("GROUP BY", "DISTINCT", "DISTINCTROW"):
+            return "grouped"
+        if token.ttype in T.DML and word == "SELECT":
+            blocks.append(False)
+            in_select = True
+        elif word == "FROM":
+            in_select = False
+        elif (
+            in_select
+            and (token.ttype in T.Name or token.is_keyword)
+            and token.value.upper() in AGGREGATE_FUNCTIONS
+            and index + 1 < len(tokens)
+            and tokens[index + 1].match(T.Punctuation, "(")
+        ):
+            index = _closing_paren(tokens, index + 1) + 1
+            following = tokens[index] if index < len(tokens) else None
+            if following is None or following.normalized.upper() != "OVER":
+                blocks[-1] = True
+            continue
+        index += 1
+    return "aggregate" if blocks and all(blocks) else "rows"
+
+
+def estimate_result_rows(plan, sql="", limit=None):
+    """Rough number of rows a SELECT returns, from its EXPLAIN rows.
+
+    Within each outer query block the joined tables multiply (rows x
+    filtered%); UNION blocks add up. A LIMIT caps the result. EXPLAIN rows
+    are rows read, not groups, so for GROUP BY and DISTINCT the estimate is
+    an upper bound. An empty plan (EXPLAIN failed) gives 0.
+    """
+    if result_shape(sql) == "aggregate":
+        return 1
+    blocks = {}
+    for row in plan:
+        if row.get("select_type") not in RESULT_SELECT_TYPES:
+            continue
+        rows = int(row.get("rows") or 1) * float(row.get("filtered") or 100) / 100
+        blocks[row.get("id")] = blocks.get(row.get("id"), 1.0) * max(rows, 1.0)
+    estimate = int(sum(blocks.values()))
+    return estimate if limit is None else min(estimate, limit)
+
+
+def examined_rows(plan):
+    """Rough number of rows MySQL reads to run a query, from its EXPLAIN rows.
+
+    Every table in a query block is read once per row coming out of the
+    tables joined before it; all blocks (subqueries, derived tables) count.
+    """
+    examined, joined = 0.0, {}
+    for row in plan:
+        rows = int(row.get("rows") or 1)
+        before = joined.get(row.get("id"), 1.0)
+        examined += before * rows
+        joined[row.get("id")] = before * max(rows * float(row.get("filtered") or 100) / 100, 1.0)
+    return int(examined)
+
+
+class EstimateCache:
+    """Thread-safe row estimates per (profile, statement fingerprint), kept for `ttl` seconds."""
+
+    def __init__(self, max_size=1024, ttl=600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, estimate):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), estimate)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+estimate_cache = EstimateCache()
+
+
+def estimate_rows(connection, statement, profile):
+    """Estimated result rows of a classified SELECT, cached per statement fingerprint.
+
+    Returns 0 when EXPLAIN fails; the query itself will report the error.
+    A bare aggregate is judged from the SQL alone.
+    """
+    key = (profile, statement.digest)
+    estimate = estimate_cache.get(key)
+    if estimate is not None:
+        return estimate
+    sql = statement.statements[0].rstrip().rstrip(";")
+    if result_shape(sql) == "aggregate":
+        return estimate_result_rows([], sql, statement.limit)
+    try:
+        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+            cursor.execute(f"EXPLAIN {sql}")
+            plan = cursor.fetchall()
+    except pymysql.MySQLError:
+        return 0
+    estimate = estimate_result_rows(plan, sql, statement.limit)
+    estimate_cache.put(key, estimate)
+    return estimate
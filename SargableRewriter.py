@@ -0,0 +1,480 @@
+import datetime
+import difflib
+from dataclasses import dataclass
+
+import pymysql
+import sqlparse
+from PyQt6.QtCore import QThread, pyqtSignal
+from sqlparse import tokens as T
+
+from ConnectionPool import routed_connection
+from SQLValidator import EXPLAINABLE_RE, examined_rows
+from SchemaCatalog import table_aliases
+
+
+# A rewritten predicate must stand where a boolean condition is expected
+PREDICATE_STARTS = {"WHERE", "AND", "OR", "ON", "NOT", "HAVING", "WHEN", "("}
+COMPARISONS = {"=", ">=", ">", "<=", "<"}
+# Keywords that end a WHERE clause at its own nesting depth
+CLAUSE_ENDS = {"GROUP BY", "ORDER BY", "HAVING", "LIMIT", "WINDOW", "UNION", "FOR"}
+# First word of a set operation ("UNION ALL" is one token)
+SET_OPERATORS = {"UNION", "EXCEPT", "INTERSECT"}
+DATE_FORMATS = {"%Y": "year", "%Y-%m": "month", "%Y-%m-%d": "day"}
+
+
+@dataclass
+class Rewrite:
+    rule: str
+    before: str
+    after: str
+
+
+class _Token:
+    __slots__ = ("ttype", "value", "upper", "start", "end")
+
+    def __init__(self, token, start):
+        self.ttype = token.ttype
+        self.value = token.value
+        self.upper = token.normalized.upper() if token.is_keyword else token.value.upper()
+        self.start = start
+        self.end = start + len(token.value)
+
+    def is_punct(self, value):
+        return self.ttype in T.Punctuation and self.value == value
+
+
+def _tokens(sql):
+    """Significant (non-whitespace, non-comment) tokens of `sql` with their offsets."""
+    tokens, offset = [], 0
+    for statement in sqlparse.parse(sql):
+        for token in statement.flatten():
+            if not token.is_whitespace and token.ttype not in T.Comment:
+                tokens.append(_Token(token, offset))
+            offset += len(token.value)
+    return tokens
+
+
+def _column(tokens, i):
+    """Index after a plain column reference (`col`, `t.col`, `db.t.col`) at `i`, or None."""
+    if i >= len(tokens) or tokens[i].ttype not in T.Name:
+        return None
+    i += 1
+    while i + 1 < len(tokens) and tokens[i].is_punct(".") and tokens[i + 1].ttype in T.Name:
+        i += 2
+    if i < len(tokens) and tokens[i].is_punct("("):
+        return None  # a function call
+    return i
+
+
+def _literal(token):
+    if token.ttype in T.Literal.String.Single:
+        return token.value[1:-1]
+    if token.ttype in T.Number.Integer:
+        return token.value
+    return None
+
+
+def _date(text):
+    try:
+        return datetime.date.fromisoformat(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def _year(text):
+    return int(text) if text is not None and text.isdigit() and 1000 <= int(text) <= 9998 else None
+
+
+def _next_month(day):
+    return day.replace(year=day.year + 1, month=1) if day.month == 12 else day.replace(month=day.month + 1)
+
+
+def _range(column, low, high):
+    """Half-open range predicate; either bound may be None."""
+    parts = []
+    if low is not None:
+        parts.append(f"{column} >= '{low.isoformat()}'")
+    if high is not None:
+        parts.append(f"{column} < '{high.isoformat()}'")
+    return parts[0] if len(parts) == 1 else f"({parts[0]} AND {parts[1]})"
+
+
+def _period_range(column, op, start, end):
+    """Predicate for `period(column) op value` where the value's period is [start, end)."""
+    return {
+        "=": _range(column, start, end),
+        ">=": _range(column, start, None),
+        ">": _range(column, end, None),
+        "<=": _range(column, None, end),
+        "<": _range(column, None, start),
+    }[op]
+
+
+def _wrapped_column(tokens, i):
+    """Match FUNC(col) or DATE_FORMAT(col, 'fmt') at `i`: (func, column, fmt, index after) or None."""
+    func = tokens[i].upper
+    if func not in ("YEAR", "MONTH", "DATE", "DATE_FORMAT"):
+        return None
+    if i + 1 >= len(tokens) or not tokens[i + 1].is_punct("("):
+        return None
+    after = _column(tokens, i + 2)
+    if after is None or after + 1 >= len(tokens):
+        return None
+    column_text = (tokens[i + 2].start, tokens[after - 1].end)
+    fmt = None
+    if func == "DATE_FORMAT":
+        if not tokens[after].is_punct(",") or after + 2 >= len(tokens):
+            return None
+        fmt = _literal(tokens[after + 1])
+        if fmt not in DATE_FORMATS:
+            return None
+        after += 2
+    if not tokens[after].is_punct(")"):
+        return None
+    return func, column_text, fmt, after + 1
+
+
+def _comparison(tokens, i):
+    """(op, values, index after) for `= v`, `>= v`... or `BETWEEN a AND b` at `i`."""
+    if i >= len(tokens):
+        return None
+    if tokens[i].ttype in T.Operator.Comparison and tokens[i].value in COMPARISONS:
+        if i + 1 < len(tokens) and _literal(tokens[i + 1]) is not None:
+            return tokens[i].value, [_literal(tokens[i + 1])], i + 2
+        return None
+    if tokens[i].upper == "BETWEEN" and i + 3 < len(tokens) and tokens[i + 2].upper == "AND":
+        low, high = _literal(tokens[i + 1]), _literal(tokens[i + 3])
+        if low is not None and high is not None:
+            return "BETWEEN", [low, high], i + 4
+    return None
+
+
+def _ends_cleanly(tokens, i):
+    """The predicate is not followed by arithmetic that would bind to its literal."""
+    return i >= len(tokens) or not (
+        tokens[i].ttype in T.Operator and tokens[i].ttype not in T.Operator.Comparison
+    )
+
+
+def _period(kind, value):
+    """[start, end) of the year, month or day written as `value`, or None."""
+    if kind == "year":
+        year = _year(value)
+        return (datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1)) if year else None
+    if kind == "month":
+        day = _date(f"{value}-01") if value and len(value) == 7 else None
+        return (day, _next_month(day)) if day else None
+    day = _date(value)
+    return (day, day + datetime.timedelta(days=1)) if day else None
+
+
+def _date_rewrite(sql, tokens, i):
+    """(start, end, replacement, rule) for a function-wrapped date predicate at `i`, or None."""
+    if i > 0 and tokens[i - 1].upper not in PREDICATE_STARTS:
+        return None
+    wrapped = _wrapped_column(tokens, i)
+    if wrapped is None:
+        return None
+    func, (col_start, col_end), fmt, after = wrapped
+    column = sql[col_start:col_end]
+    compare = _comparison(tokens, after)
+    if compare is None or not _ends_cleanly(tokens, compare[2]):
+        return None
+    op, values, end = compare
+
+    kind = {"YEAR": "year", "DATE": "day", "DATE_FORMAT": DATE_FORMATS.get(fmt)}.get(func)
+    if func in ("YEAR", "MONTH") and op == "=" and end + 1 < len(tokens) and tokens[end].upper == "AND":
+        # YEAR(c) = y AND MONTH(c) = m (either order) is one month
+        partner = _wrapped_column(tokens, end + 1)
+        if partner and partner[0] in ("YEAR", "MONTH") and partner[0] != func:
+            partner_column = sql[partner[1][0] : partner[1][1]]
+            other = _comparison(tokens, partner[3])
+            if partner_column == column and other and other[0] == "=" and _ends_cleanly(tokens, other[2]):
+                year, month = (values[0], other[1][0]) if func == "YEAR" else (other[1][0], values[0])
+                if _year(year) and month.isdigit() and 1 <= int(month) <= 12:
+                    start = datetime.date(int(year), int(month), 1)
+                    replacement = _range(column, start, _next_month(start))
+                    return tokens[i].start, tokens[other[2] - 1].end, replacement, "YEAR/MONTH → range"
+    if kind is None:
+        return None
+
+    if op == "BETWEEN":
+        low, high = _period(kind, values[0]), _period(kind, values[1])
+        if low is None or high is None:
+            return None
+        replacement = _range(column, low[0], high[1])
+    else:
+        period = _period(kind, values[0])
+        if period is None:
+            return None
+        replacement = _period_range(column, op, *period)
+    return tokens[i].start, tokens[end - 1].end, replacement, f"{func}() → range"
+
+
+def _matching_paren(tokens, i):
+    depth = 0
+    for j in range(i, len(tokens)):
+        if tokens[j].is_punct("("):
+            depth += 1
+        elif tokens[j].is_punct(")"):
+            depth -= 1
+            if depth == 0:
+                return j
+    return None
+
+
+def _depth_zero(tokens, start, end):
+    """Indexes in [start, end) that are not inside parentheses."""
+    depth = 0
+    for j in range(start, end):
+        if tokens[j].is_punct("("):
+            depth += 1
+        elif tokens[j].is_punct(")"):
+            depth -= 1
+        elif depth == 0:
+            yield j
+
+
+def _from_qualifiers(tokens, from_, end):
+    """Alias (else table name) of each table joined between FROM at `from_` and `end`, or None."""
+    qualifiers = []
+    j = from_ + 1
+    expecting = True
+    while j < end:
+        if expecting:
+            if tokens[j].is_punct("("):
+                close = _matching_paren(tokens, j)
+                if close is None:
+                    return None
+                name, j = None, close + 1
+            else:
+                after = _column(tokens, j)
+                if after is None:
+                    return None
+                name, j = tokens[after - 1].value, after
+            if j < end and tokens[j].upper == "AS":
+                j += 1
+            if j < end and tokens[j].ttype in T.Name:
+                name = tokens[j].value
+                j += 1
+            if name is None:
+                return None
+            qualifiers.append(name)
+            expecting = False
+            continue
+        if tokens[j].upper.endswith("JOIN"):
+            expecting = True
+        elif tokens[j].is_punct("("):
+            j = _matching_paren(tokens, j) or end
+        j += 1
+    return qualifiers
+
+
+def _expression_end(tokens, start, end):
+    """Index after the select expression in [start, end), leaving out its alias."""
+    if end - start > 2 and tokens[end - 2].upper == "AS":
+        return end - 2
+    last, before = tokens[end - 1], tokens[end - 2] if end - start > 1 else None
+    if (
+        before is not None
+        and last.ttype in T.Name
+        and (before.ttype in T.Name or before.ttype in T.Literal or before.is_punct(")"))
+    ):
+        return end - 1  # implicit alias: `o.hn h`
+    return end
+
+
+def _in_subquery_rewrite(sql, tokens, number):
+    """Edits turning one `col IN (SELECT ...)` of an outer SELECT into a join, or None.
+
+    Only done when it cannot change the result: the outer statement is a
+    single SELECT (no UNION) whose FROM uses JOIN syntax only, the IN is a
+    whole top-level AND term of its WHERE (no OR/XOR/NOT at that level and
+    no `= 0` or `IS FALSE` after it), and the subquery is a single SELECT of
+    one expression whose qualified column references all belong to its own
+    tables. The subquery becomes `SELECT DISTINCT`, so the join adds no
+    duplicate rows, and a bare `*` in the outer select list becomes each
+    original table's `alias.*`, so the join's column is not returned.
+    Unqualified subquery columns are assumed to be its own.
+    """
+    if not tokens or tokens[0].upper != "SELECT":
+        return None
+    top = list(_depth_zero(tokens, 0, len(tokens)))
+    if any(tokens[j].upper.split()[0] in SET_OPERATORS for j in top):
+        return None
+    where = next((j for j in top if tokens[j].upper == "WHERE"), None)
+    from_ = next((j for j in top if tokens[j].upper == "FROM"), None)
+    if where is None or from_ is None or from_ > where:
+        return None
+    if any(tokens[j].is_punct(",") for j in top if from_ < j < where):
+        return None
+    where_end = next(
+        (j for j in top if j > where and (tokens[j].upper in CLAUSE_ENDS or tokens[j].is_punct(";"))),
+        len(tokens),
+    )
+    if any(tokens[j].upper in ("OR", "XOR", "NOT", "||") for j in top if where < j < where_end):
+        return None
+
+    for j in (k for k in top if where < k < where_end and tokens[k].upper == "IN"):
+        column_start = j - 1
+        while column_start - 2 > where and tokens[column_start - 1].is_punct("."):
+            column_start -= 2
+        if _column(tokens, column_start) != j or tokens[column_start - 1].upper not in ("WHERE", "AND"):
+            continue
+        if j + 2 >= len(tokens) or not tokens[j + 1].is_punct("(") or tokens[j + 2].upper != "SELECT":
+            continue
+        close = _matching_paren(tokens, j + 1)
+        if close is None:
+            return None
+        if close + 1 < where_end and tokens[close + 1].upper != "AND":
+            continue  # the IN result is compared or tested, e.g. IN (...) = 0
+        sub_top = list(_depth_zero(tokens, j + 2, close))
+        sub_from = next((k for k in sub_top if tokens[k].upper == "FROM"), None)
+        if sub_from is None:
+            continue
+        if any(tokens[k].is_punct(",") for k in sub_top if k < sub_from):
+            continue
+        if any(tokens[k].upper.split()[0] in SET_OPERATORS | {"LIMIT"} for k in sub_top):
+            continue
+        subquery = sql[tokens[j + 2].start : tokens[close - 1].end]
+        inner = table_aliases(subquery)
+        qualifiers = {
+            tokens[k].value.strip("`").lower()
+            for k in range(j + 2, close - 1)
+            if tokens[k].ttype in T.Name and tokens[k + 1].is_punct(".")
+        }
+        if not qualifiers <= set(inner):
+            continue  # correlated with the outer query
+
+        stars = [
+            k for k in top
+            if k < from_ and tokens[k].ttype in T.Wildcard and not tokens[k - 1].is_punct(".")
+        ]
+        qualifiers = _from_qualifiers(tokens, from_, where) if stars else []
+        if qualifiers is None:
+            continue
+
+        select_start = j + 3
+        if tokens[select_start].upper == "DISTINCT":
+            select_start += 1
+        expression_end = _expression_end(tokens, select_start, sub_from)
+        expression = sql[tokens[select_start].start : tokens[expression_end - 1].end]
+        rest = sql[tokens[sub_from].start : tokens[close - 1].end]
+        column = sql[tokens[column_start].start : tokens[j - 1].end]
+        alias = f"in_{number}"
+        join = f"JOIN (SELECT DISTINCT {expression} AS in_key {rest}) AS {alias} ON {alias}.in_key = {column}\n"
+
+        # Drop the IN term with one neighbouring AND (or the whole WHERE)
+        if tokens[column_start - 1].upper == "AND":
+            remove = (tokens[column_start - 1].start, tokens[close].end)
+        elif close + 1 < where_end and tokens[close + 1].upper == "AND":
+            remove = (tokens[column_start].start, tokens[close + 2].start)
+        else:
+            remove = (tokens[where].start, tokens[close].end)
+            join = join.rstrip("\n")  # nothing follows on its own line
+        edits = [(tokens[where].start, tokens[where].start, join), (remove[0], remove[1], "")]
+        edits += [
+            (tokens[k].start, tokens[k].end, ", ".join(f"{name}.*" for name in qualifiers))
+            for k in stars
+        ]
+        before = sql[tokens[column_start].start : tokens[close].end]
+        return edits, Rewrite("IN (subquery) → JOIN", before, join.strip())
+    return None
+
+
+def _apply(sql, edits):
+    for start, end, replacement in sorted(edits, key=lambda edit: (edit[0], edit[1]), reverse=True):
+        sql = sql[:start] + replacement + sql[end:]
+    return sql
+
+
+def rewrite_sargable(sql):
+    """Rewrite index-defeating predicates of `sql`; returns (new_sql, [Rewrite, ...]).
+
+    Date predicates wrapped in YEAR(), MONTH(), DATE() or DATE_FORMAT() become
+    half-open ranges on the bare column, so MySQL can use its index; then
+    `IN (SELECT ...)` terms that are safe to convert become joins. Every
+    replacement is equivalent to the predicate it replaces.
+    """
+    rewrites = []
+    tokens = _tokens(sql)
+    edits = []
+    i = 0
+    while i < len(tokens):
+        found = _date_rewrite(sql, tokens, i)
+        if found is None:
+            i += 1
+            continue
+        start, end, replacement, rule = found
+        edits.append((start, end, replacement))
+        rewrites.append(Rewrite(rule, sql[start:end], replacement))
+        while i < len(tokens) and tokens[i].start < end:
+            i += 1
+    sql = _apply(sql, edits)
+
+    pieces = []
+    number = 1
+    for statement in sqlparse.parse(sql):
+        text = str(statement)
+        found = _in_subquery_rewrite(text, _tokens(text), number)
+        while found is not None:
+            statement_edits, rewrite = found
+            text = _apply(text, statement_edits)
+            rewrites.append(rewrite)
+            number += 1
+            found = _in_subquery_rewrite(text, _tokens(text), number)
+        pieces.append(text)
+    return "".join(pieces), rewrites
+
+
+def sql_diff(before, after):
+    """Unified diff of two SQL texts, line by line."""
+    return "\n".join(
+        difflib.unified_diff(
+            before.splitlines(),
+            after.splitlines(),
+            "original.sql",
+            "rewritten.sql",
+            lineterm="",
+        )
+    )
+
+
+class PlanComparer(QThread):
+    """Background EXPLAIN of the original and rewritten SQL.
+
+    Emits the estimated rows examined by each version, summed over their
+    SELECT statements; an EXPLAIN error of either version is reported as is.
+    """
+
+    finished = pyqtSignal(list)  # [rows examined before, after]
+    error = pyqtSignal(str)
+    progress = pyqtSignal(str)
+
+    def __init__(self, before, after, db_config):
+        super().__init__()
+        self.before = before
+        self.after = after
+        self.db_config = db_config
+
+    def _examined(self, cursor, sql):
+        total = 0
+        for statement in sqlparse.parse(sql):
+            text = str(statement).strip().rstrip(";")
+            if EXPLAINABLE_RE.match(text):
+                cursor.execute(f"EXPLAIN {text}")
+                total += examined_rows(cursor.fetchall())
+        return total
+
+    def run(self):
+        try:
+            self.progress.emit("กำลังเปรียบเทียบแผนการทำงาน (EXPLAIN)...")
+            with routed_connection(self.db_config, read_only=True) as (connection, _):
+                with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+                    before = self._examined(cursor, self.before)
+                    after = self._examined(cursor, self.after)
+            self.finished.emit([before, after])
+        except pymysql.MySQLError as e:
+            self.error.emit(f"EXPLAIN ไม่สำเร็จ: {str(e)}")
+        except Exception as e:
+            self.error.emit(f"เกิดข้อผิดพลาด: {str(e)}")
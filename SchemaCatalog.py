@@ -0,0 +1,232 @@
+import json
+import os
+import re
+import time
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from AppData import app_data_path
+from ConnectionPool import profile_key, routed_connection
+
+
+COLUMNS_SQL = (
+    "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE FROM INFORMATION_SCHEMA.COLUMNS "
+    "WHERE TABLE_SCHEMA = %s ORDER BY TABLE_NAME, ORDINAL_POSITION"
+)
+
+# Table references: FROM/JOIN/UPDATE/INTO name [AS] alias, plus comma-separated FROM lists
+TABLE_REF_RE = re.compile(
+    r"\b(?:FROM|JOIN|UPDATE|INTO)\s+((?:`?\w+`?\.)?`?\w+`?(?:\s+(?:AS\s+)?\w+)?"
+    r"(?:\s*,\s*(?:`?\w+`?\.)?`?\w+`?(?:\s+(?:AS\s+)?\w+)?)*)",
+    re.IGNORECASE,
+)
+TABLE_ITEM_RE = re.compile(
+    r"(?:`?\w+`?\.)?`?(\w+)`?(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE
+)
+# Words that can follow a table name but are never aliases
+NOT_ALIASES = {
+    "WHERE", "ON", "USING", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "OUTER",
+    "CROSS", "NATURAL", "GROUP", "ORDER", "HAVING", "LIMIT", "UNION", "SET",
+    "VALUES", "SELECT", "STRAIGHT_JOIN", "FOR", "WINDOW", "AS",
+}
+# The word being typed is a table name
+TABLE_CONTEXT_RE = re.compile(
+    r"\b(?:FROM|JOIN|UPDATE|INTO|TABLE|DESCRIBE|DESC)\s+"
+    r"(?:[\w`.]+(?:\s+(?:AS\s+)?\w+)?\s*,\s*)*$",
+    re.IGNORECASE,
+)
+
+
+class PrefixTrie:
+    """Case-insensitive prefix trie returning the original spelling of each word."""
+
+    def __init__(self, words=()):
+        self.root = {}
+        self.size = 0
+        for word in words:
+            self.insert(word)
+
+    def insert(self, word):
+        node = self.root
+        for char in word.lower():
+            node = node.setdefault(char, {})
+        if "" not in node:
+            self.size += 1
+        node[""] = word
+
+    def complete(self, prefix, limit=50):
+        """Up to `limit` words starting with `prefix`, shortest first."""
+        node = self.root
+        for char in prefix.lower():
+            node = node.get(char)
+            if node is None:
+                return []
+        results = []
+        level = [node]
+        while level and len(results) < limit:
+            next_level = []
+            for current in level:
+                for char in sorted(current):
+                    if char == "":
+                        results.append(current[""])
+                    else:
+                        next_level.append(current[char])
+            level = next_level
+        return results[:limit]
+
+
+class SchemaCatalog:
+    """Tables and columns of one database, with tries for completion."""
+
+    def __init__(self, tables=None, key="", loaded_at=None):
+        self.tables = tables or {}  # {table: [[column, type], ...]}
+        self.key = key
+        self.loaded_at = loaded_at
+        self.table_trie = PrefixTrie(self.tables)
+        self.column_trie = PrefixTrie(
+            name for columns in self.tables.values() for name, _ in columns
+        )
+        self._table_lookup = {name.lower(): name for name in self.tables}
+        self._column_tries = {}
+
+    def table_name(self, name):
+        return self._table_lookup.get(name.strip("`").lower())
+
+    def columns(self, table, prefix="", limit=200):
+        """Columns of `table` starting with `prefix`, in table order."""
+        table = self.table_name(table)
+        if table is None:
+            return []
+        if not prefix:
+            return [name for name, _ in self.tables[table]][:limit]
+        trie = self._column_tries.get(table)
+        if trie is None:
+            trie = self._column_tries[table] = PrefixTrie(
+                name for name, _ in self.tables[table]
+            )
+        return trie.complete(prefix, limit)
+
+    @staticmethod
+    def cache_path(key):
+        return app_data_path("schema", f"{key}.json")
+
+    @classmethod
+    def load_cached(cls, db_config):
+        key = profile_key(db_config)
+        try:
+            with open(cls.cache_path(key), "r", encoding="utf-8") as file:
+                cached = json.load(file)
+            return cls(cached["tables"], key=key, loaded_at=cached.get("loaded_at"))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @classmethod
+    def fetch(cls, db_config):
+        """Read every table and column of the configured database from INFORMATION_SCHEMA."""
+        tables = {}
+        with routed_connection(db_config, read_only=True) as (connection, _):
+            with connection.cursor() as cursor:
+                cursor.execute(COLUMNS_SQL, (db_config["database"],))
+                for table, column, column_type in cursor.fetchall():
+                    tables.setdefault(table, []).append([column, column_type])
+        return cls(tables, key=profile_key(db_config), loaded_at=time.time())
+
+    def save(self):
+        """Cache the catalog for this profile and publish it for the agent prompt builder."""
+        data = {"loaded_at": self.loaded_at, "tables": self.tables}
+        for path, payload in (
+            (self.cache_path(self.key), data),
+            (app_data_path("schema_catalog.json"), self.tables),
+        ):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(payload, file, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+
+def table_aliases(statement):
+    """Map aliases and table names referenced in `statement` to table names."""
+    aliases = {}
+    for ref in TABLE_REF_RE.finditer(statement):
+        for item in ref.group(1).split(","):
+            match = TABLE_ITEM_RE.match(item.strip())
+            if not match:
+                continue
+            table, alias = match.group(1), match.group(2)
+            aliases[table.lower()] = table
+            if alias and alias.upper() not in NOT_ALIASES:
+                aliases[alias.lower()] = table
+    return aliases
+
+
+def completions(catalog, keywords, text, position, limit=50):
+    """Suggestions for the word ending at `position` in `text`, and that word's prefix.
+
+    After `alias.` only that table's columns are offered; after FROM/JOIN and
+    similar only tables; elsewhere columns of the tables referenced by the
+    current statement come first, then keywords, tables and other columns.
+    """
+    line_start = text.rfind("\n", 0, position) + 1
+    word = re.search(r"[\w.`]*$", text[line_start:position]).group(0).replace("`", "")
+    statement_start = text.rfind(";", 0, position) + 1
+    statement_end = text.find(";", position)
+    statement = text[statement_start : statement_end if statement_end >= 0 else len(text)]
+
+    if "." in word:
+        qualifier, prefix = word.rsplit(".", 1)
+        qualifier = qualifier.split(".")[-1]
+        if catalog is None:
+            return [], prefix
+        table = table_aliases(statement).get(qualifier.lower()) or qualifier
+        return catalog.columns(table, prefix, limit), prefix
+
+    prefix = word
+    if not prefix:
+        return [], prefix
+    before = text[statement_start : position - len(prefix)]
+    if catalog is not None and TABLE_CONTEXT_RE.search(before[-200:]):
+        return catalog.table_trie.complete(prefix, limit), prefix
+
+    results = []
+    if catalog is not None:
+        for table in dict.fromkeys(table_aliases(statement).values()):
+            results.extend(catalog.columns(table, prefix, limit))
+    results.extend(keywords.complete(prefix, limit))
+    if catalog is not None:
+        results.extend(catalog.table_trie.complete(prefix, limit))
+        results.extend(catalog.column_trie.complete(prefix, limit))
+    return list(dict.fromkeys(results))[:limit], prefix
+
+
+class SchemaLoader(QThread):
+    """Background thread that loads the schema catalog for completion.
+
+    Emits `loaded` once with the disk cache (if any) for an instant start and
+    again after refreshing from INFORMATION_SCHEMA.
+    """
+
+    loaded = pyqtSignal(object)  # SchemaCatalog
+    error = pyqtSignal(str)
+    progress = pyqtSignal(str)
+
+    def __init__(self, db_config, use_cache=True):
+        super().__init__()
+        self.db_config = db_config
+        self.use_cache = use_cache
+
+    def run(self):
+        if self.use_cache:
+            cached = SchemaCatalog.load_cached(self.db_config)
+            if cached is not None:
+                self.loaded.emit(cached)
+        try:
+            self.progress.emit("กำลังโหลดโครงสร้างฐานข้อมูล...")
+            catalog = SchemaCatalog.fetch(self.db_config)
+            catalog.save()
+            self.loaded.emit(catalog)
+            column_count = sum(len(columns) for columns in catalog.tables.values())
+            self.progress.emit(
+                f"โหลดโครงสร้างฐานข้อมูลสำเร็จ: {len(catalog.tables):,} ตาราง {column_count:,} คอลัมน์"
+            )
+        except Exception as e:
+            self.error.emit(f"โหลดโครงสร้างฐานข้อมูลไม่สำเร็จ: {e}")
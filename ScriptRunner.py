@@ -0,0 +1,495 @@
+import re
+import time
+from decimal import Decimal
+
+import pandas as pd
+import pymysql
+import sqlparse
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+from sqlparse import tokens as T
+
+from ConnectionPool import get_pool, note_write
+from StatementClassifier import classify, statement_kind
+
+
+MYSQL_ESCAPES = {"0": "\0", "b": "\b", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a"}
+# Statements whose effect lasts for the rest of the connection's session
+SESSION_FIRST_WORDS = {
+    "SET", "USE", "LOCK", "UNLOCK", "PREPARE", "EXECUTE", "DEALLOCATE",
+    "START", "BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "HANDLER",
+}
+TRANSACTION_FIRST_WORDS = {"START", "BEGIN", "COMMIT", "ROLLBACK"}
+# Functions whose result depends on earlier statements on the same connection
+SESSION_FUNCTIONS = {
+    "LAST_INSERT_ID", "FOUND_ROWS", "ROW_COUNT", "CONNECTION_ID",
+    "GET_LOCK", "RELEASE_LOCK", "IS_USED_LOCK", "IS_FREE_LOCK",
+}
+
+
+def split_script(sql):
+    """Split a script into statements, dropping empty and comment-only pieces."""
+    statements = []
+    for statement in sqlparse.parse(sql):
+        if statement.token_first(skip_cm=True, skip_ws=True) is None:
+            continue
+        text = str(statement).strip()
+        if text:
+            statements.append(text)
+    return statements
+
+
+def _literal(token):
+    if token.ttype in T.Keyword and token.normalized == "NULL":
+        return None
+    if token.ttype in T.Number.Integer:
+        return int(token.value)
+    if token.ttype in T.Number:
+        return Decimal(token.value)
+    text = token.value[1:-1]
+    quote = token.value[0]
+    text = text.replace(quote * 2, quote)
+    return re.sub(r"\\(.)", lambda m: MYSQL_ESCAPES.get(m.group(1), m.group(1)), text)
+
+
+def insert_shape(sql):
+    """Return (template, params) for an INSERT whose VALUES are plain literals, else None.
+
+    Statements with the same template differ only in their values, so a run of
+    them can be sent with one `executemany`.
+    """
+    statement = sqlparse.parse(sql.rstrip().rstrip(";"))[0]
+    if statement.get_type() != "INSERT":
+        return None
+    parts, params = [], []
+    in_values = False
+    for token in statement.flatten():
+        if token.ttype in T.Comment:
+            continue
+        if token.ttype in T.Keyword and token.normalized in ("VALUES", "VALUE"):
+            in_values = True
+            parts.append(token.value)
+        elif not in_values:
+            if token.ttype in T.DML and token.normalized == "SELECT":
+                return None
+            parts.append(token.value.replace("%", "%%"))
+        elif (
+            token.ttype in T.Literal.String.Single
+            or token.ttype in T.Number
+            or (token.ttype in T.Keyword and token.normalized == "NULL")
+        ):
+            parts.append("%s")
+            params.append(_literal(token))
+        elif token.ttype in T.Punctuation or token.is_whitespace:
+            parts.append(token.value)
+        else:
+            # Functions, expressions or ON DUPLICATE KEY: keep the statement as-is
+            return None
+    if not in_values or not params:
+        return None
+    return re.sub(r"\s+", " ", "".join(parts)).strip(), tuple(params)
+
+
+def batch_units(statements):
+    """Group a run of write statements into execution units.
+
+    Each unit is (template, params_list, sources): consecutive INSERTs with the
+    same shape share one unit run by executemany; others have params_list None.
+    """
+    units = []
+    for sql in statements:
+        shape = insert_shape(sql)
+        if shape and units and units[-1][1] is not None and units[-1][0] == shape[0]:
+            units[-1][1].append(shape[1])
+            units[-1][2].append(sql)
+        elif shape:
+            units.append((shape[0], [shape[1]], [sql]))
+        else:
+            units.append((sql, None, [sql]))
+    return units
+
+
+def needs_session(statements):
+    """True when the statements depend on session state shared between them.
+
+    SET, USE, @variables, temporary tables, locks and functions such as
+    LAST_INSERT_ID() only work when every statement runs on one connection.
+    """
+    for sql in statements:
+        for statement in sqlparse.parse(sql):
+            tokens = [
+                token
+                for token in statement.flatten()
+                if not token.is_whitespace and token.ttype not in T.Comment
+            ]
+            if tokens and tokens[0].normalized.upper() in SESSION_FIRST_WORDS:
+                return True
+            for token in tokens:
+                if token.ttype in T.Operator and token.value.startswith("@"):
+                    return True
+                if token.is_keyword and token.normalized.upper() == "TEMPORARY":
+                    return True
+                if token.ttype in T.Name and token.value.upper() in SESSION_FUNCTIONS:
+                    return True
+    return False
+
+
+def plan_script(statements):
+    """Ordered steps of ("read", [sql...]), ("write", [sql...]) or ("ddl", [sql]).
+
+    Consecutive reads are independent of each other and may run in parallel;
+    everything after a write waits for that write to commit.
+    """
+    steps = []
+    for sql in statements:
+        kind = statement_kind(sql)
+        if kind != "ddl" and steps and steps[-1][0] == kind:
+            steps[-1][1].append(sql)
+        else:
+            steps.append((kind, [sql]))
+    return steps
+
+
+class ScriptExecutor(QThread):
+    """Background thread running a batch of write statements on one pooled connection.
+
+    Writes run in one transaction with a savepoint before each unit. On error
+    the unit is rolled back to its savepoint; the batch then either continues
+    (`continue_on_error`) or rolls back entirely.
+    """
+
+    statement_done = pyqtSignal(dict)  # {"sql", "kind", "rows", "ms", "error"}
+    finished = pyqtSignal(bool)  # committed
+    error = pyqtSignal(str)
+    progress = pyqtSignal(str)
+
+    def __init__(self, statements, db_config, transaction=True, continue_on_error=False):
+        super().__init__()
+        self.statements = statements
+        self.db_config = db_config
+        self.transaction = transaction
+        self.continue_on_error = continue_on_error
+
+    def _report(self, sources, rows, started, error="", kind="write"):
+        elapsed = (time.perf_counter() - started) * 1000
+        for sql in sources:
+            self.statement_done.emit(
+                {
+                    "sql": sql,
+                    "kind": kind,
+                    "rows": rows if len(sources) == 1 else None,
+                    "ms": round(elapsed / len(sources), 2),
+                    "batched": len(sources) if len(sources) > 1 else None,
+                    "error": error,
+                }
+            )
+
+    def _run_batch(self, connection, cursor, statements, kind, transaction):
+        """Run the `kind` statements on `connection`; True when one of them failed.
+
+        With `transaction` they are batched into units in one transaction,
+        which is rolled back after a failure unless `continue_on_error`.
+        """
+        units = batch_units(statements) if transaction else [(sql, None, [sql]) for sql in statements]
+        failed = False
+        if transaction:
+            connection.begin()
+        for number, (sql, params_list, sources) in enumerate(units, start=1):
+            self.progress.emit(f"กำลังรันคำสั่งแก้ไขข้อมูล {number}/{len(units)}...")
+            started = time.perf_counter()
+            if transaction:
+                cursor.execute(f"SAVEPOINT aisql_{number}")
+            try:
+                if params_list is None:
+                    rows = cursor.execute(sql)
+                else:
+                    rows = cursor.executemany(sql, params_list)
+            except pymysql.MySQLError as e:
+                if transaction:
+                    cursor.execute(f"ROLLBACK TO SAVEPOINT aisql_{number}")
+                self._report(sources, None, started, str(e), kind)
+                failed = True
+                if not self.continue_on_error:
+                    break
+                continue
+            self._report(sources, rows, started, kind=kind)
+
+        if transaction:
+            if failed and not self.continue_on_error:
+                connection.rollback()
+            else:
+                connection.commit()
+        return failed
+
+    def run(self):
+        try:
+            with get_pool(self.db_config).connection() as connection:
+                with connection.cursor() as cursor:
+                    failed = self._run_batch(
+                        connection,
+                        cursor,
+                        self.statements,
+                        "write" if self.transaction else "ddl",
+                        self.transaction,
+                    )
+            if self.transaction and failed and not self.continue_on_error:
+                self.finished.emit(False)
+                return
+            note_write(self.db_config)
+            self.finished.emit(not failed or self.continue_on_error)
+        except Exception as e:
+            self.error.emit(f"เกิดข้อผิดพลาดในการรันสคริปต์: {str(e)}")
+
+
+class SessionScriptExecutor(ScriptExecutor):
+    """Run a whole script in order on one connection to the primary.
+
+    For scripts that set up session state (see `needs_session`), which would
+    be lost across the separate pooled and replica connections of a parallel
+    run. Writes are batched as in ScriptExecutor; each SELECT returns at most
+    `max_rows` rows through `result_ready`. The connection is closed afterwards
+    so its session state never reaches a pooled query.
+    """
+
+    result_ready = pyqtSignal(str, list, list)  # sql, rows, columns
+
+    def __init__(self, statements, db_config, continue_on_error=False, max_rows=100000):
+        super().__init__(statements, db_config, continue_on_error=continue_on_error)
+        self.max_rows = max_rows
+        self._cancelled = False
+
+    def cancel(self):
+        """Stop before the next step; a batch in progress still commits or rolls back."""
+        self._cancelled = True
+
+    def _run_read(self, connection, sql):
+        """Run one SELECT; True when it failed."""
+        started = time.perf_counter()
+        try:
+            # Unbuffered so only max_rows are held; closing the cursor reads past the rest
+            with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+                cursor.execute(sql)
+                rows = list(cursor.fetchmany(self.max_rows))
+                columns = [desc[0] for desc in cursor.description] if cursor.description else []
+        except pymysql.MySQLError as e:
+            self._report([sql], None, started, str(e), "read")
+            return True
+        self._report([sql], len(rows), started, kind="read")
+        self.result_ready.emit(sql, rows, columns)
+        return False
+
+    def run(self):
+        try:
+            # A script with its own BEGIN/COMMIT is run as written
+            own_transactions = any(
+                TRANSACTION_FIRST_WORDS.intersection(classify(sql).first_words) for sql in self.statements
+            )
+            pool = get_pool(self.db_config)
+            connection = pool.acquire()
+            failed = False
+            try:
+                with connection.cursor() as cursor:
+                    for kind, statements in plan_script(self.statements):
+                        if self._cancelled:
+                            break
+                        if kind == "read":
+                            for sql in statements:
+                                failed = self._run_read(connection, sql) or failed
+                                if failed and not self.continue_on_error:
+                                    break
+                        else:
+                            transaction = kind == "write" and not own_transactions
+                            failed = self._run_batch(connection, cursor, statements, kind, transaction) or failed
+                        if failed and not self.continue_on_error:
+                            break
+            finally:
+                pool.release(connection, discard=True)
+            note_write(self.db_config)
+            self.finished.emit(not failed or self.continue_on_error)
+        except Exception as e:
+            self.error.emit(f"เกิดข้อผิดพลาดในการรันสคริปต์: {str(e)}")
+
+
+class ScriptRun(QObject):
+    """Run a multi-statement script step by step.
+
+    Each read step opens one result tab per SELECT and runs them concurrently
+    through the query scheduler; write steps run in a ScriptExecutor. Scripts
+    that rely on session state run entirely in one SessionScriptExecutor
+    instead. A log tab lists every statement with its type, row count, time
+    and error. Closing the log tab stops the script; closing a read tab
+    counts its SELECT as cancelled.
+    """
+
+    progress = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(
+        self,
+        statements,
+        db_config,
+        scheduler,
+        open_tab,
+        log_tab,
+        continue_on_error=False,
+        max_rows=100000,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.statement_count = len(statements)
+        self.session = needs_session(statements)
+        self.steps = plan_script(statements)
+        self.db_config = db_config
+        self.scheduler = scheduler
+        self.open_tab = open_tab
+        self.log_tab = log_tab
+        self.continue_on_error = continue_on_error
+        self.max_rows = max_rows
+        self.log = []
+        self.started_at = None
+        self._pending_tabs = set()
+        self._executor = None
+        self._stopped = False
+        log_tab.closing.connect(lambda: self.tab_closed(log_tab))
+        log_tab.destroyed.connect(self._forget_log_tab)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        if self.session:
+            self._run_session()
+        else:
+            self._next_step()
+
+    def _forget_log_tab(self, *args):
+        self.log_tab = None
+
+    def _set_status(self, message):
+        if self.log_tab is not None:
+            self.log_tab.set_status(message)
+
+    def tab_closed(self, tab):
+        """Called when one of the script's tabs is about to close."""
+        if tab is self.log_tab:
+            self.log_tab = None
+            self._stopped = True
+            if isinstance(self._executor, SessionScriptExecutor):
+                self._executor.cancel()
+        elif tab in self._pending_tabs:
+            self._pending_tabs.discard(tab)
+            self._record(
+                {"sql": tab.sql, "kind": "read", "rows": None, "ms": 0, "error": "ปิดแท็บก่อนได้ผลลัพธ์"}
+            )
+            if not self._pending_tabs:
+                self._next_step()
+
+    def _record(self, entry):
+        self.log.append(entry)
+        if entry["error"] and not self.continue_on_error:
+            self._stopped = True
+        if self.log_tab is None:
+            return
+        frame = pd.DataFrame(
+            [
+                [
+                    number,
+                    item["kind"],
+                    " ".join(item["sql"].split())[:120],
+                    "" if item["rows"] is None else item["rows"],
+                    item["ms"],
+                    f"executemany x{item['batched']}" if item.get("batched") else "",
+                    item["error"] or "OK",
+                ]
+                for number, item in enumerate(self.log, start=1)
+            ],
+            columns=["#", "type", "statement", "rows", "ms", "batch", "status"],
+        )
+        self.log_tab.show_dataframe(frame, frame.values.tolist(), list(frame.columns))
+
+    def _forget_executor(self):
+        # Its signals are emitted from run(); let the thread end before the last reference goes
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.wait()
+
+    def _next_step(self):
+        self._forget_executor()
+        if self._stopped or not self.steps:
+            total = (time.perf_counter() - self.started_at) * 1000
+            errors = sum(1 for item in self.log if item["error"])
+            skipped = self.statement_count - sum(1 for item in self.log if item["sql"])
+            if self.log_tab is not None:
+                self.log_tab.set_status(
+                    f"รันสคริปต์เสร็จ {len(self.log)} คำสั่ง ผิดพลาด {errors} ข้าม {skipped} ใช้เวลา {total:,.0f} ms"
+                )
+                self.log_tab.running = False
+                self.log_tab.state_changed.emit()
+            self.steps = []
+            self.finished.emit()
+            return
+
+        kind, statements = self.steps.pop(0)
+        if kind == "read":
+            for sql in statements:
+                tab = self.open_tab(sql)
+                # Never stop a script to ask; oversized SELECTs show a preview
+                tab.large_result_choice = ("preview", None)
+                self._pending_tabs.add(tab)
+                tab.state_changed.connect(lambda tab=tab, sql=sql: self._on_read_done(tab, sql))
+                tab.closing.connect(lambda tab=tab: self.tab_closed(tab))
+                tab.start_query(sql, self.db_config, self.scheduler, source="script")
+            return
+
+        self._start_executor(
+            ScriptExecutor(
+                statements,
+                self.db_config,
+                transaction=kind == "write",
+                continue_on_error=self.continue_on_error,
+            )
+        )
+
+    def _run_session(self):
+        """Run every statement in order on one connection, keeping session state."""
+        statements = [sql for _, step in self.steps for sql in step]
+        self.steps = []
+        self._set_status("สคริปต์ใช้ตัวแปรหรือสถานะของ session: รันทีละคำสั่งบนการเชื่อมต่อเดียว")
+        executor = SessionScriptExecutor(
+            statements,
+            self.db_config,
+            continue_on_error=self.continue_on_error,
+            max_rows=self.max_rows,
+        )
+        executor.result_ready.connect(self._show_session_result)
+        self._start_executor(executor)
+
+    def _start_executor(self, executor):
+        self._executor = executor
+        executor.statement_done.connect(self._record)
+        executor.progress.connect(self._set_status)
+        executor.finished.connect(lambda committed: self._next_step())
+        executor.error.connect(self._on_executor_error)
+        executor.start()
+
+    def _show_session_result(self, sql, rows, columns):
+        if not self._stopped:
+            self.open_tab(sql).show_results(sql, rows, columns, source="script")
+
+    def _on_executor_error(self, error_message):
+        self._record({"sql": "", "kind": "write", "rows": None, "ms": 0, "error": error_message})
+        self._stopped = True
+        self._next_step()
+
+    def _on_read_done(self, tab, sql):
+        if tab.running or tab not in self._pending_tabs:
+            return
+        self._pending_tabs.discard(tab)
+        self._record(
+            {
+                "sql": sql,
+                "kind": "read",
+                "rows": len(tab.results_data) if not tab.error else None,
+                "ms": round((tab.elapsed or 0) * 1000, 2),
+                "error": tab.error,
+            }
+        )
+        if not self._pending_tabs:
+            self._next_step()
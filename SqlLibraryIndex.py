@@ -0,0 +1,162 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+from AppData import app_data_path
+
+
+NGRAM_SIZES = (2, 3)
+# Filenames describe the question in Thai, so they weigh more than the SQL text
+NAME_WEIGHT = 3
+
+
+def char_ngrams(text):
+    """Character n-gram counts of `text`; works for Thai, which has no word spaces."""
+    text = re.sub(r"[\s_\-`'\"(),.;]+", " ", text.lower()).strip()
+    grams = Counter()
+    for size in NGRAM_SIZES:
+        for start in range(len(text) - size + 1):
+            gram = text[start : start + size]
+            if gram.strip():
+                grams[gram] += 1
+    return grams
+
+
+class SqlLibraryIndex:
+    """TF-IDF index over the vetted queries in `sql/*.sql` and their filenames.
+
+    Term counts are cached per file (keyed by mtime and size) in appdata, so
+    a refresh only re-reads files that changed.
+    """
+
+    def __init__(self, sql_dir=None, cache_path=None):
+        self.sql_dir = sql_dir or os.path.join(os.getcwd(), "sql")
+        self.cache_path = cache_path or app_data_path("sql_index.json")
+        self._lock = threading.Lock()
+        self.files = {}
+        self.idf = {}
+        self.norms = {}
+        self._load_cache()
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as file:
+                cached = json.load(file)
+            if cached.get("sql_dir") == self.sql_dir:
+                self.files = cached.get("files", {})
+        except (OSError, ValueError):
+            self.files = {}
+
+    def _save_cache(self):
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"sql_dir": self.sql_dir, "files": self.files}, file, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
+
+    def refresh(self):
+        """Re-index new or modified files and drop deleted ones."""
+        with self._lock:
+            try:
+                names = [n for n in os.listdir(self.sql_dir) if n.lower().endswith(".sql")]
+            except OSError:
+                names = []
+
+            changed = False
+            for name in set(self.files) - set(names):
+                del self.files[name]
+                changed = True
+
+            for name in names:
+                path = os.path.join(self.sql_dir, name)
+                stat = os.stat(path)
+                entry = self.files.get(name)
+                if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                    continue
+                with open(path, "r", encoding="utf-8", errors="replace") as file:
+                    sql = file.read()
+                terms = char_ngrams(sql)
+                for gram, count in char_ngrams(os.path.splitext(name)[0]).items():
+                    terms[gram] += count * NAME_WEIGHT
+                self.files[name] = {
+                    "mtime": stat.st_mtime,
+                    "size": stat.st_size,
+                    "sql": sql,
+                    "terms": dict(terms),
+                }
+                changed = True
+
+            if changed or not self.idf:
+                self._rebuild_weights()
+            if changed:
+                self._save_cache()
+
+    def _rebuild_weights(self):
+        doc_freq = Counter()
+        for entry in self.files.values():
+            doc_freq.update(entry["terms"].keys())
+        total = len(self.files)
+        self.idf = {gram: math.log((1 + total) / (1 + df)) + 1 for gram, df in doc_freq.items()}
+        self.norms = {
+            name: math.sqrt(
+                sum((count * self.idf[gram]) ** 2 for gram, count in entry["terms"].items())
+            )
+            for name, entry in self.files.items()
+        }
+
+    def search(self, question, k=3, min_score=0.1):
+        """Return up to `k` (score, filename, sql) tuples most similar to `question`."""
+        self.refresh()
+        query = {
+            gram: count * self.idf[gram]
+            for gram, count in char_ngrams(question).items()
+            if gram in self.idf
+        }
+        query_norm = math.sqrt(sum(weight**2 for weight in query.values()))
+        if not query_norm:
+            return []
+
+        scores = []
+        with self._lock:
+            for name, entry in self.files.items():
+                terms = entry["terms"]
+                dot = sum(weight * terms.get(gram, 0) * self.idf[gram] for gram, weight in query.items())
+                norm = self.norms.get(name) or 1.0
+                score = dot / (query_norm * norm)
+                if score >= min_score:
+                    scores.append((score, name, entry["sql"]))
+        scores.sort(reverse=True)
+        return scores[:k]
+
+
+_library = None
+
+
+def get_sql_library():
+    """Shared index over the working directory's `sql/` folder."""
+    global _library
+    if _library is None:
+        _library = SqlLibraryIndex()
+    return _library
+
+
+FEW_SHOT_HEADER = "ตัวอย่างคำสั่ง SQL ที่ผ่านการตรวจสอบแล้วจากคลัง sql/ ที่คล้ายกับคำถามนี้ ใช้เป็นแนวทางการ JOIN และเงื่อนไขได้เลยโดยไม่ต้องสำรวจตารางซ้ำ:"
+
+
+def few_shot_examples(question, k=3):
+    """The top-k similar saved queries, best first, each formatted as one example block."""
+    if k <= 0:
+        return []
+    return [
+        f"-- {os.path.splitext(name)[0]} (similarity {score:.2f})\n{sql.strip()}"
+        for score, name, sql in get_sql_library().search(question, k=k)
+    ]
+
+
+def few_shot_context(examples):
+    """Format example blocks from `few_shot_examples` as extra agent instructions."""
+    if not examples:
+        return ""
+    return "\n\n".join([FEW_SHOT_HEADER] + examples)
@@ -0,0 +1,238 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+import sqlparse
+from sqlparse import tokens as T
+
+
+READ_FIRST_WORDS = {"SELECT", "WITH", "SHOW", "DESCRIBE", "DESC", "EXPLAIN"}
+# Statements that only describe something; their bodies (EXPLAIN UPDATE ...) never run
+METADATA_FIRST_WORDS = {"SHOW", "DESCRIBE", "DESC", "EXPLAIN"}
+# ...except EXPLAIN ANALYZE, which runs the statement it explains
+EXECUTING_SECOND_WORDS = {"ANALYZE"}
+# MySQL commits implicitly around these, so they can never share a transaction
+DDL_FIRST_WORDS = {"CREATE", "ALTER", "DROP", "TRUNCATE", "RENAME", "GRANT", "REVOKE"}
+WRITE_DML = {"INSERT", "UPDATE", "DELETE", "REPLACE", "MERGE", "UPSERT"}
+# Keywords after which a table name follows
+TABLE_KEYWORDS = {"FROM", "INTO", "UPDATE", "TABLE"}
+TARGET_KEYWORDS = {"INTO", "UPDATE", "TABLE"}
+# Modifiers that may sit between such a keyword and the table name
+TABLE_MODIFIERS = {"IF", "NOT", "EXISTS", "IGNORE", "LOW_PRIORITY", "DELAYED", "HIGH_PRIORITY", "QUICK", "ONLY"}
+# Scripts above this size are classified without keeping them in the cache
+MAX_CACHED_LENGTH = 64 * 1024
+
+LIST_RE = re.compile(r"\?(?:\s*,\s*\?)+")
+ROWS_RE = re.compile(r"\(\?\+?\)(?:\s*,\s*\(\?\+?\))+")
+
+
+@dataclass(frozen=True)
+class Classification:
+    """What a piece of SQL does, derived from its tokens rather than substrings.
+
+    `kind` is "read", "write", "ddl" or "empty"; for several statements it is
+    the strongest kind among them. `reason` names the keyword that made the
+    SQL a write (e.g. "UPDATE", "INTO"), and `fingerprint` is the SQL with
+    literals replaced by `?` so repeated queries group together.
+    """
+
+    kind: str
+    statements: tuple
+    kinds: tuple
+    first_words: tuple
+    tables: frozenset  # every table referenced
+    targets: frozenset  # tables written or altered
+    reason: str
+    locking: bool  # SELECT ... FOR UPDATE / LOCK IN SHARE MODE
+    limit: object  # row count of the last LIMIT, or None
+    fingerprint: str
+
+    @property
+    def multi(self):
+        return len(self.statements) > 1
+
+    @property
+    def is_read(self):
+        return self.kind == "read"
+
+    @property
+    def is_write(self):
+        return self.kind in ("write", "ddl")
+
+    @property
+    def needs_primary(self):
+        """Writes and locking reads must run on the primary server."""
+        return self.is_write or self.locking
+
+    @property
+    def digest(self):
+        return hashlib.sha1(self.fingerprint.encode("utf-8")).hexdigest()[:16]
+
+
+def _table_name(tokens, index):
+    """The (unquoted) table name starting at tokens[index] and the index after it."""
+    name = tokens[index].value.strip("`")
+    index += 1
+    while (
+        index + 1 < len(tokens)
+        and tokens[index].match(T.Punctuation, ".")
+        and tokens[index + 1].ttype in T.Name
+    ):
+        name = tokens[index + 1].value.strip("`")
+        index += 2
+    return name, index
+
+
+def _scan(statement):
+    """Classify one parsed statement: (kind, first word, tables, targets, reason, locking, limit, fingerprint)."""
+    tokens = [
+        token
+        for token in statement.flatten()
+        if not token.is_whitespace and token.ttype not in T.Comment
+    ]
+    words = [token for token in tokens if token.ttype not in T.Punctuation]
+    first = words[0].normalized.upper() if words else ""
+    metadata = first in METADATA_FIRST_WORDS and not (
+        len(words) > 1 and words[1].normalized.upper() in EXECUTING_SECOND_WORDS
+    )
+
+    kind, reason = "read", ""
+    if first in DDL_FIRST_WORDS:
+        kind, reason = "ddl", first
+    elif first not in READ_FIRST_WORDS:
+        kind, reason = "write", first
+
+    tables, targets = [], []
+    locking = False
+    limit = None
+    expecting = None  # keyword whose table name comes next
+    from_list = False
+    delete_from = first == "DELETE"
+    previous = ""
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        word = token.normalized.upper() if token.is_keyword else ""
+
+        if expecting and token.ttype in T.Name:
+            name, index = _table_name(tokens, index)
+            tables.append(name)
+            if metadata:
+                pass
+            elif expecting in TARGET_KEYWORDS or (expecting == "FROM" and delete_from):
+                targets.append(name)
+            from_list = expecting in ("FROM", "JOIN")
+            expecting = None
+            continue
+        if expecting and word in TABLE_MODIFIERS:
+            index += 1
+            continue
+        expecting = None
+
+        if token.match(T.Punctuation, ","):
+            if from_list:
+                expecting = "FROM"
+        elif token.ttype in T.Name and from_list:
+            pass  # alias
+        elif token.is_keyword:
+            from_list = False
+            if not metadata and kind == "read":
+                if token.ttype in T.Keyword.DML and word in WRITE_DML and previous != "FOR":
+                    kind, reason = "write", word
+                elif token.ttype in T.Keyword.DDL:
+                    kind, reason = "ddl", word
+                elif word == "INTO":
+                    kind, reason = "write", word
+            if word in ("UPDATE", "SHARE") and previous == "FOR":
+                locking = True
+            elif word == "MODE" and previous == "SHARE":
+                locking = True
+            elif word == "LIMIT":
+                numbers = []
+                for following in tokens[index + 1 : index + 4]:
+                    if following.ttype in T.Number.Integer:
+                        numbers.append(int(following.value))
+                    elif not following.match(T.Punctuation, ","):
+                        break
+                limit = numbers[-1] if numbers else None
+            elif word in TABLE_KEYWORDS or word.endswith("JOIN") or (
+                index == 0 and word in ("DESCRIBE", "DESC")
+            ):
+                if not (word == "UPDATE" and previous == "FOR"):
+                    expecting = "JOIN" if word.endswith("JOIN") else word
+            elif word == "DELETE" and token.ttype in T.Keyword.DML:
+                # WITH ... DELETE FROM t: the DELETE is not the first word
+                delete_from = True
+            elif word == "WHERE" or word == "USING":
+                delete_from = False
+            previous = word
+        index += 1
+
+    fingerprint = []
+    for token in tokens:
+        if token.ttype in T.Literal.String or token.ttype in T.Number:
+            fingerprint.append("?")
+        elif token.is_keyword:
+            fingerprint.append(token.normalized.upper())
+        else:
+            fingerprint.append(token.value)
+    text = " ".join(fingerprint).replace(" . ", ".").replace("( ", "(").replace(" )", ")")
+    text = ROWS_RE.sub("(?+)+", LIST_RE.sub("?+", text.replace(" ,", ",")))
+    return kind, first, tables, targets, reason, locking, limit, text.rstrip("; ")
+
+
+def _classify(sql):
+    statements, kinds, first_words = [], [], []
+    tables, targets, fingerprints = [], [], []
+    reason, locking, limit = "", False, None
+    for statement in sqlparse.parse(sql):
+        if statement.token_first(skip_cm=True, skip_ws=True) is None:
+            continue
+        kind, first, used, written, why, locks, rows, fingerprint = _scan(statement)
+        statements.append(str(statement).strip())
+        kinds.append(kind)
+        first_words.append(first)
+        tables.extend(used)
+        targets.extend(written)
+        fingerprints.append(fingerprint)
+        reason = reason or why
+        locking = locking or locks
+        limit = rows
+
+    if not kinds:
+        overall = "empty"
+    elif "ddl" in kinds:
+        overall = "ddl"
+    elif "write" in kinds:
+        overall = "write"
+    else:
+        overall = "read"
+    return Classification(
+        kind=overall,
+        statements=tuple(statements),
+        kinds=tuple(kinds),
+        first_words=tuple(first_words),
+        tables=frozenset(tables),
+        targets=frozenset(targets),
+        reason=reason,
+        locking=locking,
+        limit=limit,
+        fingerprint="; ".join(fingerprints),
+    )
+
+
+_classify_cached = lru_cache(maxsize=2048)(_classify)
+
+
+def classify(sql):
+    """Classify `sql` (one statement or a script); results are cached per text."""
+    if len(sql) > MAX_CACHED_LENGTH:
+        return _classify(sql)
+    return _classify_cached(sql)
+
+
+def statement_kind(sql):
+    """"read", "write" or "ddl" for a single statement."""
+    kind = classify(sql).kind
+    return "write" if kind == "empty" else kind
@@ -0,0 +1,130 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from pydantic_ai.toolsets import WrapperToolset
+
+from StatementClassifier import METADATA_FIRST_WORDS, classify
+
+
+# Tool names that only read metadata or samples (built-in DbToolset and common MCP names)
+CACHEABLE_TOOL_RE = re.compile(r"(list|describe|show|schema|sample|tables|columns)", re.I)
+# Arguments that are SQL statements rather than names or plain text
+SQL_ARG_RE = re.compile(
+    r"^\s*(SELECT|WITH|DESC|DESCRIBE|SHOW|EXPLAIN|INSERT|UPDATE|DELETE|REPLACE|ALTER|CREATE|DROP|TRUNCATE)\b",
+    re.I,
+)
+
+
+def is_cacheable(name, tool_args):
+    """Decide whether a tool call is an idempotent metadata or sample lookup.
+
+    SQL arguments must be a single read statement that is either metadata
+    (SHOW/DESCRIBE/EXPLAIN) or a LIMITed sample.
+    """
+    sql_args = [
+        value
+        for value in tool_args.values()
+        if isinstance(value, str) and SQL_ARG_RE.match(value)
+    ]
+    if not sql_args:
+        return bool(CACHEABLE_TOOL_RE.search(name))
+    for sql in sql_args:
+        statement = classify(sql)
+        if not statement.is_read or statement.multi or statement.locking:
+            return False
+        if statement.first_words[0] not in METADATA_FIRST_WORDS and statement.limit is None:
+            return False
+    return True
+
+
+class ToolResultCache:
+    """Thread-safe LRU cache with a TTL, shared across chat sessions."""
+
+    def __init__(self, max_size=256, ttl=600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, max_size=None, ttl=None):
+        with self._lock:
+            if max_size is not None:
+                self.max_size = max_size
+            if ttl is not None:
+                self.ttl = ttl
+            self._evict()
+
+    @property
+    def enabled(self):
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, key):
+        """Return (found, value) and count the lookup as a hit or miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        while len(self._entries) > max(self.max_size, 0):
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+tool_cache = ToolResultCache()
+
+
+@dataclass
+class CachingToolset(WrapperToolset):
+    """Memoize idempotent tool calls of the wrapped toolset in `tool_cache`.
+
+    `scope` identifies the database behind the toolset so results of one
+    connection are never served for another.
+    """
+
+    scope: str = ""
+    cache: ToolResultCache = field(default_factory=lambda: tool_cache)
+    hits: int = 0
+    misses: int = 0
+
+    async def call_tool(self, name, tool_args, ctx, tool):
+        if not self.cache.enabled or not is_cacheable(name, tool_args):
+            return await self.wrapped.call_tool(name, tool_args, ctx, tool)
+
+        key = (self.scope, name, json.dumps(tool_args, sort_keys=True, default=str))
+        found, value = self.cache.get(key)
+        if found:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = await self.wrapped.call_tool(name, tool_args, ctx, tool)
+        self.cache.put(key, value)
+        return value
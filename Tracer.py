@@ -0,0 +1,160 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from pydantic_ai.messages import ModelMessagesTypeAdapter
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.toolsets import WrapperToolset
+
+from AppData import app_data_path
+from LatencyStats import percentile
+
+
+_current_trace = contextvars.ContextVar("aisql_trace_id", default=None)
+_current_span = contextvars.ContextVar("aisql_span_id", default=None)
+
+
+class Tracer:
+    """Local span recorder writing to a size-rotated JSONL file (no outside service).
+
+    Each span is one JSON line with its stage, model, duration and any extra
+    attributes such as token counts and payload sizes.
+    """
+
+    def __init__(self, path=None, max_bytes=5 * 1024 * 1024, backups=3):
+        self._path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        if self._path is None:
+            self._path = app_data_path("traces", "spans.jsonl")
+        return self._path
+
+    @path.setter
+    def path(self, value):
+        with self._lock:
+            self._path = value
+
+    @staticmethod
+    def new_trace_id():
+        return uuid.uuid4().hex[:16]
+
+    @contextmanager
+    def span(self, stage, trace_id=None, model=None, **attrs):
+        """Time a block; the yielded dict can be filled with more attributes."""
+        trace_id = trace_id or _current_trace.get() or self.new_trace_id()
+        span_id = uuid.uuid4().hex[:8]
+        record = {
+            "trace_id": trace_id,
+            "span_id": span_id,
+            "parent_id": _current_span.get(),
+            "stage": stage,
+            "model": model,
+            "start": time.time(),
+        }
+        trace_token = _current_trace.set(trace_id)
+        span_token = _current_span.set(span_id)
+        started = time.perf_counter()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs["error"] = type(e).__name__
+            raise
+        finally:
+            record["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            record.update(attrs)
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            self.write(record)
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            try:
+                if os.path.getsize(self.path) + len(line) > self.max_bytes:
+                    self._rotate()
+            except OSError:
+                pass
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(line)
+
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def read_spans(self):
+        """Yield every stored span, oldest file first."""
+        paths = [f"{self.path}.{i}" for i in range(self.backups, 0, -1)] + [self.path]
+        for path in paths:
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    for line in file:
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            continue
+            except OSError:
+                continue
+
+    def trace_spans(self, trace_id):
+        """Return the stored spans of one trace."""
+        return [span for span in self.read_spans() if span.get("trace_id") == trace_id]
+
+    def summary(self):
+        """Rows of (stage, model, count, p50 ms, p95 ms) over the stored spans."""
+        durations = defaultdict(list)
+        for span in self.read_spans():
+            durations[(span.get("stage"), span.get("model") or "")].append(
+                span.get("duration_ms", 0)
+            )
+        return [
+            (stage, model, len(values), percentile(values, 50), percentile(values, 95))
+            for (stage, model), values in sorted(durations.items())
+        ]
+
+
+tracer = Tracer()
+
+
+@dataclass(init=False)
+class TracedModel(WrapperModel):
+    """Record a `model_request` span with token counts and payload sizes."""
+
+    async def request(self, messages, model_settings, model_request_parameters):
+        with tracer.span("model_request", model=self.model_name) as attrs:
+            attrs["request_bytes"] = len(ModelMessagesTypeAdapter.dump_json(messages))
+            response = await self.wrapped.request(
+                messages, model_settings, model_request_parameters
+            )
+            attrs["request_tokens"] = response.usage.request_tokens
+            attrs["response_tokens"] = response.usage.response_tokens
+            attrs["response_bytes"] = len(
+                ModelMessagesTypeAdapter.dump_json([response])
+            )
+            return response
+
+
+@dataclass
+class TracingToolset(WrapperToolset):
+    """Record a `tool_call` span for every call to the wrapped toolset."""
+
+    async def call_tool(self, name, tool_args, ctx, tool):
+        with tracer.span("tool_call", model=ctx.model.model_name, tool=name) as attrs:
+            attrs["args_bytes"] = len(json.dumps(tool_args, default=str))
+            result = await self.wrapped.call_tool(name, tool_args, ctx, tool)
+            attrs["result_bytes"] = len(
+                result if isinstance(result, str) else json.dumps(result, default=str)
+            )
+            return result
@@ -0,0 +1,175 @@
+"""Offline benchmark for AgentDataWorker with scripted models and local tools.
+
+No LLM or remote MCP server is needed: every question in questions.json is
+answered by a pydantic-ai FunctionModel that replays its scripted tool calls,
+and the tools run against SQLite fixtures mimicking person/house/village/ovst.
+
+Usage:
+    python bench/agent_bench.py                    # built-in DbToolset on SQLite
+    python bench/agent_bench.py --toolset mcp      # through the local SSE stand-in
+    python bench/agent_bench.py --repeat 5 --json bench_result.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # AgentDataWorker reads sys_prompt.txt from the working directory
+
+from pydantic_ai.messages import ModelMessagesTypeAdapter, ModelResponse, ToolCallPart
+from pydantic_ai.models.function import FunctionModel
+
+from AgentDataWorker import AgentDataWorker
+from DbToolset import DbToolset
+from LatencyStats import percentile
+from Tracer import tracer
+from bench.fixtures import build_fixture_db
+
+
+def scripted_model(item):
+    """A FunctionModel that issues the item's tool calls one per request, then answers."""
+    steps = [ToolCallPart(name, args) for name, args in item["tool_calls"]]
+
+    async def respond(messages, info):
+        if steps:
+            return ModelResponse(parts=[steps.pop(0)])
+        output = {"sql": item.get("sql", ""), "answer": item.get("answer", "")}
+        return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, output)])
+
+    return FunctionModel(respond, model_name="scripted")
+
+
+def wait_for_port(host, port, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"MCP stand-in did not start on {host}:{port}")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_question(item, history, toolset, cache_size):
+    """Drive one AgentDataWorker turn headlessly and collect its metrics."""
+    outcome = {}
+    started = time.perf_counter()
+    worker = AgentDataWorker(
+        scripted_model(item),
+        item["question"],
+        history,
+        toolset=toolset,
+        cache_size=cache_size,
+    )
+    setup_ms = (time.perf_counter() - started) * 1000
+    worker.signal_finished.connect(lambda text: outcome.setdefault("output", text))
+    worker.signal_error.connect(lambda text: outcome.setdefault("error", text))
+
+    started = time.perf_counter()
+    asyncio.run(worker.chat())  # same as QThread.run, without the thread
+    chat_ms = (time.perf_counter() - started) * 1000
+
+    spans = tracer.trace_spans(worker.trace_id)
+    tool_spans = [span for span in spans if span["stage"] == "tool_call"]
+    model_spans = [span for span in spans if span["stage"] == "model_request"]
+    tool_ms = sum(span["duration_ms"] for span in tool_spans)
+    model_ms = sum(span["duration_ms"] for span in model_spans)
+    messages = worker.new_message_history
+    return messages, {
+        "question": item["question"],
+        "setup_ms": round(setup_ms, 2),
+        "chat_ms": round(chat_ms, 2),
+        "tool_ms": round(tool_ms, 2),
+        "overhead_ms": round(chat_ms - tool_ms - model_ms, 2),
+        "tool_calls": len(tool_spans),
+        "model_requests": len(model_spans),
+        "history_messages": len(messages),
+        "history_bytes": len(ModelMessagesTypeAdapter.dump_json(messages)),
+        "error": outcome.get("error"),
+    }
+
+
+def print_report(rows):
+    header = f"{'question':<36}{'setup':>8}{'chat':>9}{'tools':>9}{'ovh':>9}{'calls':>6}{'msgs':>6}{'hist KB':>9}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(
+            f"{row['question'][:34]:<36}{row['setup_ms']:>8.1f}{row['chat_ms']:>9.1f}"
+            f"{row['tool_ms']:>9.1f}{row['overhead_ms']:>9.1f}{row['tool_calls']:>6}"
+            f"{row['history_messages']:>6}{row['history_bytes'] / 1024:>9.1f}"
+            + ("  ERROR" if row["error"] else "")
+        )
+    print("-" * len(header))
+    for key in ("setup_ms", "chat_ms", "overhead_ms"):
+        values = [row[key] for row in rows]
+        print(f"{key:<12} p50 {percentile(values, 50):>8.1f} ms   p95 {percentile(values, 95):>8.1f} ms")
+    print(f"tool calls   total {sum(row['tool_calls'] for row in rows)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline AgentDataWorker benchmark")
+    parser.add_argument("--toolset", choices=["builtin", "mcp"], default="builtin")
+    parser.add_argument("--questions", default=os.path.join(ROOT, "bench", "questions.json"))
+    parser.add_argument("--repeat", type=int, default=1, help="run the corpus N times in one session")
+    parser.add_argument("--no-history", action="store_true", help="start every question with empty history")
+    parser.add_argument("--no-cache", action="store_true", help="disable the tool result cache")
+    parser.add_argument("--json", help="also write the per-question metrics to this file")
+    args = parser.parse_args()
+
+    with open(args.questions, "r", encoding="utf-8") as file:
+        corpus = json.load(file)
+
+    workdir = tempfile.mkdtemp(prefix="aisql_bench_")
+    db_path = build_fixture_db(os.path.join(workdir, "bench.db"))
+    tracer.path = os.path.join(workdir, "spans.jsonl")
+
+    server = None
+    if args.toolset == "mcp":
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "bench", "mcp_standin.py"), "--db", db_path, "--port", str(port)]
+        )
+        wait_for_port("127.0.0.1", port)
+        os.environ["MCP_DB_SANDBOX"] = f"http://127.0.0.1:{port}/sse"
+        toolset = "mcp"
+    else:
+        toolset = DbToolset.for_sqlite(db_path)
+
+    rows, history = [], []
+    try:
+        for _ in range(args.repeat):
+            for item in corpus:
+                messages, row = run_question(
+                    item, [] if args.no_history else history, toolset, 0 if args.no_cache else 256
+                )
+                history = messages or history
+                rows.append(row)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    print_report(rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(rows, file, ensure_ascii=False, indent=2)
+    sys.exit(1 if any(row["error"] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
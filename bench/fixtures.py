@@ -0,0 +1,94 @@
+"""SQLite fixtures that mimic the HOSxP tables used by the agent benchmark."""
+
+import os
+import random
+import sqlite3
+from datetime import date, timedelta
+
+
+SCHEMA = """
+CREATE TABLE village (
+    village_id INTEGER PRIMARY KEY,
+    village_moo VARCHAR(2),
+    village_name VARCHAR(100),
+    address_id VARCHAR(6)
+);
+CREATE TABLE house (
+    house_id INTEGER PRIMARY KEY,
+    village_id INTEGER,
+    address VARCHAR(50)
+);
+CREATE TABLE person (
+    person_id INTEGER PRIMARY KEY,
+    patient_hn VARCHAR(9),
+    pname VARCHAR(25),
+    fname VARCHAR(100),
+    lname VARCHAR(100),
+    sex CHAR(1),
+    birthdate DATE,
+    house_id INTEGER,
+    house_regist_type_id INTEGER,
+    person_discharge_id INTEGER
+);
+CREATE TABLE ovst (
+    vn VARCHAR(13) PRIMARY KEY,
+    hn VARCHAR(9),
+    vstdate DATE,
+    vsttime TIME
+);
+CREATE INDEX ix_person_house ON person (house_id);
+CREATE INDEX ix_ovst_vstdate ON ovst (vstdate);
+"""
+
+
+def build_fixture_db(path, people=2000, visits=10000, seed=42):
+    """Create (or rebuild) a deterministic SQLite database at `path`."""
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    connection = sqlite3.connect(path)
+    try:
+        connection.executescript(SCHEMA)
+        connection.executemany(
+            "INSERT INTO village VALUES (?, ?, ?, ?)",
+            [(i, f"{i:02d}", f"บ้านทดสอบ {i}", "340101") for i in range(1, 13)],
+        )
+        houses = people // 4
+        connection.executemany(
+            "INSERT INTO house VALUES (?, ?, ?)",
+            [(i, rng.randint(1, 12), f"{i}/{rng.randint(1, 99)}") for i in range(1, houses + 1)],
+        )
+        connection.executemany(
+            "INSERT INTO person VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    i,
+                    f"{i:09d}",
+                    rng.choice(["นาย", "นาง", "นางสาว"]),
+                    f"ชื่อ{i}",
+                    f"สกุล{i}",
+                    rng.choice("12"),
+                    (date(1940, 1, 1) + timedelta(days=rng.randint(0, 30000))).isoformat(),
+                    rng.randint(1, houses),
+                    rng.choice([1, 1, 3, 4]),
+                    rng.choice([9, 9, 9, 1]),
+                )
+                for i in range(1, people + 1)
+            ],
+        )
+        connection.executemany(
+            "INSERT INTO ovst VALUES (?, ?, ?, ?)",
+            [
+                (
+                    f"{i:013d}",
+                    f"{rng.randint(1, people):09d}",
+                    (date(2023, 1, 1) + timedelta(days=rng.randint(0, 700))).isoformat(),
+                    f"{rng.randint(8, 16):02d}:{rng.randint(0, 59):02d}:00",
+                )
+                for i in range(1, visits + 1)
+            ],
+        )
+        connection.commit()
+    finally:
+        connection.close()
+    return path
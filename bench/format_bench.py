@@ -0,0 +1,90 @@
+"""Scaling benchmark for MySQLFormatter's keyword/function casing pass.
+
+Builds synthetic scripts of growing size (mixing keywords, string literals,
+backtick identifiers and comments), times the single-pass casing regex and
+the former one-regex-per-keyword loop, and prints time per MB so linear
+scaling is easy to check. `--full` also times the complete format_sql call,
+which includes sqlparse's own reindenting.
+
+Usage:
+    python bench/format_bench.py
+    python bench/format_bench.py --sizes 0.5,1,2,4 --repeat 5 --full
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from LatencyStats import percentile
+from SQLFormatter import MySQLFormatter
+
+
+STATEMENT = (
+    "select p.cid, concat(p.fname, ' ', p.lname) as full_name, "
+    "ifnull(v.village_name, 'unknown # not a comment') as village, "
+    "`date` as visit_date  # legacy comment\n"
+    "from person p left join village v on v.village_id = p.village_id "
+    "where p.birthdate >= date('1990-01-01') and p.sex = \"1\" "
+    "/* bigint enum blob stay untouched */ limit 100;\n"
+)
+
+
+def build_script(megabytes):
+    count = max(1, int(megabytes * 1024 * 1024 / len(STATEMENT)))
+    return STATEMENT * count
+
+
+def legacy_pass(formatter, sql, keyword_case):
+    """The previous implementation: one freshly compiled regex per word."""
+    for word in list(formatter.mysql_keywords) + list(formatter.mysql_functions):
+        pattern = re.compile(r"\b" + re.escape(word) + r"\b", re.IGNORECASE)
+        sql = pattern.sub(word.upper() if keyword_case == "upper" else word.lower(), sql)
+    return re.sub(r"#([^\n]*)", r"-- \1", sql)
+
+
+def time_call(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return percentile(timings, 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MySQLFormatter scaling benchmark")
+    parser.add_argument("--sizes", default="0.25,0.5,1,2", help="script sizes in MB, comma separated")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-legacy", action="store_true", help="skip the per-keyword loop")
+    parser.add_argument("--full", action="store_true", help="also time format_sql end to end")
+    args = parser.parse_args()
+
+    formatter = MySQLFormatter()
+    sizes = [float(size) for size in args.sizes.split(",") if size.strip()]
+
+    print(f"{'MB':>6} {'single ms':>10} {'ms/MB':>8} {'legacy ms':>10} {'ms/MB':>8} {'full ms':>10}")
+    for size in sizes:
+        sql = build_script(size)
+        actual_mb = len(sql) / (1024 * 1024)
+        single = time_call(lambda: formatter._apply_mysql_formatting(sql, "upper"), args.repeat)
+        legacy = (
+            None
+            if args.no_legacy
+            else time_call(lambda: legacy_pass(formatter, sql, "upper"), args.repeat)
+        )
+        full = time_call(lambda: formatter.format_sql(sql), 1) if args.full else None
+        print(
+            f"{actual_mb:>6.2f} {single:>10.1f} {single / actual_mb:>8.1f} "
+            f"{legacy if legacy is not None else float('nan'):>10.1f} "
+            f"{legacy / actual_mb if legacy is not None else float('nan'):>8.1f} "
+            f"{full if full is not None else float('nan'):>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Local SSE MCP server backed by SQLite, standing in for MCP_DB_SANDBOX.
+
+Usage:
+    python bench/mcp_standin.py --db appdata/bench.db --port 8765
+
+The agent can then use MCP_DB_SANDBOX=http://127.0.0.1:8765/sse
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from mcp.server.fastmcp import FastMCP
+
+from DbToolset import DbToolset
+from bench.fixtures import build_fixture_db
+
+
+def create_server(db_path, host="127.0.0.1", port=8765):
+    """Expose the built-in DbToolset tools over MCP/SSE."""
+    tools = DbToolset.for_sqlite(db_path)
+    server = FastMCP("aisql-db-standin", host=host, port=port, log_level="WARNING")
+    for func in (tools.list_tables, tools.describe_table, tools.sample_rows, tools.run_select):
+        server.add_tool(func)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=os.path.join("appdata", "bench.db"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rebuild", action="store_true", help="recreate the fixture database")
+    args = parser.parse_args()
+
+    if args.rebuild or not os.path.exists(args.db):
+        os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+        build_fixture_db(args.db)
+    create_server(args.db, args.host, args.port).run(transport="sse")
+
+
+if __name__ == "__main__":
+    main()
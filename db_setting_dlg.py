@@ -1,9 +1,130 @@
 import sys
 from PyQt6.QtWidgets import (QApplication, QDialog, QVBoxLayout, QFormLayout, 
                             QLineEdit, QDialogButtonBox, QMessageBox, QCheckBox, 
-                            QComboBox)
-from PyQt6.QtCore import Qt, QSettings
-import pymysql
+                            QComboBox, QHBoxLayout, QPushButton, QInputDialog, QLabel)
+from PyQt6.QtCore import Qt, QSettings, QThread
+from PyQt6.QtGui import QIntValidator
+
+from ConnectionTester import ConnectionTester, format_timings
+
+
+AGENT_TOOLSETS = [
+    ("mcp", "MCP Server (SSE)"),
+    ("builtin", "Built-in (pooled connection)"),
+]
+
+
+DEFAULT_PROFILE = "Default"
+# Settings kept per connection profile; the active profile is mirrored at the top level
+PROFILE_DEFAULTS = {
+    "host": "localhost",
+    "port": "3306",
+    "user": "",
+    "password": "",
+    "database": "",
+    "use_ssl": "false",
+    "ssl_ca": "",
+    "replica_host": "",
+    "replica_port": "",
+    "max_replica_lag": "30",
+    "pool_size": "5",
+    "warm_connections": "2",
+    "max_concurrent_queries": "3",
+}
+
+
+def to_int(value, default, minimum=0):
+    """`value` as an int of at least `minimum`, or `default` when it is not a number."""
+    try:
+        return max(int(str(value).strip()), minimum)
+    except ValueError:
+        return default
+
+
+def ssl_options(use_ssl, ca=""):
+    """pymysql `ssl` argument: verify the server against `ca` when given, else encrypt only."""
+    if not use_ssl:
+        return None
+    if ca:
+        return {"ca": ca, "check_hostname": True}
+    return {"check_hostname": False, "verify_mode": False}
+
+
+def load_profiles(settings=None):
+    """Return {name: {key: value}} for every saved profile.
+
+    Settings saved before profiles existed become the "Default" profile.
+    """
+    settings = settings or QSettings("AiSQL", "DatabaseSettings")
+    settings.beginGroup("profiles")
+    names = settings.childGroups()
+    settings.endGroup()
+    profiles = {}
+    for name in names:
+        profiles[name] = {
+            key: str(settings.value(f"profiles/{name}/{key}", default))
+            for key, default in PROFILE_DEFAULTS.items()
+        }
+    if not profiles:
+        profiles[DEFAULT_PROFILE] = {
+            key: str(settings.value(key, default)) for key, default in PROFILE_DEFAULTS.items()
+        }
+    return profiles
+
+
+def active_profile_name(settings=None):
+    settings = settings or QSettings("AiSQL", "DatabaseSettings")
+    return str(settings.value("active_profile", DEFAULT_PROFILE))
+
+
+def save_profiles(profiles, active, settings=None):
+    """Store every profile and make `active` the one load_db_config returns."""
+    settings = settings or QSettings("AiSQL", "DatabaseSettings")
+    settings.remove("profiles")
+    for name, values in profiles.items():
+        for key, value in values.items():
+            settings.setValue(f"profiles/{name}/{key}", value)
+    for key, value in profiles[active].items():
+        settings.setValue(key, value)
+    settings.setValue("active_profile", active)
+    settings.sync()
+
+
+def activate_profile(name):
+    """Switch the active connection profile."""
+    settings = QSettings("AiSQL", "DatabaseSettings")
+    profiles = load_profiles(settings)
+    if name in profiles:
+        save_profiles(profiles, name, settings)
+
+
+def load_db_config():
+    """Load the active profile's connection parameters used by QueryExecutor and the agent."""
+    settings = QSettings("AiSQL", "DatabaseSettings")
+    # Profiles are stored as text; a bad number falls back to its default
+    port = to_int(settings.value("port", 3306), 3306, 1)
+    config = {
+        "host": str(settings.value("host", "localhost")),
+        "port": port,
+        "user": str(settings.value("user", "")),
+        "password": str(settings.value("password", "")),
+        "database": str(settings.value("database", "")),
+        "profile": active_profile_name(settings),
+        "replica_host": str(settings.value("replica_host", "")),
+        "replica_port": to_int(settings.value("replica_port", ""), port, 1),
+        "max_replica_lag": to_int(settings.value("max_replica_lag", 30), 30),
+        "pool_size": to_int(settings.value("pool_size", 5), 5, 1),
+        "warm_connections": to_int(settings.value("warm_connections", 2), 2),
+        "max_concurrent_queries": to_int(settings.value("max_concurrent_queries", 3), 3, 1),
+    }
+    ssl = ssl_options(
+        str(settings.value("use_ssl", "false")).lower() == "true",
+        str(settings.value("ssl_ca", "")),
+    )
+    if ssl:
+        config["ssl"] = ssl
+    return config
+
 
 class DbSettingsDialog(QDialog):
     """
@@ -12,6 +133,10 @@ class DbSettingsDialog(QDialog):
     """
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.profiles = {}
+        self.current_profile = None
+        self.tester = None
+        self.accept_after_test = False
         self.setWindowTitle("Database Settings")
         self.setMinimumWidth(400)
         
@@ -26,6 +151,19 @@ class DbSettingsDialog(QDialog):
         layout = QVBoxLayout()
         form_layout = QFormLayout()
         
+        # Named connection profiles
+        self.profile_combo = QComboBox()
+        self.profile_combo.currentTextChanged.connect(self.on_profile_changed)
+        new_profile_btn = QPushButton("New...")
+        new_profile_btn.clicked.connect(self.new_profile)
+        delete_profile_btn = QPushButton("Delete")
+        delete_profile_btn.clicked.connect(self.delete_profile)
+        profile_layout = QHBoxLayout()
+        profile_layout.addWidget(self.profile_combo, 1)
+        profile_layout.addWidget(new_profile_btn)
+        profile_layout.addWidget(delete_profile_btn)
+        form_layout.addRow("Profile:", profile_layout)
+        
         # Database Type
         self.db_type_combo = QComboBox()
         self.db_type_combo.addItems(["MySQL", "PostgreSQL", "SQLite"])
@@ -66,6 +204,143 @@ class DbSettingsDialog(QDialog):
         form_layout.addRow(self.ssl_check)
         form_layout.addRow("CA Cert:", self.ssl_ca_edit)
         
+        # Optional read replica: plain SELECTs run there, writes on the host above
+        self.replica_host_edit = QLineEdit()
+        self.replica_host_edit.setPlaceholderText("none")
+        form_layout.addRow("Read Replica Host:", self.replica_host_edit)
+        
+        self.replica_port_edit = QLineEdit()
+        self.replica_port_edit.setPlaceholderText("3306")
+        self.replica_port_edit.setMaximumWidth(80)
+        form_layout.addRow("Replica Port:", self.replica_port_edit)
+        
+        self.max_replica_lag_edit = QLineEdit()
+        self.max_replica_lag_edit.setPlaceholderText("30")
+        self.max_replica_lag_edit.setMaximumWidth(80)
+        form_layout.addRow("Max Replica Lag (s):", self.max_replica_lag_edit)
+        
+        self.pool_size_edit = QLineEdit()
+        self.pool_size_edit.setPlaceholderText("5")
+        self.pool_size_edit.setMaximumWidth(80)
+        form_layout.addRow("Pool Size:", self.pool_size_edit)
+        
+        # Connections opened in the background when settings are accepted
+        self.warm_connections_edit = QLineEdit()
+        self.warm_connections_edit.setPlaceholderText("2")
+        self.warm_connections_edit.setMaximumWidth(80)
+        form_layout.addRow("Warm Connections:", self.warm_connections_edit)
+        
+        # Agent database tools
+        self.agent_toolset_combo = QComboBox()
+        for key, label in AGENT_TOOLSETS:
+            self.agent_toolset_combo.addItem(label, key)
+        form_layout.addRow("Agent DB Tools:", self.agent_toolset_combo)
+        
+        self.agent_max_rows_edit = QLineEdit()
+        self.agent_max_rows_edit.setPlaceholderText("200")
+        self.agent_max_rows_edit.setMaximumWidth(80)
+        form_layout.addRow("Agent Max Rows:", self.agent_max_rows_edit)
+        
+        # Tool result cache (0 disables)
+        self.tool_cache_ttl_edit = QLineEdit()
+        self.tool_cache_ttl_edit.setPlaceholderText("600")
+        self.tool_cache_ttl_edit.setMaximumWidth(80)
+        form_layout.addRow("Tool Cache TTL (s):", self.tool_cache_ttl_edit)
+        
+        self.tool_cache_size_edit = QLineEdit()
+        self.tool_cache_size_edit.setPlaceholderText("256")
+        self.tool_cache_size_edit.setMaximumWidth(80)
+        form_layout.addRow("Tool Cache Size:", self.tool_cache_size_edit)
+        
+        # EXPLAIN check of agent SQL
+        self.validate_sql_check = QCheckBox("Validate agent SQL with EXPLAIN")
+        form_layout.addRow(self.validate_sql_check)
+        
+        self.max_estimated_rows_edit = QLineEdit()
+        self.max_estimated_rows_edit.setPlaceholderText("1000000")
+        self.max_estimated_rows_edit.setMaximumWidth(120)
+        form_layout.addRow("Max Estimated Rows:", self.max_estimated_rows_edit)
+        
+        self.max_sql_repairs_edit = QLineEdit()
+        self.max_sql_repairs_edit.setPlaceholderText("2")
+        self.max_sql_repairs_edit.setMaximumWidth(80)
+        form_layout.addRow("Max Repair Attempts:", self.max_sql_repairs_edit)
+        
+        # Offer sargable rewrites of agent SQL before it lands in the editor
+        self.suggest_rewrites_check = QCheckBox("Suggest index-friendly rewrites of agent SQL")
+        form_layout.addRow(self.suggest_rewrites_check)
+        
+        # Models used by racing mode (comma separated)
+        self.race_models_edit = QLineEdit()
+        self.race_models_edit.setPlaceholderText("gemini-2.5-flash,openai/gpt-oss-20b")
+        form_layout.addRow("Race Models:", self.race_models_edit)
+        
+        # Similar saved queries from sql/ attached to each question (0 disables)
+        self.few_shot_k_edit = QLineEdit()
+        self.few_shot_k_edit.setPlaceholderText("3")
+        self.few_shot_k_edit.setMaximumWidth(80)
+        form_layout.addRow("Similar Saved Queries:", self.few_shot_k_edit)
+        
+        # Token budget of the question-specific prompt context (0 sends the full prompt)
+        self.prompt_budget_edit = QLineEdit()
+        self.prompt_budget_edit.setPlaceholderText("1500")
+        self.prompt_budget_edit.setMaximumWidth(80)
+        form_layout.addRow("Prompt Token Budget:", self.prompt_budget_edit)
+        
+        # Files at least this large open in large-file mode (chunked, viewport highlighting)
+        self.large_file_mb_edit = QLineEdit()
+        self.large_file_mb_edit.setPlaceholderText("20")
+        self.large_file_mb_edit.setMaximumWidth(80)
+        form_layout.addRow("Large File Mode (MB):", self.large_file_mb_edit)
+        
+        # Result tabs that may query this profile's database at once
+        self.max_concurrent_edit = QLineEdit()
+        self.max_concurrent_edit.setPlaceholderText("3")
+        self.max_concurrent_edit.setMaximumWidth(80)
+        form_layout.addRow("Concurrent Queries:", self.max_concurrent_edit)
+        
+        # SELECTs estimated (by EXPLAIN) above this many rows ask before fetching
+        self.large_result_rows_edit = QLineEdit()
+        self.large_result_rows_edit.setPlaceholderText("100000")
+        self.large_result_rows_edit.setMaximumWidth(120)
+        form_layout.addRow("Large Result Rows:", self.large_result_rows_edit)
+        
+        self.preview_rows_edit = QLineEdit()
+        self.preview_rows_edit.setPlaceholderText("1000")
+        self.preview_rows_edit.setMaximumWidth(80)
+        form_layout.addRow("Preview Rows:", self.preview_rows_edit)
+        
+        self.max_column_width_edit = QLineEdit()
+        self.max_column_width_edit.setPlaceholderText("400")
+        self.max_column_width_edit.setMaximumWidth(80)
+        form_layout.addRow("Max Column Width (px):", self.max_column_width_edit)
+        
+        # Scripts: keep going after a failed statement (it is rolled back to its savepoint)
+        self.continue_on_error_check = QCheckBox("Continue script after a failed statement")
+        form_layout.addRow(self.continue_on_error_check)
+        
+        # Numeric fields accept digits only
+        for edit, bottom, top in (
+            (self.port_edit, 1, 65535),
+            (self.replica_port_edit, 1, 65535),
+            (self.max_replica_lag_edit, 0, 86400),
+            (self.pool_size_edit, 1, 100),
+            (self.warm_connections_edit, 0, 100),
+            (self.max_concurrent_edit, 1, 100),
+            (self.agent_max_rows_edit, 1, 1000000),
+            (self.tool_cache_ttl_edit, 0, 86400),
+            (self.tool_cache_size_edit, 0, 100000),
+            (self.max_estimated_rows_edit, 1, 2000000000),
+            (self.max_sql_repairs_edit, 0, 10),
+            (self.few_shot_k_edit, 0, 20),
+            (self.prompt_budget_edit, 0, 100000),
+            (self.large_file_mb_edit, 1, 100000),
+            (self.large_result_rows_edit, 1, 2000000000),
+            (self.preview_rows_edit, 1, 10000000),
+            (self.max_column_width_edit, 20, 5000),
+        ):
+            edit.setValidator(QIntValidator(bottom, top, edit))
+        
         # Buttons
         self.button_box = QDialogButtonBox(
             QDialogButtonBox.StandardButton.Ok | 
@@ -74,7 +349,7 @@ class DbSettingsDialog(QDialog):
         )
         
         # Add test connection button
-        test_btn = self.button_box.addButton(
+        self.test_btn = test_btn = self.button_box.addButton(
             "Test Connection", 
             QDialogButtonBox.ButtonRole.ActionRole
         )
@@ -82,14 +357,19 @@ class DbSettingsDialog(QDialog):
         # Connect signals
         self.button_box.accepted.connect(self.on_accept)
         self.button_box.rejected.connect(self.reject)
-        test_btn.clicked.connect(self.test_connection)
+        test_btn.clicked.connect(lambda: self.test_connection())
         
         # Connect Apply button
         apply_btn = self.button_box.button(QDialogButtonBox.StandardButton.Apply)
         apply_btn.clicked.connect(self.save_settings)
         
+        # Connection test progress and timings
+        self.test_status_label = QLabel()
+        self.test_status_label.setWordWrap(True)
+        
         # Add widgets to main layout
         layout.addLayout(form_layout)
+        layout.addWidget(self.test_status_label)
         layout.addWidget(self.button_box)
         self.setLayout(layout)
     
@@ -102,35 +382,117 @@ class DbSettingsDialog(QDialog):
         """Get connection parameters from form fields."""
         params = {
             'host': self.host_edit.text() or 'localhost',
-            'port': int(self.port_edit.text() or '3306'),
+            'port': to_int(self.port_edit.text(), 3306, 1),
             'user': self.user_edit.text() or '',
             'password': self.password_edit.text() or '',
             'database': self.database_edit.text() or ''
         }
         
         # Add SSL parameters if enabled
-        if self.ssl_check.isChecked() and self.ssl_ca_edit.text():
-            params['ssl'] = {
-                'ca': self.ssl_ca_edit.text(),
-                'check_hostname': True
-            }
+        ssl = ssl_options(self.ssl_check.isChecked(), self.ssl_ca_edit.text())
+        if ssl:
+            params['ssl'] = ssl
+        
+        # The replica is tested too
+        params['replica_host'] = self.replica_host_edit.text().strip()
+        params['replica_port'] = to_int(self.replica_port_edit.text(), params['port'], 1)
         
         return params
     
+    def profile_values(self):
+        """The per-profile settings currently in the form."""
+        return {
+            "host": self.host_edit.text() or "localhost",
+            "port": str(to_int(self.port_edit.text(), 3306, 1)),
+            "user": self.user_edit.text(),
+            "password": self.password_edit.text(),
+            "database": self.database_edit.text(),
+            "use_ssl": "true" if self.ssl_check.isChecked() else "false",
+            "ssl_ca": self.ssl_ca_edit.text(),
+            "replica_host": self.replica_host_edit.text().strip(),
+            "replica_port": str(to_int(self.replica_port_edit.text(), "", 1)),
+            "max_replica_lag": str(to_int(self.max_replica_lag_edit.text(), 30)),
+            "pool_size": str(to_int(self.pool_size_edit.text(), 5, 1)),
+            "warm_connections": str(to_int(self.warm_connections_edit.text(), 2)),
+            "max_concurrent_queries": str(to_int(self.max_concurrent_edit.text(), 3, 1)),
+        }
+    
+    def show_profile(self, values):
+        """Fill the form with a profile's settings."""
+        self.host_edit.setText(values["host"])
+        self.port_edit.setText(values["port"])
+        self.user_edit.setText(values["user"])
+        self.password_edit.setText(values["password"])
+        self.database_edit.setText(values["database"])
+        use_ssl = values["use_ssl"].lower() == "true"
+        self.ssl_check.setChecked(use_ssl)
+        self.ssl_ca_edit.setText(values["ssl_ca"])
+        self.ssl_ca_edit.setEnabled(use_ssl)
+        self.replica_host_edit.setText(values["replica_host"])
+        self.replica_port_edit.setText(values["replica_port"])
+        self.max_replica_lag_edit.setText(values["max_replica_lag"])
+        self.pool_size_edit.setText(values["pool_size"])
+        self.warm_connections_edit.setText(values["warm_connections"])
+        self.max_concurrent_edit.setText(values["max_concurrent_queries"])
+    
+    def on_profile_changed(self, name):
+        """Keep the edits of the profile being left and show the selected one."""
+        if not name or name == self.current_profile:
+            return
+        if self.current_profile in self.profiles:
+            self.profiles[self.current_profile] = self.profile_values()
+        self.current_profile = name
+        self.show_profile(self.profiles[name])
+    
+    def new_profile(self):
+        """Add a profile, starting from a copy of the one shown."""
+        name, ok = QInputDialog.getText(self, "New Profile", "Profile name:")
+        name = name.strip()
+        if not ok or not name:
+            return
+        if "/" in name or "\\" in name or name in self.profiles:
+            QMessageBox.warning(self, "New Profile", f"Invalid or duplicate profile name: {name}")
+            return
+        self.profiles[self.current_profile] = self.profile_values()
+        self.profiles[name] = self.profile_values()
+        self.profile_combo.addItem(name)
+        self.profile_combo.setCurrentText(name)
+    
+    def delete_profile(self):
+        if len(self.profiles) <= 1:
+            QMessageBox.warning(self, "Delete Profile", "At least one profile is required.")
+            return
+        name = self.current_profile
+        del self.profiles[name]
+        self.current_profile = None
+        self.profile_combo.removeItem(self.profile_combo.findText(name))
+        self.on_profile_changed(self.profile_combo.currentText())
+    
     def save_settings(self):
         """Save settings to QSettings."""
         settings = QSettings("AiSQL", "DatabaseSettings")
-        params = self.get_connection_params()
         
-        # Save connection parameters
-        for key, value in params.items():
-            if key != 'ssl':  # Handle SSL separately
-                settings.setValue(key, value)
+        # Save every profile; the selected one becomes active
+        self.profiles[self.current_profile] = self.profile_values()
+        save_profiles(self.profiles, self.current_profile, settings)
         
-        # Save SSL settings
-        settings.setValue('use_ssl', self.ssl_check.isChecked())
-        if 'ssl' in params and 'ca' in params['ssl']:
-            settings.setValue('ssl_ca', params['ssl']['ca'])
+        # Save agent tool settings
+        settings.setValue('agent_toolset', self.agent_toolset_combo.currentData())
+        settings.setValue('agent_max_rows', to_int(self.agent_max_rows_edit.text(), 200, 1))
+        settings.setValue('tool_cache_ttl', to_int(self.tool_cache_ttl_edit.text(), 600))
+        settings.setValue('tool_cache_size', to_int(self.tool_cache_size_edit.text(), 256))
+        settings.setValue('validate_sql', self.validate_sql_check.isChecked())
+        settings.setValue('suggest_rewrites', self.suggest_rewrites_check.isChecked())
+        settings.setValue('max_estimated_rows', to_int(self.max_estimated_rows_edit.text(), 1000000, 1))
+        settings.setValue('max_sql_repairs', to_int(self.max_sql_repairs_edit.text(), 2))
+        settings.setValue('race_models', self.race_models_edit.text() or 'gemini-2.5-flash,openai/gpt-oss-20b')
+        settings.setValue('few_shot_k', to_int(self.few_shot_k_edit.text(), 3))
+        settings.setValue('prompt_token_budget', to_int(self.prompt_budget_edit.text(), 1500))
+        settings.setValue('large_file_mb', to_int(self.large_file_mb_edit.text(), 20, 1))
+        settings.setValue('script_continue_on_error', self.continue_on_error_check.isChecked())
+        settings.setValue('large_result_rows', to_int(self.large_result_rows_edit.text(), 100000, 1))
+        settings.setValue('preview_rows', to_int(self.preview_rows_edit.text(), 1000, 1))
+        settings.setValue('max_column_width', to_int(self.max_column_width_edit.text(), 400, 20))
         
         settings.sync()
     
@@ -138,27 +500,46 @@ class DbSettingsDialog(QDialog):
         """Load settings from QSettings."""
         settings = QSettings("AiSQL", "DatabaseSettings")
         
-        # Load connection parameters
-        self.host_edit.setText(str(settings.value("host", "localhost")))
-        self.port_edit.setText(str(settings.value("port", "3306")))
-        self.user_edit.setText(str(settings.value("user", "")))
-        self.password_edit.setText(str(settings.value("password", "")))
-        self.database_edit.setText(str(settings.value("database", "")))
+        # Load connection profiles
+        self.profiles = load_profiles(settings)
+        self.current_profile = None
+        active = active_profile_name(settings)
+        self.profile_combo.blockSignals(True)
+        self.profile_combo.clear()
+        self.profile_combo.addItems(list(self.profiles))
+        self.profile_combo.blockSignals(False)
+        if active not in self.profiles:
+            active = next(iter(self.profiles))
+        self.profile_combo.setCurrentText(active)
+        self.on_profile_changed(active)
         
-        # Load SSL settings
-        use_ssl = settings.value("use_ssl", "false").lower() == 'true'
-        self.ssl_check.setChecked(use_ssl)
-        self.ssl_ca_edit.setText(str(settings.value("ssl_ca", "")))
-        self.ssl_ca_edit.setEnabled(use_ssl)
+        # Load agent tool settings
+        index = self.agent_toolset_combo.findData(str(settings.value("agent_toolset", "mcp")))
+        self.agent_toolset_combo.setCurrentIndex(max(index, 0))
+        self.agent_max_rows_edit.setText(str(settings.value("agent_max_rows", "200")))
+        self.tool_cache_ttl_edit.setText(str(settings.value("tool_cache_ttl", "600")))
+        self.tool_cache_size_edit.setText(str(settings.value("tool_cache_size", "256")))
+        self.validate_sql_check.setChecked(str(settings.value("validate_sql", "false")).lower() == 'true')
+        self.suggest_rewrites_check.setChecked(str(settings.value("suggest_rewrites", "true")).lower() == 'true')
+        self.max_estimated_rows_edit.setText(str(settings.value("max_estimated_rows", "1000000")))
+        self.max_sql_repairs_edit.setText(str(settings.value("max_sql_repairs", "2")))
+        self.race_models_edit.setText(str(settings.value("race_models", "gemini-2.5-flash,openai/gpt-oss-20b")))
+        self.few_shot_k_edit.setText(str(settings.value("few_shot_k", "3")))
+        self.prompt_budget_edit.setText(str(settings.value("prompt_token_budget", "1500")))
+        self.large_file_mb_edit.setText(str(settings.value("large_file_mb", "20")))
+        self.continue_on_error_check.setChecked(str(settings.value("script_continue_on_error", "false")).lower() == 'true')
+        self.large_result_rows_edit.setText(str(settings.value("large_result_rows", "100000")))
+        self.preview_rows_edit.setText(str(settings.value("preview_rows", "1000")))
+        self.max_column_width_edit.setText(str(settings.value("max_column_width", "400")))
     
     def on_accept(self):
-        """Handle OK button click - save settings and close dialog."""
-        if self.test_connection():
-            self.save_settings()
-            self.accept()
+        """Handle OK button click - save settings and close dialog once the test passes."""
+        self.test_connection(accept_on_success=True)
     
-    def test_connection(self):
-        """Test the database connection with current settings."""
+    def test_connection(self, accept_on_success=False):
+        """Test the database connection with current settings in the background."""
+        if self.tester is not None and self.tester.isRunning():
+            return
         params = self.get_connection_params()
         
         if not all([params['user'], params['database']]):
@@ -167,35 +548,50 @@ class DbSettingsDialog(QDialog):
                 "Incomplete Settings", 
                 "Please fill in all required fields (username and database)."
             )
-            return False
-        
-        try:
-            # Test connection
-            connection = pymysql.connect(**params)
-            info = connection.get_server_info()
-            connection.close()
-            
-            QMessageBox.information(
-                self, 
-                "Connection Successful", 
-                f"Successfully connected to MySQL server (v{info})."
-            )
-            return True
-            
-        except pymysql.Error as e:
-            QMessageBox.critical(
-                self, 
-                "Connection Failed", 
-                f"Failed to connect to database: {str(e)}"
-            )
-            return False
-        except Exception as e:
-            QMessageBox.critical(
-                self, 
-                "Error", 
-                f"An unexpected error occurred: {str(e)}"
-            )
-            return False
+            return
+        
+        self.accept_after_test = accept_on_success
+        self.set_testing(True)
+        self.tester = ConnectionTester(params)
+        self.tester.progress.connect(self.test_status_label.setText)
+        self.tester.finished.connect(self.on_test_finished)
+        self.tester.error.connect(self.on_test_error)
+        self.tester.start()
+    
+    def set_testing(self, testing):
+        self.test_btn.setEnabled(not testing)
+        self.button_box.button(QDialogButtonBox.StandardButton.Ok).setEnabled(not testing)
+    
+    def on_test_finished(self, results):
+        self.set_testing(False)
+        report = "\n\n".join(format_timings(timings) for timings in results)
+        self.test_status_label.setText(report)
+        QMessageBox.information(
+            self, 
+            "Connection Successful", 
+            f"Successfully connected to MySQL server (v{results[0]['server']}).\n\n{report}"
+        )
+        if self.accept_after_test:
+            self.save_settings()
+            self.accept()
+    
+    def on_test_error(self, error_message):
+        self.set_testing(False)
+        self.test_status_label.setText(error_message)
+        QMessageBox.critical(self, "Connection Failed", error_message)
+    
+    def done(self, result):
+        """Close without waiting for a test still stuck on an unreachable host."""
+        if self.tester is not None and self.tester.isRunning():
+            for signal in (self.tester.progress, self.tester.finished, self.tester.error):
+                signal.disconnect()
+            # Keep the thread alive until it times out on its own, then delete it
+            self.tester.setParent(QApplication.instance())
+            QThread.finished.__get__(self.tester, QThread).connect(self.tester.deleteLater)
+            if self.tester.isFinished():
+                self.tester.deleteLater()
+        self.tester = None
+        super().done(result)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,207 @@
+"""Format or check .sql files from the command line, e.g. in a pre-commit hook.
+
+Files are formatted statement by statement exactly like the editor's Format
+SQL command, on a process pool. A content-hash cache of files already known
+to be formatted lets repeated runs skip unchanged files without parsing them,
+and rewritten files are replaced atomically.
+
+Usage:
+    python format_sql_files.py                     # format everything under sql/
+    python format_sql_files.py --check path/ a.sql # exit 1 if anything would change
+    python format_sql_files.py --check --diff --jobs 8 queries/
+"""
+
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from AppData import app_data_path
+from SQLFormatter import DEFAULT_FORMAT_OPTIONS, format_script
+
+
+CACHE_VERSION = 1
+
+
+def content_hash(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def options_key(options):
+    """Cached hashes are only valid for the formatter options and sqlparse version that made them."""
+    import sqlparse
+
+    return json.dumps({"options": options, "sqlparse": sqlparse.__version__}, sort_keys=True)
+
+
+def find_sql_files(paths):
+    """Yield .sql files under `paths` (files are taken as given), sorted per directory."""
+    for path in paths:
+        if os.path.isfile(path):
+            yield os.path.abspath(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in sorted(files):
+                if name.lower().endswith(".sql"):
+                    yield os.path.abspath(os.path.join(root, name))
+
+
+def load_cache(path, key):
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            cached = json.load(file)
+        if cached.get("version") == CACHE_VERSION and cached.get("key") == key:
+            return set(cached.get("clean", []))
+    except (OSError, ValueError):
+        pass
+    return set()
+
+
+def save_cache(path, key, clean):
+    directory = os.path.dirname(path) or "."
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=directory, suffix=".tmp", delete=False
+    ) as file:
+        json.dump({"version": CACHE_VERSION, "key": key, "clean": sorted(clean)}, file)
+    os.replace(file.name, path)
+
+
+def write_atomic(path, data):
+    """Write to a temporary file next to `path`, then swap it in."""
+    with tempfile.NamedTemporaryFile(
+        "wb", dir=os.path.dirname(path), prefix=".", suffix=".tmp", delete=False
+    ) as file:
+        file.write(data)
+    try:
+        shutil.copymode(path, file.name)
+        os.replace(file.name, path)
+    except OSError:
+        os.unlink(file.name)
+        raise
+
+
+def process_file(path, check, diff, options):
+    """Format one file; runs in a pool process.
+
+    Returns (path, status, size, clean_hash, detail) where status is
+    "unchanged", "changed" or "error".
+    """
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+        text = data.decode("utf-8")
+        newline = "\r\n" if "\r\n" in text else "\n"
+        source = text.replace("\r\n", "\n")
+
+        formatted = format_script(source, options)
+        if formatted == source:
+            return path, "unchanged", len(data), content_hash(data), ""
+
+        output = formatted.replace("\n", newline).encode("utf-8")
+        detail = ""
+        if diff:
+            detail = "".join(
+                difflib.unified_diff(
+                    source.splitlines(keepends=True),
+                    formatted.splitlines(keepends=True),
+                    fromfile=path,
+                    tofile=f"{path} (formatted)",
+                )
+            )
+        if check:
+            return path, "changed", len(data), None, detail
+        write_atomic(path, output)
+        return path, "changed", len(data), content_hash(output), detail
+    except (OSError, UnicodeDecodeError) as e:
+        return path, "error", 0, None, str(e)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Format or check .sql files")
+    parser.add_argument("paths", nargs="*", default=["sql"], help="files or directories (default: sql/)")
+    parser.add_argument("--check", action="store_true", help="report files that would change, write nothing")
+    parser.add_argument("--diff", action="store_true", help="print a unified diff of each change")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--cache", default=None, help="cache file (default: appdata/format_cache.json)")
+    parser.add_argument("--no-cache", action="store_true", help="parse every file even if unchanged")
+    parser.add_argument("--quiet", action="store_true", help="only print problems")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    options = dict(DEFAULT_FORMAT_OPTIONS)
+    key = options_key(options)
+    cache_path = args.cache or app_data_path("format_cache.json")
+    clean = set() if args.no_cache else load_cache(cache_path, key)
+
+    files = list(dict.fromkeys(find_sql_files(args.paths)))
+    pending, skipped, total_bytes = [], 0, 0
+    for path in files:
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except OSError as e:
+            print(f"error: {path}: {e}", file=sys.stderr)
+            continue
+        total_bytes += len(data)
+        if content_hash(data) in clean:
+            skipped += 1
+        else:
+            pending.append(path)
+
+    changed, errors, parsed_bytes = [], [], 0
+    jobs = max(1, min(args.jobs, len(pending)))
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [
+                pool.submit(process_file, path, args.check, args.diff, options) for path in pending
+            ]
+            results = [future.result() for future in as_completed(futures)]
+    else:
+        results = [process_file(path, args.check, args.diff, options) for path in pending]
+
+    for path, status, size, clean_hash, detail in sorted(results):
+        parsed_bytes += size
+        if status == "error":
+            errors.append(path)
+            print(f"error: {path}: {detail}", file=sys.stderr)
+            continue
+        if clean_hash:
+            clean.add(clean_hash)
+        if status == "changed":
+            changed.append(path)
+            print(f"{'would reformat' if args.check else 'reformatted'} {os.path.relpath(path)}")
+            if detail:
+                print(detail, end="")
+
+    if not args.no_cache:
+        try:
+            save_cache(cache_path, key, clean)
+        except OSError as e:
+            print(f"warning: cannot save cache {cache_path}: {e}", file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    if not args.quiet:
+        megabytes = total_bytes / (1024 * 1024)
+        print(
+            f"{len(files)} files ({megabytes:.2f} MB): {len(changed)} "
+            f"{'would change' if args.check else 'changed'}, {skipped} cached, "
+            f"{len(pending) - len(changed) - len(errors)} unchanged, {len(errors)} errors "
+            f"in {elapsed:.2f}s using {jobs} process(es) "
+            f"({len(files) / elapsed:.0f} files/s, "
+            f"{parsed_bytes / (1024 * 1024) / elapsed:.2f} MB/s parsed)"
+        )
+
+    if errors or (args.check and changed):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import sys
+from datetime import datetime
+from PyQt6.QtWidgets import (QApplication, QDialog, QVBoxLayout, QHBoxLayout,
+                            QTableWidget, QTableWidgetItem, QDialogButtonBox,
+                            QHeaderView, QLabel, QLineEdit, QTabWidget, QWidget)
+from PyQt6.QtCore import Qt, QTimer
+
+from QueryHistory import query_history
+
+
+class QueryHistoryDialog(QDialog):
+    """
+    Full-text search over past query runs, and the fingerprints ranked by
+    total time with their p95 latency.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Query History")
+        self.setMinimumSize(900, 520)
+        self.selected_sql = ""
+        self.history_rows = []
+
+        self.setup_ui()
+        self.load_history()
+        self.load_ranking()
+
+    def setup_ui(self):
+        """Set up the user interface components."""
+        layout = QVBoxLayout()
+        self.tabs = QTabWidget()
+
+        history_page = QWidget()
+        history_layout = QVBoxLayout(history_page)
+        search_layout = QHBoxLayout()
+        search_layout.addWidget(QLabel("Search SQL:"))
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("e.g. ovst vstdate")
+        search_layout.addWidget(self.search_edit)
+        history_layout.addLayout(search_layout)
+        # Search as the user types, once they pause
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.load_history)
+        self.search_edit.textChanged.connect(self.search_timer.start)
+
+        self.history_table = self._table(["Time", "Profile", "Source", "Rows", "ms", "Status", "SQL"])
+        self.history_table.cellDoubleClicked.connect(self.choose_sql)
+        history_layout.addWidget(self.history_table)
+        self.tabs.addTab(history_page, "History")
+
+        self.ranking_table = self._table(
+            ["Fingerprint", "Profiles", "Runs", "Total ms", "Avg ms", "p95 ms", "Max ms", "Avg rows", "Last run"]
+        )
+        self.tabs.addTab(self.ranking_table, "Slowest Queries")
+        layout.addWidget(self.tabs)
+
+        self.info_label = QLabel("ดับเบิลคลิกเพื่อนำ SQL กลับไปที่ editor")
+        layout.addWidget(self.info_label)
+
+        self.button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        refresh_btn = self.button_box.addButton("Refresh", QDialogButtonBox.ButtonRole.ActionRole)
+        refresh_btn.clicked.connect(self.load_history)
+        refresh_btn.clicked.connect(self.load_ranking)
+        self.button_box.rejected.connect(self.reject)
+        layout.addWidget(self.button_box)
+
+        self.setLayout(layout)
+
+    def _table(self, headers):
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        table.horizontalHeader().setStretchLastSection(True)
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        return table
+
+    def _fill(self, table, rows):
+        table.setSortingEnabled(False)
+        table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                item = QTableWidgetItem()
+                if isinstance(value, str):
+                    item.setText(" ".join(value.split()))
+                    item.setToolTip(value[:2000])
+                    item.setData(Qt.ItemDataRole.UserRole, value)
+                elif value is not None:
+                    item.setData(0, value)
+                table.setItem(row, column, item)
+        table.setSortingEnabled(True)
+        table.resizeColumnsToContents()
+
+    @staticmethod
+    def _time(ts):
+        return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S") if ts else ""
+
+    def load_history(self):
+        """Search the stored runs for the words typed, newest first."""
+        self.history_rows = query_history.search(self.search_edit.text())
+        self._fill(
+            self.history_table,
+            [
+                (self._time(ts), profile, source, rows, total_ms, error or "OK", sql)
+                for ts, profile, source, rows, total_ms, error, sql in self.history_rows
+            ],
+        )
+        self.info_label.setText(f"{len(self.history_rows)} runs from {query_history.path}")
+
+    def load_ranking(self):
+        """Fill the fingerprint ranking from the fingerprint_stats view."""
+        self._fill(
+            self.ranking_table,
+            [row[:-1] + (self._time(row[-1]),) for row in query_history.ranking()],
+        )
+
+    def choose_sql(self, row, column):
+        self.selected_sql = self.history_table.item(row, 6).data(Qt.ItemDataRole.UserRole)
+        self.accept()
+
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    dialog = QueryHistoryDialog()
+    dialog.show()
+    sys.exit(app.exec())
@@ -1,47 +1,152 @@
 import sys, os
-import re
+import html
+import json
+import multiprocessing
 import pandas as pd
-from PyQt6.QtWidgets import QApplication, QMainWindow, QMessageBox, QFileDialog, QMenu
+from PyQt6.QtWidgets import (
+    QApplication,
+    QMessageBox,
+    QDialog,
+    QFileDialog,
+    QInputDialog,
+)
 from PyQt6.QtCore import (
     Qt,
     QSettings,
+    pyqtSignal,
 )
 from PyQt6.QtGui import (
-    QStandardItemModel,
-    QStandardItem,
     QIcon,
+    QTextCursor,
 )
 from main_ui import main_ui
 
-from db_setting_dlg import DbSettingsDialog
+from db_setting_dlg import (
+    DbSettingsDialog,
+    activate_profile,
+    active_profile_name,
+    load_db_config,
+    load_profiles,
+)
+
+from trace_stats_dlg import TraceStatsDialog
+
+from rewrite_dlg import RewriteDialog, offer_rewrite
+
+from plan_dlg import PlanDialog
+
+from history_dlg import QueryHistoryDialog
+
+from QueryHistory import query_history
+
+from QueryProfile import format_profile, profile_details
 
-from SQLFormatter import MySQLFormatter
+from SargableRewriter import rewrite_sargable
 
-from QueryExecutor import QueryExecutor
+from SQLFormatter import MySQLFormatter, statement_spans
 
-from PandasTableModel import PandasTableModel
+from ConnectionPool import add_notice_handler, profile_key, remove_notice_handler
+
+from QueryScheduler import QueryScheduler
+
+from ResultTab import ResultTab
+
+from ScriptRunner import ScriptRun
+
+from StatementClassifier import classify
 
 
 from AgentDataWorker import AgentDataWorker
 
+from LatencyStats import RaceStats
+
+from FormatWorker import FormatWorker, shutdown_format_pool
+
+from FileLoader import FileLoader
+
+from SchemaCatalog import SchemaLoader
+
+from ConnectionTester import PoolWarmer
+
+
+def _is_bmp(text):
+    return len(text.encode("utf-16-le")) == 2 * len(text)
+
+
+def _text_index(text, position):
+    """Python string index of a QTextCursor position (Qt counts UTF-16 units)."""
+    if _is_bmp(text):
+        return position
+    units = 0
+    for index, char in enumerate(text):
+        if units >= position:
+            return index
+        units += 2 if ord(char) > 0xFFFF else 1
+    return len(text)
+
+
+def _text_position(text, index):
+    """QTextCursor position of a Python string index."""
+    if _is_bmp(text):
+        return index
+    return len(text[:index].encode("utf-16-le")) // 2
+
+
+def _map_cursor(text, index, edits):
+    """Where `index` in `text` ends up after applying `edits`.
+
+    Inside an edited statement the cursor keeps its count of non-whitespace
+    characters, which formatting does not change.
+    """
+    shift = 0
+    for start, end, formatted in edits:
+        if index < start:
+            break
+        if index <= end:
+            remaining = sum(1 for char in text[start:index] if not char.isspace())
+            offset = 0
+            while offset < len(formatted) and (remaining or formatted[offset].isspace()):
+                if not formatted[offset].isspace():
+                    remaining -= 1
+                offset += 1
+            return start + shift + offset
+        shift += len(formatted) - (end - start)
+    return index + shift
+
 
 class main(main_ui):
+    # Replica routing notices from worker threads, shown in the status bar
+    connection_notice = pyqtSignal(str)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setupUi()
+        self.connection_notice.connect(self.on_progress_update)
+        self._notice_handler = self.connection_notice.emit  # kept so it can be removed
+        add_notice_handler(self._notice_handler)
 
         # Initialize instance variables
-        self.query_executor = None
         self.chat_executor = None
-        self.pandas_model = None
-        self.results_data = []
-        self.columns_data = []
+        self.format_worker = None
         self.message_history = []
+        # Fingerprint digests of agent SQL, so their runs are logged as "agent"
+        self.agent_digests = set()
+        self.tab_counter = 0
+        self.query_scheduler = QueryScheduler(parent=self)
         # Initialize MySQL formatter
         self.mysql_formatter = MySQLFormatter()
 
-        # Setup table context menu
-        self.setup_table_context_menu()
+        self.file_loader = None
+        self.schema_loader = None
+        self.pool_warmer = None
+        self.apply_editor_settings()
+        self.load_schema()
+        self.warm_pool()
+
+        # Results tabs, each with its own executor, model and filters
+        self.results_tabs.tabCloseRequested.connect(self.close_result_tab)
+        self.results_tabs.currentChanged.connect(self.on_result_tab_changed)
+        self.new_result_tab()
 
         # Connect button signals
         self.run_button.clicked.connect(self.run_query)
@@ -53,12 +158,44 @@ class main(main_ui):
 
         # Connect menu actions
         self.settings_action.triggered.connect(self.show_settings)
+        self.profile_menu.aboutToShow.connect(self.fill_profile_menu)
         if hasattr(self, "open_action"):
             self.open_action.triggered.connect(self.open_sql)
 
         # Connect run action from Query menu
+        if hasattr(self, "refresh_schema_action"):
+            self.refresh_schema_action.triggered.connect(self.load_schema)
+        if hasattr(self, "find_action"):
+            self.find_action.triggered.connect(self.find_text)
+        if hasattr(self, "format_selection_action"):
+            self.format_selection_action.triggered.connect(self.format_selection)
         if hasattr(self, "run_action"):
             self.run_action.triggered.connect(self.run_query)
+        if hasattr(self, "run_statement_action"):
+            self.run_statement_action.triggered.connect(self.run_statement)
+        if hasattr(self, "run_selection_action"):
+            self.run_selection_action.triggered.connect(self.run_selection)
+        if hasattr(self, "optimize_action"):
+            self.optimize_action.triggered.connect(self.optimize_query)
+        if hasattr(self, "analyze_action"):
+            self.analyze_action.triggered.connect(self.analyze_query)
+        if hasattr(self, "race_stats_action"):
+            self.race_stats_action.triggered.connect(self.show_race_stats)
+        if hasattr(self, "dump_profile_action"):
+            self.dump_profile_action.setChecked(
+                str(QSettings("AiSQL", "DatabaseSettings").value("dump_query_profile", "false")).lower() == "true"
+            )
+            self.dump_profile_action.toggled.connect(self.set_dump_profile)
+        self.profile_button.clicked.connect(self.show_profile_details)
+        if hasattr(self, "history_action"):
+            self.history_action.triggered.connect(self.show_query_history)
+        if hasattr(self, "trace_stats_action"):
+            self.trace_stats_action.triggered.connect(self.show_trace_stats)
+
+    def _llm_model_name(self, selected_model):
+        if selected_model == "openai/gpt-oss-20b":
+            return "openai/gpt-oss-20b"
+        return f"google-gla:{selected_model}"
 
     def btn_chat(self):
         try:
@@ -67,10 +204,8 @@ class main(main_ui):
                 return
 
             # Show "Ai is thinking..." in the query text box
-            self.results_data = []
-            self.columns_data = []
-            self.pandas_model = None
-            self.results_area.setModel(None)
+            self.current_tab().clear()
+            self.update_export_button()
             self.sql_editor.setPlainText("Ai is thinking...")
             self.statusbar.showMessage("Ai is thinking...")
 
@@ -78,17 +213,44 @@ class main(main_ui):
                 self.chat_button.setEnabled(False)
                 self.chat_button.setText("Thinking...")
 
+            settings = QSettings("AiSQL", "DatabaseSettings")
             selected_model = self.model_combo.currentText()
-            if selected_model == "openai/gpt-oss-20b":
-                llm_model = "openai/gpt-oss-20b"
-            else:
-                llm_model = f"google-gla:{selected_model}"
+            llm_model = self._llm_model_name(selected_model)
+            if self.race_check.isChecked():
+                race_models = [
+                    name.strip()
+                    for name in str(
+                        settings.value(
+                            "race_models", "gemini-2.5-flash,openai/gpt-oss-20b"
+                        )
+                    ).split(",")
+                    if name.strip()
+                ]
+                if len(race_models) > 1:
+                    llm_model = [self._llm_model_name(name) for name in race_models]
 
             print(f"Ai model: {llm_model}")
 
             try:
                 self.agent_worker = AgentDataWorker(
-                    llm_model, user_prompt, self.message_history
+                    llm_model,
+                    user_prompt,
+                    self.message_history,
+                    db_config=load_db_config(),
+                    toolset=str(settings.value("agent_toolset", "mcp")),
+                    max_rows=int(settings.value("agent_max_rows", 200)),
+                    cache_ttl=int(settings.value("tool_cache_ttl", 600)),
+                    cache_size=int(settings.value("tool_cache_size", 256)),
+                    validate_sql=str(settings.value("validate_sql", "false")).lower()
+                    == "true",
+                    max_estimated_rows=int(
+                        settings.value("max_estimated_rows", 1_000_000)
+                    ),
+                    max_repairs=int(settings.value("max_sql_repairs", 2)),
+                    few_shot_k=int(settings.value("few_shot_k", 3)),
+                    prompt_token_budget=int(
+                        settings.value("prompt_token_budget", 1500)
+                    ),
                 )
                 self.agent_worker.signal_finished.connect(self.on_chat_finished)
                 self.agent_worker.signal_error.connect(self.on_chat_error)
@@ -128,11 +290,18 @@ class main(main_ui):
             self.chat_button.setEnabled(True)
             self.chat_button.setText("Chat")
 
+        # Offer index-friendly rewrites before the SQL lands in the editor
+        settings = QSettings("AiSQL", "DatabaseSettings")
+        if str(settings.value("suggest_rewrites", "true")).lower() == "true":
+            sql_result = offer_rewrite(sql_result, self._configured_db_config(), self)
+
+        self.agent_digests.add(classify(sql_result).digest)
+
         # Set SQL result in editor
         self.sql_editor.setPlainText(sql_result)
 
         # Format the SQL
-        self.format_sql()
+        self._start_format(trace_id=getattr(self.agent_worker, "trace_id", None))
         print(f"Ai ทำงาน...สำเร็จ")
 
     def on_chat_error(self, error_message):
@@ -147,23 +316,108 @@ class main(main_ui):
         print(f"Ai ทำงาน...ผิดพลาด {error_message}")
 
     def run_query(self):
+        """Execute the editor's SQL in the current tab (a new tab if that one is busy)."""
+        if self.sql_editor.large_file_mode:
+            # Never send a whole dump to the server; run only what is selected
+            query = self.sql_editor.selected_sql().strip()
+            if not query:
+                self.statusbar.showMessage("ไฟล์มีขนาดใหญ่ กรุณาเลือกคำสั่ง SQL ที่ต้องการรัน")
+                return
+        else:
+            query = self.sql_editor.toPlainText().strip()
+        self._run_in_tab(query, new_tab=False)
+
+    def run_statement(self):
+        """Execute the statement under the cursor in a new tab."""
+        self._run_in_tab(self._statement_at_cursor(), new_tab=True)
+
+    def run_selection(self):
+        """Execute the selected SQL (or the statement under the cursor) in a new tab."""
+        query = self.sql_editor.selected_sql().strip() or self._statement_at_cursor()
+        self._run_in_tab(query, new_tab=True)
+
+    def _statement_at_cursor(self):
+        span = self._statement_span_at_cursor()
+        if span is None:
+            return ""
+        return self.sql_editor.toPlainText()[span[0] : span[1]].strip()
+
+    def _statement_span_at_cursor(self):
+        text = self.sql_editor.toPlainText()
+        index = _text_index(text, self.sql_editor.textCursor().position())
+        spans = statement_spans(text)
+        for start, end in spans:
+            if start <= index <= end:
+                return start, end
+        preceding = [span for span in spans if span[1] <= index]
+        return preceding[-1] if preceding else None
+
+    def optimize_query(self):
+        """Offer index-friendly rewrites of the selection or the statement under the cursor."""
+        text = self.sql_editor.toPlainText()
+        cursor = self.sql_editor.textCursor()
+        if cursor.hasSelection():
+            span = (_text_index(text, cursor.selectionStart()), _text_index(text, cursor.selectionEnd()))
+        else:
+            span = self._statement_span_at_cursor()
+        if span is None or not text[span[0] : span[1]].strip():
+            self.statusbar.showMessage("กรุณาเลือกคำสั่ง SQL ที่ต้องการปรับปรุง")
+            return
+        original = text[span[0] : span[1]]
+        rewritten, rewrites = rewrite_sargable(original)
+        if not rewrites:
+            self.statusbar.showMessage("ไม่พบเงื่อนไขที่ปรับให้ใช้ index ได้")
+            return
+        dialog = RewriteDialog(original, rewritten, rewrites, self._configured_db_config(), self)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        if self.sql_editor.toPlainText() != text:
+            self.statusbar.showMessage("SQL ถูกแก้ไขระหว่างปรับปรุง กรุณาลองอีกครั้ง")
+            return
+
+        # One edit block, so a single undo restores the original
+        cursor.beginEditBlock()
+        cursor.setPosition(_text_position(text, span[0]))
+        cursor.setPosition(_text_position(text, span[1]), QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText(rewritten)
+        cursor.endEditBlock()
+        self.statusbar.showMessage("ปรับปรุงเงื่อนไขให้ใช้ index ได้แล้ว")
+
+    def analyze_query(self):
+        """Show the plan of the selection, the statement under the cursor or the current tab's query."""
+        query = self.sql_editor.selected_sql().strip() or self._statement_at_cursor()
+        if not query:
+            query = self.current_tab().sql.strip()
+        if not query:
+            self.statusbar.showMessage("กรุณาเลือกคำสั่ง SQL ที่ต้องการวิเคราะห์")
+            return
+        db_config = self._configured_db_config()
+        if db_config is None:
+            self.statusbar.showMessage("กรุณาตั้งค่าการเชื่อมต่อฐานข้อมูลก่อน")
+            return
+        # Not modal, so the plan can stay open next to the editor
+        dialog = PlanDialog(query, db_config, self)
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        dialog.show()
+
+    def _configured_db_config(self):
+        """Connection settings for EXPLAIN, or None when none is configured."""
+        try:
+            db_config = load_db_config()
+        except Exception:
+            return None
+        return db_config if db_config["user"] and db_config["database"] else None
+
+    def _run_in_tab(self, query, new_tab):
         """Execute SQL query using background thread and pandas model."""
         try:
-            query = self.sql_editor.toPlainText().strip()
             if not query:
                 self._show_error("กรุณากรอกคำสั่ง SQL")
                 return
 
             # Load database settings
             try:
-                settings = QSettings("AiSQL", "DatabaseSettings")
-                db_config = {
-                    "host": str(settings.value("host", "localhost")),
-                    "port": int(settings.value("port", 3306)),
-                    "user": str(settings.value("user", "")),
-                    "password": str(settings.value("password", "")),
-                    "database": str(settings.value("database", "")),
-                }
+                db_config = load_db_config()
 
             except Exception as e:
                 error_msg = f"เกิดข้อผิดพลาด: {str(e)}"
@@ -177,206 +431,166 @@ class main(main_ui):
                 self._show_demo_data()
                 return
 
-            # Prevent execution of modifying queries
-            forbidden_keywords = [
-                "INSERT",
-                "UPDATE",
-                "DELETE",
-                "ALTER",
-                "CREATE",
-                "DROP",
-                "TRUNCATE",
-            ]
-            if any(keyword in query.upper() for keyword in forbidden_keywords):
+            # Confirm statements that modify the database
+            statement = classify(query)
+            if statement.is_write:
                 # warn user by ConfirmDialog
                 reply = QMessageBox.warning(
                     self,
                     "Warning",
-                    "คิวรีนี้จะแก้ไขฐานข้อมูล คุณแน่ใจว่าต้องการรันคิวรีนี้หรือไม่?",
+                    "คิวรีนี้จะแก้ไขฐานข้อมูล"
+                    + (f" ({', '.join(sorted(statement.targets))})" if statement.targets else "")
+                    + " คุณแน่ใจว่าต้องการรันคิวรีนี้หรือไม่?",
                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                     QMessageBox.StandardButton.No,
                 )
                 if reply == QMessageBox.StandardButton.No:
                     return
 
-            # Disable run button and show progress
-            self.run_button.setEnabled(False)
-            self.run_button.setText("Processing...")
+            settings = QSettings("AiSQL", "DatabaseSettings")
+            self.query_scheduler.set_limit(
+                profile_key(db_config), db_config["max_concurrent_queries"]
+            )
+
+            if statement.multi:
+                self._run_script(list(statement.statements), db_config, settings)
+                return
 
-            # Clear previous results
-            self.results_area.setModel(None)
+            tab = self.current_tab()
+            if new_tab or tab is None or tab.running:
+                tab = self.new_result_tab()
 
-            # Start background query execution
-            self.query_executor = QueryExecutor(query, db_config)
-            self.query_executor.finished.connect(self.on_query_finished)
-            self.query_executor.error.connect(self.on_query_error)
-            self.query_executor.progress.connect(self.on_progress_update)
-            self.query_executor.start()
+            # Start background query execution on the shared scheduler
+            source = "agent" if statement.digest in self.agent_digests else "editor"
+            tab.start_query(query, db_config, self.query_scheduler, source=source)
+            self.results_tabs.setTabToolTip(self.results_tabs.indexOf(tab), query)
 
         except Exception as e:
             # Catch-all exception handler to prevent application crash
             error_msg = f"เกิดข้อผิดพลาด: {str(e)}"
             self._show_error(error_msg)
 
-            # Restore button state
-            self.run_button.setEnabled(True)
-            self.run_button.setText("Run Query")
-
-    def on_query_finished(self, results, columns):
-        """Handle successful query completion."""
-        # Restore button state
-        self.run_button.setEnabled(True)
-        self.run_button.setText("Run Query")
-
-        if not results:
-            self.statusbar.showMessage("ไม่พบข้อมูล")
-            # Show no data message
-            model = QStandardItemModel(1, 1)
-            model.setHorizontalHeaderLabels(["Result"])
-            item = QStandardItem("ไม่พบข้อมูลที่ตรงตามเงื่อนไข")
-            item.setEditable(False)
-            model.setItem(0, 0, item)
-            self.results_area.setModel(model)
-            self.pandas_model = None
-            return
-
-        # Convert results to pandas DataFrame
-        df = pd.DataFrame(results, columns=columns)
-
-        # Create pandas model
-        self.pandas_model = PandasTableModel(df)
-
-        # Set model to table and enable sorting
-        self.results_area.setModel(self.pandas_model)
-        self.results_area.setSortingEnabled(True)
-        self.results_area.sortByColumn(0, Qt.SortOrder.AscendingOrder)
-        self.results_area.resizeColumnsToContents()
-
-        # Update status
-        self.results_data = results
-        self.columns_data = columns
-
-        # Enable export button
-        self.export_button.setEnabled(True)
-
-    def on_query_error(self, error_message):
-        """Handle query error."""
-        # Restore button state
-        self.run_button.setEnabled(True)
-        self.run_button.setText("Run Query")
-
-        # Show error in a message box
-        QMessageBox.critical(self, "Error", error_message)
-        self.results_area.setModel(None)
-        self.statusbar.showMessage("")
-
-    def setup_table_context_menu(self):
-        """Setup context menu for table headers."""
-        if hasattr(self, "results_area"):
-            header = self.results_area.horizontalHeader()
-            header.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
-            header.customContextMenuRequested.connect(self.show_header_context_menu)
-
-    def show_header_context_menu(self, position):
-        """Show context menu on header right-click."""
-        if self.pandas_model is None:
+    def _run_script(self, statements, db_config, settings):
+        """Run several statements: writes batched in transactions, SELECTs in parallel tabs."""
+        log_tab = self.new_result_tab("Script")
+        log_tab.running = True
+        log_tab.state_changed.emit()
+        run = ScriptRun(
+            statements,
+            db_config,
+            self.query_scheduler,
+            open_tab=lambda sql: self.new_result_tab(),
+            log_tab=log_tab,
+            continue_on_error=str(settings.value("script_continue_on_error", "false")).lower()
+            == "true",
+            max_rows=int(settings.value("large_result_rows", 100000)),
+            parent=self,
+        )
+        run.finished.connect(lambda: self.on_script_finished(run))
+        run.finished.connect(run.deleteLater)
+        run.start()
+
+    def on_script_finished(self, run):
+        # The log tab is gone when the user closed it to stop the script
+        if run.log_tab is not None:
+            self.results_tabs.setCurrentWidget(run.log_tab)
+
+    def current_tab(self):
+        return self.results_tabs.currentWidget()
+
+    def new_result_tab(self, title=None):
+        self.tab_counter += 1
+        tab = ResultTab(title or f"Result {self.tab_counter}")
+        tab.status_changed.connect(lambda message, tab=tab: self.on_tab_status(tab, message))
+        tab.state_changed.connect(lambda tab=tab: self.on_tab_state(tab))
+        tab.profile_changed.connect(lambda tab=tab: self.on_tab_profile(tab))
+        self.results_tabs.setCurrentIndex(self.results_tabs.addTab(tab, tab.title))
+        return tab
+
+    def close_result_tab(self, index):
+        tab = self.results_tabs.widget(index)
+        if tab is None:
             return
-
-        header = self.results_area.horizontalHeader()
-        logical_index = header.logicalIndexAt(position)
-
-        if logical_index < 0:
+        tab.detach(self.query_scheduler)
+        self.results_tabs.removeTab(index)
+        tab.deleteLater()
+        if self.results_tabs.count() == 0:
+            self.new_result_tab()
+
+    def on_tab_status(self, tab, message):
+        if tab is self.current_tab():
+            self.statusbar.showMessage(message)
+
+    def on_tab_state(self, tab):
+        index = self.results_tabs.indexOf(tab)
+        if index >= 0:
+            self.results_tabs.setTabText(index, ("⏳ " if tab.running else "") + tab.title)
+        self.update_export_button()
+        if tab is self.current_tab():
+            self.update_profile_readout()
+        running = self.query_scheduler.running_count()
+        self.run_button.setText(f"▶️ Run Query ({running} running)" if running else "▶️ Run Query")
+
+    def on_result_tab_changed(self, index):
+        tab = self.current_tab()
+        if tab is not None:
+            self.statusbar.showMessage(tab.status)
+        self.update_export_button()
+        self.update_profile_readout()
+
+    def on_tab_profile(self, tab):
+        if tab is self.current_tab():
+            self.update_profile_readout()
+
+    def update_profile_readout(self):
+        """Show the current tab's last run as a compact per-phase readout in the status bar."""
+        tab = self.current_tab()
+        profile = tab.performance if tab is not None and not tab.running else None
+        if profile is None:
+            self.profile_button.hide()
             return
+        self.profile_button.setText("⏱ " + format_profile(profile))
+        self.profile_button.show()
 
-        column_name = self.pandas_model.headerData(
-            logical_index, Qt.Orientation.Horizontal, Qt.ItemDataRole.DisplayRole
-        )
-
-        menu = QMenu(self)
-
-        # Filter action
-        filter_action = menu.addAction(f"Filter column '{column_name}'")
-        filter_action.triggered.connect(lambda: self.show_filter_dialog(column_name))
-
-        # Clear filter action (only if filter exists)
-        if column_name in self.pandas_model.column_filters:
-            clear_action = menu.addAction(f"Clear filter for '{column_name}'")
-            clear_action.triggered.connect(
-                lambda: self.clear_column_filter(column_name)
-            )
-
-        # Clear all filters action (only if any filters exist)
-        if self.pandas_model.column_filters:
-            menu.addSeparator()
-            clear_all_action = menu.addAction("Clear all filters")
-            clear_all_action.triggered.connect(self.clear_all_filters)
-
-        menu.exec(header.mapToGlobal(position))
-
-    def show_filter_dialog(self, column_name):
-        """Show simple filter dialog for a column."""
-        if not hasattr(self, "pandas_model") or not self.pandas_model:
+    def show_profile_details(self):
+        """Popup with the full timing breakdown of the current tab's last run."""
+        tab = self.current_tab()
+        if tab is None or tab.performance is None:
             return
-
-        # Get current filter text if exists
-        current_filter = self.pandas_model.column_filters.get(column_name, "")
-
-        # Simple input dialog
-        from PyQt6.QtWidgets import QInputDialog
-
-        text, ok = QInputDialog.getText(
-            self,
-            "Filter Column",
-            f"Enter filter text for '{column_name}':",
-            text=current_filter,
-        )
-
-        if ok:
-            self.pandas_model.set_column_filter(column_name, text.strip())
-            self.update_status_after_filter()
-
-    def clear_column_filter(self, column_name):
-        """Clear filter for a specific column."""
-        if self.pandas_model and column_name in self.pandas_model.column_filters:
-            del self.pandas_model.column_filters[column_name]
-            self.pandas_model.apply_filters()
-            self.update_status_after_filter()
-
-    def clear_all_filters(self):
-        """Clear all column filters."""
-        if self.pandas_model:
-            self.pandas_model.column_filters.clear()
-            self.pandas_model.apply_filters()
-            self.update_status_after_filter()
-
-    def update_status_after_filter(self):
-        """Update status label after filtering."""
-        if self.pandas_model:
-            filtered_count = self.pandas_model.rowCount()
-            total_count = len(self.pandas_model._original_dataframe)
-
-            if filtered_count == total_count:
-                self.statusbar.showMessage(f"Found {total_count} records")
-            else:
-                self.statusbar.showMessage(
-                    f"Showing {filtered_count} of {total_count} records (filtered)"
-                )
+        profile = tab.performance
+        box = QMessageBox(self)
+        box.setWindowTitle("Query Performance")
+        box.setText("<pre>" + html.escape(profile_details(profile)) + "</pre>")
+        copy_button = box.addButton("Copy JSON", QMessageBox.ButtonRole.ActionRole)
+        box.addButton(QMessageBox.StandardButton.Close)
+        box.exec()
+        if box.clickedButton() is copy_button:
+            QApplication.clipboard().setText(json.dumps(profile, ensure_ascii=False, indent=2, default=str))
+            self.statusbar.showMessage("คัดลอก query profile (JSON) แล้ว")
+
+    def set_dump_profile(self, enabled):
+        """Append every run's profile to appdata/profiles/query_profiles.jsonl while enabled."""
+        QSettings("AiSQL", "DatabaseSettings").setValue("dump_query_profile", enabled)
+
+    def update_export_button(self):
+        tab = self.current_tab()
+        self.export_button.setEnabled(bool(tab is not None and tab.results_data))
 
     def _show_error(self, error_message):
         """Helper method to display error messages in the results area"""
         self.statusbar.showMessage(error_message)
-        self.sql_editor.setPlainText(error_message)
-        model = QStandardItemModel()
-        model.setHorizontalHeaderLabels(["Error"])
-        model.appendRow([QStandardItem(error_message)])
-        self.results_area.setModel(model)
+        if not self.sql_editor.large_file_mode:  # never replace a loaded large file
+            self.sql_editor.setPlainText(error_message)
+        self.current_tab().show_message("Error", error_message)
+        self.update_export_button()
 
     def export_to_excel(self):
         """Export results to Excel file."""
         try:
             from datetime import datetime
 
-            if not self.results_data:
+            tab = self.current_tab()
+            if tab is None or not tab.results_data:
                 QMessageBox.warning(self, "Warning", "No data to export")
                 return
 
@@ -393,10 +607,7 @@ class main(main_ui):
 
             if filename:
                 # Export filtered data if available, otherwise export original data
-                if self.pandas_model and hasattr(self.pandas_model, "_dataframe"):
-                    df = self.pandas_model._dataframe
-                else:
-                    df = pd.DataFrame(self.results_data, columns=self.columns_data)
+                df = tab.export_dataframe()
 
                 # Save to Excel
                 df.to_excel(filename, index=False, engine="openpyxl")
@@ -428,19 +639,10 @@ class main(main_ui):
 
         # Create pandas DataFrame for demo data
         df = pd.DataFrame(demo_rows, columns=headers)
-        self.pandas_model = PandasTableModel(df)
-
-        # Set model to table and enable sorting
-        self.results_area.setModel(self.pandas_model)
-        self.results_area.setSortingEnabled(True)
-        self.results_area.resizeColumnsToContents()
-
-        # Store demo data for export
-        self.results_data = demo_rows
-        self.columns_data = headers
+        self.current_tab().show_dataframe(df, demo_rows, headers)
 
         # Enable export button for demo data
-        self.export_button.setEnabled(True)
+        self.update_export_button()
 
     def validate_query(self, query):
         # Basic SQL validation (simplified)
@@ -460,53 +662,194 @@ class main(main_ui):
     def clear_editor(self):
         self.sql_editor.clear()
         self.chat_text.clear()
-        model = QStandardItemModel()
-        self.results_area.setModel(model)
 
         # Clear data and disable export
-        self.results_data = []
-        self.columns_data = []
-        self.pandas_model = None
-        self.export_button.setEnabled(False)
+        self.current_tab().clear()
+        self.update_export_button()
 
     def format_sql(self):
-        # Format SQL using MySQLFormatter
-        query = self.sql_editor.toPlainText()
+        """Format the whole editor in the background."""
+        if self.sql_editor.large_file_mode:
+            self.statusbar.showMessage("ไฟล์มีขนาดใหญ่ จัดรูปแบบเฉพาะคำสั่งที่เลือกหรือคำสั่งปัจจุบัน")
+            self.format_selection()
+            return
+        self._start_format()
+
+    def format_selection(self):
+        """Format the selected text, or the statement under the cursor when nothing is selected."""
+        cursor = self.sql_editor.textCursor()
+        text = self.sql_editor.toPlainText()
+        if cursor.hasSelection():
+            self._start_format(
+                start=_text_index(text, cursor.selectionStart()),
+                end=_text_index(text, cursor.selectionEnd()),
+                text=text,
+            )
+        else:
+            self._start_format(cursor=_text_index(text, cursor.position()), text=text)
+
+    def _start_format(self, start=0, end=None, cursor=None, text=None, trace_id=None):
+        if self.format_worker is not None and self.format_worker.isRunning():
+            self.statusbar.showMessage("กำลังจัดรูปแบบ SQL อยู่ กรุณารอสักครู่")
+            return
+        query = self.sql_editor.toPlainText() if text is None else text
         if not query.strip():
             return
 
-        try:
-            # Use MySQLFormatter to format the SQL query
-            formatted = self.mysql_formatter.format_sql(
-                sql=query,
-                keyword_case="upper",
-                identifier_case="lower",
-                reindent=True,
-                indent_width=4,
-                use_space_around_operators=True,
-            )
-            self.sql_editor.setPlainText(formatted)
-        except Exception as e:
-            # Fallback to simple formatting if MySQLFormatter fails
-            formatted = query
-            formatted = re.sub(
-                r"\bSELECT\b", "\nSELECT", formatted, flags=re.IGNORECASE
-            )
-            formatted = re.sub(r"\bFROM\b", "\nFROM", formatted, flags=re.IGNORECASE)
-            formatted = re.sub(r"\bWHERE\b", "\nWHERE", formatted, flags=re.IGNORECASE)
-            formatted = re.sub(
-                r"\bORDER BY\b", "\nORDER BY", formatted, flags=re.IGNORECASE
-            )
-            formatted = re.sub(
-                r"\bGROUP BY\b", "\nGROUP BY", formatted, flags=re.IGNORECASE
+        self.format_worker = FormatWorker(
+            query, start=start, end=end, cursor=cursor, trace_id=trace_id
+        )
+        self.format_worker.revision = self.sql_editor.document().revision()
+        self.format_worker.finished.connect(self.on_format_finished)
+        self.format_worker.error.connect(self.on_format_error)
+        self.format_worker.progress.connect(self.on_progress_update)
+        self.format_worker.start()
+
+    def on_format_finished(self, edits):
+        """Patch only the statements that changed, keeping the cursor and scroll position."""
+        worker = self.format_worker
+        if worker is None or not edits:
+            return
+        if self.sql_editor.document().revision() != worker.revision:
+            self.statusbar.showMessage("SQL ถูกแก้ไขระหว่างจัดรูปแบบ กรุณาจัดรูปแบบอีกครั้ง")
+            return
+
+        text = worker.sql
+        cursor_index = _text_index(text, self.sql_editor.textCursor().position())
+        new_cursor_index = _map_cursor(text, cursor_index, edits)
+        scroll_value = self.sql_editor.verticalScrollBar().value()
+
+        cursor = self.sql_editor.textCursor()
+        cursor.beginEditBlock()
+        for start, end, formatted in reversed(edits):
+            cursor.setPosition(_text_position(text, start))
+            cursor.setPosition(_text_position(text, end), QTextCursor.MoveMode.KeepAnchor)
+            cursor.insertText(formatted)
+        cursor.endEditBlock()
+
+        cursor.setPosition(
+            _text_position(self.sql_editor.toPlainText(), new_cursor_index)
+        )
+        self.sql_editor.setTextCursor(cursor)
+        self.sql_editor.verticalScrollBar().setValue(scroll_value)
+
+    def on_format_error(self, error_message):
+        self.statusbar.showMessage(error_message)
+        print(error_message)
+
+    def show_race_stats(self):
+        """Show per-model win rates and latency percentiles of racing mode."""
+        rows = RaceStats().summary()
+        if not rows:
+            QMessageBox.information(self, "Model Race Stats", "ยังไม่มีข้อมูลการแข่งขัน")
+            return
+        lines = [f"{'Model':<32}{'Races':>7}{'Win %':>8}{'p50 s':>8}{'p95 s':>8}"]
+        for model, races, win_rate, p50, p95 in rows:
+            lines.append(
+                f"{model:<32}{races:>7}{win_rate * 100:>7.0f}%{p50:>8.2f}{p95:>8.2f}"
             )
-            formatted = re.sub(r";\s*$", ";\n", formatted, flags=re.MULTILINE)
-            self.sql_editor.setPlainText(formatted)
+        box = QMessageBox(self)
+        box.setWindowTitle("Model Race Stats")
+        box.setText("<pre>" + "\n".join(lines) + "</pre>")
+        box.exec()
+
+    def show_query_history(self):
+        """Search past runs and the slowest fingerprints; a chosen SQL goes to the editor."""
+        dialog = QueryHistoryDialog(self)
+        if dialog.exec() and dialog.selected_sql:
+            self.sql_editor.textCursor().insertText(dialog.selected_sql)
+
+    def show_trace_stats(self):
+        """Show p50/p95 agent timings per stage and model."""
+        dialog = TraceStatsDialog(self)
+        dialog.exec()
+
+    def closeEvent(self, event):
+        remove_notice_handler(self._notice_handler)
+        if self.schema_loader is not None:
+            self.schema_loader.wait()
+        if self.pool_warmer is not None:
+            self.pool_warmer.wait()
+        if self.file_loader is not None and self.file_loader.isRunning():
+            self.file_loader.cancel()
+            self.file_loader.wait()
+        shutdown_format_pool()
+        query_history.close()
+        super().closeEvent(event)
 
     def show_settings(self):
         """Show the database settings dialog."""
         dialog = DbSettingsDialog(self)
-        dialog.exec()
+        if dialog.exec():
+            self.load_schema()
+            self.warm_pool()
+        self.apply_editor_settings()
+
+    def fill_profile_menu(self):
+        """List the saved connection profiles with the active one checked."""
+        self.profile_menu.clear()
+        active = active_profile_name()
+        for name in load_profiles():
+            action = self.profile_menu.addAction(name)
+            action.setCheckable(True)
+            action.setChecked(name == active)
+            action.triggered.connect(lambda checked, name=name: self.switch_profile(name))
+
+    def switch_profile(self, name):
+        activate_profile(name)
+        self.statusbar.showMessage(f"ใช้โปรไฟล์การเชื่อมต่อ: {name}")
+        self.load_schema()
+        self.warm_pool()
+
+    def warm_pool(self):
+        """Open pooled connections in the background so the first query skips the handshake."""
+        db_config = load_db_config()
+        if not all([db_config["user"], db_config["database"]]) or db_config["warm_connections"] <= 0:
+            return
+        if self.pool_warmer is not None and self.pool_warmer.isRunning():
+            return
+        self.pool_warmer = PoolWarmer(db_config, db_config["warm_connections"])
+        self.pool_warmer.progress.connect(self.on_progress_update)
+        self.pool_warmer.error.connect(self.on_background_error)
+        self.pool_warmer.start()
+
+    def load_schema(self):
+        """Load tables and columns for completion in the background (disk cache first)."""
+        db_config = load_db_config()
+        if not all([db_config["user"], db_config["database"]]):
+            return
+        if self.schema_loader is not None and self.schema_loader.isRunning():
+            return
+        self.schema_loader = SchemaLoader(db_config)
+        self.schema_loader.loaded.connect(self.sql_editor.set_catalog)
+        self.schema_loader.progress.connect(self.on_progress_update)
+        self.schema_loader.error.connect(self.on_background_error)
+        self.schema_loader.start()
+
+    def on_background_error(self, error_message):
+        self.statusbar.showMessage(error_message)
+        print(error_message)
+
+    def apply_editor_settings(self):
+        settings = QSettings("AiSQL", "DatabaseSettings")
+        self.sql_editor.large_file_chars = (
+            int(settings.value("large_file_mb", 20)) * 1024 * 1024
+        )
+
+    def find_text(self):
+        """Find the next match in the editor, wrapping around at the end."""
+        text, ok = QInputDialog.getText(
+            self, "Find", "ค้นหา:", text=getattr(self, "last_find_text", "")
+        )
+        if not ok or not text:
+            return
+        self.last_find_text = text
+        if not self.sql_editor.find(text):
+            cursor = self.sql_editor.textCursor()
+            cursor.movePosition(QTextCursor.MoveOperation.Start)
+            self.sql_editor.setTextCursor(cursor)
+            if not self.sql_editor.find(text):
+                self.statusbar.showMessage(f"ไม่พบ: {text}")
 
     def save_sql(self):
         """Save the current SQL query to /sql directory only."""
@@ -569,7 +912,9 @@ class main(main_ui):
                 "SQL Files (*.sql);;Text Files (*.txt);;All Files (*)",
             )
 
-            if filename:
+            if filename and os.path.getsize(filename) >= self.sql_editor.large_file_chars:
+                self._load_large_file(filename)
+            elif filename:
                 # Read file content
                 with open(filename, "r", encoding="utf-8") as file:
                     sql_content = file.read()
@@ -588,8 +933,45 @@ class main(main_ui):
             QMessageBox.critical(self, "Error", f"Cannot open SQL file: {str(e)}")
             self.statusbar.showMessage(f"Open error: {str(e)}")
 
+    def _load_large_file(self, filename):
+        """Stream a big file into the editor in chunks, in large-file mode."""
+        if self.file_loader is not None and self.file_loader.isRunning():
+            self.file_loader.cancel()
+            self.file_loader.wait()
+        self.sql_editor.begin_chunked_load()
+        self.sql_editor.setReadOnly(True)
+        self.file_loader = FileLoader(filename)
+        self.file_loader.chunk.connect(self.on_file_chunk)
+        self.file_loader.progress.connect(
+            lambda percent, message: self.statusbar.showMessage(message)
+        )
+        self.file_loader.finished.connect(self.on_file_loaded)
+        self.file_loader.error.connect(self.on_file_load_error)
+        self.file_loader.start()
+
+    def on_file_chunk(self, text):
+        self.sql_editor.append_chunk(text)
+        self.file_loader.ack()
+
+    def on_file_loaded(self, filename):
+        self.sql_editor.setReadOnly(False)
+        cursor = self.sql_editor.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.Start)
+        self.sql_editor.setTextCursor(cursor)
+        size_mb = os.path.getsize(filename) / (1024 * 1024)
+        self.statusbar.showMessage(
+            f"SQL loaded from: {filename} ({size_mb:,.0f} MB, โหมดไฟล์ใหญ่: เลือกคำสั่งก่อนรัน)"
+        )
+
+    def on_file_load_error(self, error_message):
+        self.sql_editor.setReadOnly(False)
+        QMessageBox.critical(self, "Error", error_message)
+        self.statusbar.showMessage(f"Open error: {error_message}")
+
 
 if __name__ == "__main__":
+    # The formatter's process pool re-launches this executable when frozen
+    multiprocessing.freeze_support()
     print("Ai agent is running on background..")
     print(f"Do not close this terminal...")
     app = QApplication(sys.argv)
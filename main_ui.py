@@ -5,6 +5,7 @@ from PyQt6.QtWidgets import (
     QApplication,
     QMainWindow,
     QTextEdit,
+    QPlainTextEdit,
     QVBoxLayout,
     QHBoxLayout,
     QWidget,
@@ -16,14 +17,17 @@ from PyQt6.QtWidgets import (
     QTableView,
     QHeaderView,
     QComboBox,
+    QCheckBox,
+    QTabWidget,
 )
-from PyQt6.QtCore import Qt, QStringListModel, QRect, QAbstractTableModel
+from PyQt6.QtCore import Qt, QStringListModel, QRect, QAbstractTableModel, QObject, QTimer
 from PyQt6.QtGui import (
     QSyntaxHighlighter,
     QTextCharFormat,
     QColor,
     QFont,
     QTextCursor,
+    QTextLayout,
     QKeySequence,
     QAction,
     QStandardItemModel,
@@ -34,8 +38,16 @@ from PyQt6.QtGui import (
 
 from Version import VERSION_NAME, VERSION_CODE, VERSION_RELEASE
 
+from SchemaCatalog import PrefixTrie, completions
+
 
 class SQLSyntaxHighlighter(QSyntaxHighlighter):
+    # Block states: what is still open at the end of a line
+    NORMAL = 0
+    IN_COMMENT = 1
+    IN_STRING = 2
+    IN_DSTRING = 3
+
     def __init__(self, parent=None):
         super().__init__(parent)
 
@@ -122,58 +134,156 @@ class SQLSyntaxHighlighter(QSyntaxHighlighter):
             "FUNCTION",
         ]
 
-        # Define highlighting rules
-        self.highlighting_rules = []
-
         # Keywords format
         keyword_format = QTextCharFormat()
         keyword_format.setForeground(QColor(86, 156, 214))  # Blue
         keyword_format.setFontWeight(QFont.Weight.Bold)
 
-        for keyword in self.sql_keywords:
-            pattern = f"\\b{keyword}\\b"
-            self.highlighting_rules.append(
-                (re.compile(pattern, re.IGNORECASE), keyword_format)
-            )
-
         # String literals format
         string_format = QTextCharFormat()
         string_format.setForeground(QColor(206, 145, 120))  # Orange
-        self.highlighting_rules.append((re.compile(r"'[^']*'"), string_format))
-        self.highlighting_rules.append((re.compile(r'"[^"]*"'), string_format))
 
         # Numbers format
         number_format = QTextCharFormat()
         number_format.setForeground(QColor(181, 206, 168))  # Green
-        self.highlighting_rules.append((re.compile(r"\b\d+\.?\d*\b"), number_format))
 
         # Comments format
         comment_format = QTextCharFormat()
         comment_format.setForeground(QColor(106, 153, 85))  # Dark green
         comment_format.setFontItalic(True)
-        self.highlighting_rules.append((re.compile(r"--[^\n]*"), comment_format))
-        self.highlighting_rules.append(
-            (re.compile(r"/\*.*?\*/", re.DOTALL), comment_format)
-        )
 
         # Operators format
         operator_format = QTextCharFormat()
         operator_format.setForeground(QColor(212, 212, 212))  # Light gray
         operator_format.setFontWeight(QFont.Weight.Bold)
-        operators = ["=", "!=", "<>", "<", ">", "<=", ">=", "+", "-", "*", "/", "%"]
-        for op in operators:
-            self.highlighting_rules.append((re.compile(re.escape(op)), operator_format))
 
-    def highlightBlock(self, text):
-        for pattern, format in self.highlighting_rules:
-            for match in pattern.finditer(text):
-                start, end = match.span()
-                self.setFormat(start, end - start, format)
+        self.formats = {
+            "keyword": keyword_format,
+            "string": string_format,
+            "dstring": string_format,
+            "number": number_format,
+            "comment": comment_format,
+            "block": comment_format,
+            "operator": operator_format,
+        }
+
+        # One master pattern scanned left to right, so keywords inside strings,
+        # comments and `identifiers` are never coloured. Strings and /* */ may be
+        # left open at the end of a line; the block state carries them over.
+        keywords = "|".join(
+            sorted(set(map(re.escape, self.sql_keywords)), key=len, reverse=True)
+        )
+        self.master_pattern = re.compile(
+            r"(?P<comment>(?:--|#).*)"
+            r"|(?P<block>/\*.*?(?P<block_close>\*/|$))"
+            r"|(?P<string>'(?:[^'\\]|\\.|'')*(?P<string_close>')?)"
+            r'|(?P<dstring>"(?:[^"\\]|\\.|"")*(?P<dstring_close>")?)'
+            r"|(?P<ident>`[^`]*`?)"
+            r"|(?P<number>\b\d+\.?\d*\b)"
+            r"|(?P<keyword>\b(?:" + keywords + r")\b)"
+            r"|(?P<operator><=|>=|<>|!=|[=<>+\-*/%])",
+            re.IGNORECASE,
+        )
+        # Where an open construct from the previous line ends on this line
+        self.continuations = {
+            self.IN_COMMENT: (re.compile(r".*?\*/"), comment_format),
+            self.IN_STRING: (re.compile(r"(?:[^'\\]|\\.|'')*'"), string_format),
+            self.IN_DSTRING: (re.compile(r'(?:[^"\\]|\\.|"")*"'), string_format),
+        }
+        self.open_states = {
+            "block": self.IN_COMMENT,
+            "string": self.IN_STRING,
+            "dstring": self.IN_DSTRING,
+        }
+
+    def scan(self, text, state):
+        """Return ([(start, length, format), ...], end state) for one line."""
+        ranges = []
+        position = 0
+        if state in self.continuations:
+            pattern, format = self.continuations[state]
+            match = pattern.match(text)
+            if match is None:
+                # The whole line is still inside the comment or string
+                return [(0, len(text), format)], state
+            ranges.append((0, match.end(), format))
+            position = match.end()
+
+        state = self.NORMAL
+        for match in self.master_pattern.finditer(text, position):
+            kind = match.lastgroup
+            format = self.formats.get(kind)
+            if format is not None:
+                ranges.append((match.start(), match.end() - match.start(), format))
+            if kind in self.open_states and not match.group(kind + "_close"):
+                state = self.open_states[kind]
+        return ranges, state
 
+    def highlightBlock(self, text):
+        ranges, state = self.scan(text, self.previousBlockState())
+        for start, length, format in ranges:
+            self.setFormat(start, length, format)
+        self.setCurrentBlockState(state)
+
+
+class ViewportHighlighter(QObject):
+    """Colour only the lines on screen, for documents too large for QSyntaxHighlighter.
+
+    Formats are set on each visible block's layout instead of the document, so
+    nothing is stored for lines that are never shown. The lexer state carried
+    between lines starts from what was last computed for the line above the
+    viewport, so a comment opened far above the visible area may be missed.
+    """
+
+    def __init__(self, editor, lexer):
+        super().__init__(editor)
+        self.editor = editor
+        self.lexer = lexer
+        self.enabled = False
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(30)
+        self.timer.timeout.connect(self.refresh)
+        editor.verticalScrollBar().valueChanged.connect(self.schedule)
+        editor.textChanged.connect(self.schedule)
+
+    def schedule(self):
+        if self.enabled:
+            self.timer.start()
+
+    def refresh(self):
+        if not self.enabled:
+            return
+        editor = self.editor
+        block = editor.firstVisibleBlock()
+        previous = block.previous()
+        state = previous.userState() if previous.isValid() and previous.userState() >= 0 else 0
+        offset = editor.contentOffset()
+        height = editor.viewport().height()
+        while block.isValid():
+            if editor.blockBoundingGeometry(block).translated(offset).top() > height:
+                break
+            ranges, state = self.lexer.scan(block.text(), state)
+            formats = []
+            for start, length, format in ranges:
+                format_range = QTextLayout.FormatRange()
+                format_range.start = start
+                format_range.length = length
+                format_range.format = format
+                formats.append(format_range)
+            block.layout().setFormats(formats)
+            block.setUserState(state)
+            block = block.next()
+        editor.viewport().update()
+
+
+class SQLTextEdit(QPlainTextEdit):
+    # Documents at least this large open in large-file mode (set from Settings)
+    large_file_chars = 20 * 1024 * 1024
 
-class SQLTextEdit(QTextEdit):
     def __init__(self):
         super().__init__()
+        self.large_file_mode = False
 
         # Set font
         font = QFont("Consolas", 11)
@@ -186,6 +296,7 @@ class SQLTextEdit(QTextEdit):
 
         # Apply syntax highlighter
         self.highlighter = SQLSyntaxHighlighter(self.document())
+        self.viewport_highlighter = ViewportHighlighter(self, SQLSyntaxHighlighter())
 
         # Setup auto-completion
         self.setup_completer()
@@ -250,17 +361,85 @@ class SQLTextEdit(QTextEdit):
             "CURRENT_TIMESTAMP",
         ]
 
-        self.completer = QCompleter(sql_completions)
-        self.completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.keyword_trie = PrefixTrie(sql_completions)
+        self.catalog = None
+        self.completion_prefix = ""
+
+        # Suggestions are computed by `completions`, so the completer shows its model as-is
+        self.completion_model = QStringListModel()
+        self.completer = QCompleter(self.completion_model, self)
+        self.completer.setCompletionMode(
+            QCompleter.CompletionMode.UnfilteredPopupCompletion
+        )
         self.completer.setWidget(self)
         self.completer.activated.connect(self.insert_completion)
 
+        # Look up suggestions once typing pauses instead of on every keystroke
+        self.completion_timer = QTimer(self)
+        self.completion_timer.setSingleShot(True)
+        self.completion_timer.setInterval(120)
+        self.completion_timer.timeout.connect(self.update_completions)
+
+    def set_catalog(self, catalog):
+        """Use `catalog` (a SchemaCatalog) for table and column completion."""
+        self.catalog = catalog
+
+    def set_large_file_mode(self, enabled):
+        """Switch off whole-document highlighting, undo, wrapping and completion for huge files."""
+        if enabled == self.large_file_mode:
+            return
+        self.large_file_mode = enabled
+        self.viewport_highlighter.enabled = enabled
+        self.setUndoRedoEnabled(not enabled)
+        self.setLineWrapMode(
+            QPlainTextEdit.LineWrapMode.NoWrap
+            if enabled
+            else QPlainTextEdit.LineWrapMode.WidgetWidth
+        )
+        self.highlighter.setDocument(None if enabled else self.document())
+        if enabled:
+            self.completer.popup().hide()
+            self.viewport_highlighter.schedule()
+
+    def setPlainText(self, text):
+        if len(text) >= self.large_file_chars:
+            self.set_large_file_mode(True)
+            super().setPlainText(text)
+        else:
+            # Leave large-file mode after the big text is gone, so it is never rehighlighted
+            super().setPlainText(text)
+            self.set_large_file_mode(False)
+
+    def clear(self):
+        super().clear()
+        self.set_large_file_mode(False)
+
+    def begin_chunked_load(self):
+        """Empty the editor in large-file mode, ready for append_chunk calls."""
+        self.set_large_file_mode(True)
+        super().clear()
+
+    def append_chunk(self, text):
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(text)
+
+    def selected_sql(self):
+        # Qt returns paragraph separators instead of newlines for multi-line selections
+        return self.textCursor().selectedText().replace("\u2029", "\n")
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.viewport_highlighter.schedule()
+
     def insert_completion(self, completion):
         cursor = self.textCursor()
-        extra = len(completion) - len(self.completer.completionPrefix())
-        cursor.movePosition(QTextCursor.MoveOperation.Left)
-        cursor.movePosition(QTextCursor.MoveOperation.EndOfWord)
-        cursor.insertText(completion[-extra:])
+        cursor.movePosition(
+            QTextCursor.MoveOperation.Left,
+            QTextCursor.MoveMode.KeepAnchor,
+            len(self.completion_prefix),
+        )
+        cursor.insertText(completion)
         self.setTextCursor(cursor)
 
     def keyPressEvent(self, event):
@@ -276,26 +455,54 @@ class SQLTextEdit(QTextEdit):
                 return
 
         super().keyPressEvent(event)
+        if self.large_file_mode:
+            return
 
-        # Trigger auto-completion
-        cursor = self.textCursor()
-        cursor.select(QTextCursor.SelectionType.WordUnderCursor)
-        word = cursor.selectedText()
-
-        if len(word) >= 2:
-            self.completer.setCompletionPrefix(word.upper())
-            popup = self.completer.popup()
-            popup.setCurrentIndex(self.completer.completionModel().index(0, 0))
-
-            cursor_rect = self.cursorRect()
-            cursor_rect.setWidth(
-                popup.sizeHintForColumn(0)
-                + popup.verticalScrollBar().sizeHint().width()
-            )
-            self.completer.complete(cursor_rect)
+        # Trigger auto-completion after a short pause
+        if (event.text() and event.text().isprintable()) or event.key() == Qt.Key.Key_Backspace:
+            self.completion_timer.start()
         else:
             self.completer.popup().hide()
 
+    def update_completions(self):
+        cursor = self.textCursor()
+        block = cursor.block()
+        # Only the current statement matters, so search the text up to a few blocks around
+        start = block
+        for _ in range(200):
+            if not start.previous().isValid() or ";" in start.previous().text():
+                break
+            start = start.previous()
+        end = block
+        for _ in range(200):
+            if ";" in end.text() or not end.next().isValid():
+                break
+            end = end.next()
+        text_cursor = QTextCursor(self.document())
+        text_cursor.setPosition(start.position())
+        text_cursor.setPosition(
+            end.position() + end.length() - 1, QTextCursor.MoveMode.KeepAnchor
+        )
+        text = text_cursor.selectedText().replace("\u2029", "\n")
+        position = cursor.position() - start.position()
+
+        suggestions, prefix = completions(self.catalog, self.keyword_trie, text, position)
+        after_dot = text[: position - len(prefix)].endswith(".")
+        if not suggestions or (len(prefix) < 2 and not after_dot):
+            self.completer.popup().hide()
+            return
+
+        self.completion_prefix = prefix
+        self.completion_model.setStringList(suggestions)
+        popup = self.completer.popup()
+        popup.setCurrentIndex(self.completer.completionModel().index(0, 0))
+
+        cursor_rect = self.cursorRect()
+        cursor_rect.setWidth(
+            popup.sizeHintForColumn(0) + popup.verticalScrollBar().sizeHint().width()
+        )
+        self.completer.complete(cursor_rect)
+
 
 class main_ui(QMainWindow):
     def setupUi(self):
@@ -394,6 +601,10 @@ class main_ui(QMainWindow):
             }
         """
         )
+        # Racing mode: ask several models at once and keep the first valid answer
+        self.race_check = QCheckBox("Race")
+        self.race_check.setToolTip("ส่งคำถามให้หลายโมเดลพร้อมกัน (ตั้งค่าใน File > Settings)")
+
         self.export_button.setStyleSheet(
             """
             QPushButton {
@@ -439,6 +650,7 @@ class main_ui(QMainWindow):
         toolbar_layout.addStretch()
         toolbar_layout.addWidget(self.run_button)
         toolbar_layout.addWidget(self.model_combo)
+        toolbar_layout.addWidget(self.race_check)
 
         layout.addLayout(toolbar_layout)
 
@@ -503,35 +715,16 @@ class main_ui(QMainWindow):
         # SQL text editor
         self.sql_editor = SQLTextEdit()
 
-        # Results area - TableView
-        self.results_area = QTableView()
-        self.results_area.setMinimumHeight(100)  # Minimum height when collapsed
-        self.results_area.setStyleSheet(
-            """
-            QTableView {
-                background-color: white;
-                color: black;
-                border: 1px solid #cccccc;
-                gridline-color: #e0e0e0;
-                font-family: 'Consolas', monospace;
-            }
-            QHeaderView::section {
-                background-color: #f0f0f0;
-                color: black;
-                padding: 4px;
-                border: 1px solid #cccccc;
-                font-weight: bold;
-            }
-        """
-        )
+        # Results area - one tab per query
+        self.results_tabs = QTabWidget()
+        self.results_tabs.setMinimumHeight(100)  # Minimum height when collapsed
+        self.results_tabs.setTabsClosable(True)
+        self.results_tabs.setMovable(True)
+        self.results_tabs.setDocumentMode(True)
 
         # Add widgets to splitter
         splitter.addWidget(self.sql_editor)
-        splitter.addWidget(self.results_area)
-
-        # Initialize empty model
-        self.results_model = QStandardItemModel()
-        self.results_area.setModel(self.results_model)
+        splitter.addWidget(self.results_tabs)
 
         # Add status bar
         self.statusbar = self.statusBar()
@@ -546,6 +739,14 @@ class main_ui(QMainWindow):
         )
         self.statusbar.showMessage("Ready")
 
+        # Per-phase timings of the current tab's last run; click for details
+        self.profile_button = QPushButton()
+        self.profile_button.setFlat(True)
+        self.profile_button.setStyleSheet("QPushButton { color: #9cdcfe; padding: 0 6px; }")
+        self.profile_button.setToolTip("Query performance details")
+        self.profile_button.hide()
+        self.statusbar.addPermanentWidget(self.profile_button)
+
         # Set splitter stretch factors and initial sizes
         splitter.setStretchFactor(0, 3)  # Editor gets 3/4 of the space
         splitter.setStretchFactor(1, 1)  # Results get 1/4 of the space
@@ -588,6 +789,9 @@ class main_ui(QMainWindow):
         # Store reference to settings action for later connection
         self.settings_action = settings_action
 
+        # Connection profiles, filled in when the menu opens
+        self.profile_menu = file_menu.addMenu("Connection Profile")
+
         # Edit menu
         edit_menu = menubar.addMenu("Edit")
 
@@ -601,6 +805,23 @@ class main_ui(QMainWindow):
         paste_action.triggered.connect(self.sql_editor.paste)
         edit_menu.addAction(paste_action)
 
+        find_action = QAction("Find...", self)
+        find_action.setShortcut(QKeySequence.StandardKey.Find)
+        edit_menu.addAction(find_action)
+        self.find_action = find_action
+
+        edit_menu.addSeparator()
+
+        format_action = QAction("Format SQL", self)
+        format_action.setShortcut("Ctrl+Shift+F")
+        format_action.triggered.connect(self.format_button.click)
+        edit_menu.addAction(format_action)
+
+        format_selection_action = QAction("Format Selection / Current Statement", self)
+        format_selection_action.setShortcut("Ctrl+Alt+F")
+        edit_menu.addAction(format_selection_action)
+        self.format_selection_action = format_selection_action
+
         # Query menu
         query_menu = menubar.addMenu("Query")
 
@@ -612,6 +833,48 @@ class main_ui(QMainWindow):
         # Store reference for main class to connect
         self.run_action = run_action
 
+        run_statement_action = QAction("Run Statement in New Tab", self)
+        run_statement_action.setShortcut("Ctrl+Return")
+        query_menu.addAction(run_statement_action)
+        self.run_statement_action = run_statement_action
+
+        run_selection_action = QAction("Run Selection in New Tab", self)
+        run_selection_action.setShortcut("Ctrl+Shift+Return")
+        query_menu.addAction(run_selection_action)
+        self.run_selection_action = run_selection_action
+
+        optimize_action = QAction("Optimize Query...", self)
+        query_menu.addAction(optimize_action)
+        self.optimize_action = optimize_action
+
+        analyze_action = QAction("Analyze Query...", self)
+        query_menu.addAction(analyze_action)
+        self.analyze_action = analyze_action
+
+        query_menu.addSeparator()
+
+        race_stats_action = QAction("Model Race Stats...", self)
+        query_menu.addAction(race_stats_action)
+        self.race_stats_action = race_stats_action
+
+        refresh_schema_action = QAction("Refresh Schema", self)
+        query_menu.addAction(refresh_schema_action)
+        self.refresh_schema_action = refresh_schema_action
+
+        dump_profile_action = QAction("Dump Performance as JSON", self)
+        dump_profile_action.setCheckable(True)
+        query_menu.addAction(dump_profile_action)
+        self.dump_profile_action = dump_profile_action
+
+        history_action = QAction("Query History...", self)
+        history_action.setShortcut("Ctrl+H")
+        query_menu.addAction(history_action)
+        self.history_action = history_action
+
+        trace_stats_action = QAction("Agent Timing...", self)
+        query_menu.addAction(trace_stats_action)
+        self.trace_stats_action = trace_stats_action
+
     def set_dark_theme(self):
         self.setStyleSheet(
             """
@@ -619,7 +882,7 @@ class main_ui(QMainWindow):
                 background-color: #1e1e1e;
                 color: #ffffff;
             }
-            QTextEdit {
+            QTextEdit, QPlainTextEdit {
                 background-color: #2d2d30;
                 color: #ffffff;
                 border: 1px solid #3e3e42;
@@ -0,0 +1,140 @@
+import sys
+from PyQt6.QtWidgets import (QApplication, QDialog, QVBoxLayout, QTreeWidget,
+                            QTreeWidgetItem, QTableWidget, QTableWidgetItem,
+                            QDialogButtonBox, QHeaderView, QLabel, QListWidget,
+                            QSplitter)
+from PyQt6.QtCore import Qt, QThread
+
+from IndexAdvisor import PlanAnalyzer
+
+
+class PlanDialog(QDialog):
+    """
+    Shows the execution plan of a query as a tree with estimated and actual
+    rows per node, the problems found in it and candidate composite indexes.
+    """
+    def __init__(self, sql, db_config, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Query Plan")
+        self.setMinimumSize(860, 600)
+        self.sql = sql
+        self.db_config = db_config
+        self.analyzer = None
+        self.suggestions = []
+
+        self.setup_ui()
+        self.run_analysis(analyze=False)
+
+    def setup_ui(self):
+        """Set up the user interface components."""
+        layout = QVBoxLayout()
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        splitter = QSplitter(Qt.Orientation.Vertical)
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Operation", "Estimated rows", "Actual rows", "Notes"])
+        self.tree.header().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        splitter.addWidget(self.tree)
+
+        self.problem_list = QListWidget()
+        splitter.addWidget(self.problem_list)
+
+        self.index_table = QTableWidget(0, 2)
+        self.index_table.setHorizontalHeaderLabels(["Candidate index", "Reason"])
+        self.index_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.index_table.horizontalHeader().setStretchLastSection(True)
+        splitter.addWidget(self.index_table)
+        splitter.setSizes([320, 120, 120])
+        layout.addWidget(splitter, 1)
+
+        self.button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        self.analyze_btn = self.button_box.addButton("Measure Actual Rows", QDialogButtonBox.ButtonRole.ActionRole)
+        self.analyze_btn.setToolTip("Runs the query with EXPLAIN ANALYZE to count the rows each step really reads")
+        self.analyze_btn.setEnabled(False)
+        self.analyze_btn.clicked.connect(lambda: self.run_analysis(analyze=True))
+        copy_btn = self.button_box.addButton("Copy CREATE INDEX", QDialogButtonBox.ButtonRole.ActionRole)
+        copy_btn.clicked.connect(self.copy_ddl)
+        self.button_box.rejected.connect(self.reject)
+        layout.addWidget(self.button_box)
+
+        self.setLayout(layout)
+
+    def run_analysis(self, analyze):
+        """EXPLAIN the query in the background; with `analyze` it really runs."""
+        if self.analyzer is not None and self.analyzer.isRunning():
+            return
+        self.analyze_btn.setEnabled(False)
+        self.analyzer = PlanAnalyzer(self.sql, self.db_config, analyze=analyze)
+        self.analyzer.progress.connect(self.status_label.setText)
+        self.analyzer.finished.connect(self.on_analysis_finished)
+        self.analyzer.error.connect(self.on_analysis_error)
+        self.analyzer.start()
+
+    def _add_nodes(self, parent, nodes):
+        for node in nodes:
+            item = QTreeWidgetItem(parent, [
+                node["label"],
+                "" if node["rows"] is None else f"{int(node['rows']):,}",
+                "" if node["actual"] is None else f"{int(node['actual']):,}",
+                node["notes"],
+            ])
+            item.setToolTip(0, node["label"])
+            item.setToolTip(3, node["notes"])
+            self._add_nodes(item, node["children"])
+
+    def on_analysis_finished(self, result):
+        self.tree.clear()
+        self._add_nodes(self.tree, result["tree"])
+        self.tree.expandAll()
+
+        self.problem_list.clear()
+        self.problem_list.addItems(result["problems"] or ["ไม่พบปัญหาในแผนการทำงาน"])
+
+        self.suggestions = result["suggestions"]
+        self.index_table.setRowCount(len(self.suggestions))
+        for row, suggestion in enumerate(self.suggestions):
+            index = QTableWidgetItem(f"{suggestion['table']}({', '.join(suggestion['columns'])})")
+            index.setToolTip(suggestion["ddl"])
+            self.index_table.setItem(row, 0, index)
+            self.index_table.setItem(row, 1, QTableWidgetItem(suggestion["reason"]))
+
+        self.analyze_btn.setEnabled(bool(result["analyze_mode"]))
+        if not result["analyze_mode"]:
+            self.analyze_btn.setToolTip(f"EXPLAIN ANALYZE is not supported by {result['server']}")
+        mode = "EXPLAIN ANALYZE" if result["analyzed"] else "EXPLAIN FORMAT=JSON"
+        self.status_label.setText(f"{mode} บน {result['server']}")
+
+    def on_analysis_error(self, error_message):
+        self.status_label.setText(error_message)
+
+    def copy_ddl(self):
+        """Copy the CREATE INDEX statements of the selected (or all) candidates."""
+        rows = sorted({index.row() for index in self.index_table.selectedIndexes()}) or range(len(self.suggestions))
+        ddl = ";\n".join(self.suggestions[row]["ddl"] for row in rows)
+        if ddl:
+            QApplication.clipboard().setText(ddl + ";")
+            self.status_label.setText("คัดลอกคำสั่ง CREATE INDEX แล้ว")
+
+    def done(self, result):
+        """Close without waiting for an analysis still in flight."""
+        if self.analyzer is not None and self.analyzer.isRunning():
+            for signal in (self.analyzer.progress, self.analyzer.finished, self.analyzer.error):
+                signal.disconnect()
+            self.analyzer.setParent(QApplication.instance())
+            # QThread.finished, which PlanAnalyzer shadows with its result signal
+            QThread.finished.__get__(self.analyzer, QThread).connect(self.analyzer.deleteLater)
+            if self.analyzer.isFinished():
+                self.analyzer.deleteLater()
+        self.analyzer = None
+        super().done(result)
+
+
+if __name__ == "__main__":
+    from db_setting_dlg import load_db_config
+
+    app = QApplication(sys.argv)
+    dialog = PlanDialog(sys.argv[1] if len(sys.argv) > 1 else "SELECT 1", load_db_config())
+    dialog.show()
+    sys.exit(app.exec())
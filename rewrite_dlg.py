@@ -0,0 +1,116 @@
+import sys
+from PyQt6.QtWidgets import (QApplication, QDialog, QVBoxLayout, QTableWidget,
+                            QTableWidgetItem, QDialogButtonBox, QHeaderView, QLabel,
+                            QPlainTextEdit)
+from PyQt6.QtCore import QThread
+from PyQt6.QtGui import QFontDatabase
+
+from SargableRewriter import PlanComparer, rewrite_sargable, sql_diff
+
+
+class RewriteDialog(QDialog):
+    """
+    Shows the index-friendly rewrites of a query as a diff, with the EXPLAIN
+    rows-examined estimate of both versions, and lets the user apply them.
+    """
+    def __init__(self, original, rewritten, rewrites, db_config=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Optimize Query")
+        self.setMinimumSize(760, 520)
+        self.original = original
+        self.rewritten = rewritten
+        self.rewrites = rewrites
+        self.comparer = None
+
+        self.setup_ui()
+        self.compare_plans(db_config)
+
+    def setup_ui(self):
+        """Set up the user interface components."""
+        layout = QVBoxLayout()
+
+        layout.addWidget(QLabel(f"พบเงื่อนไขที่ปรับให้ใช้ index ได้ {len(self.rewrites)} จุด"))
+
+        self.table = QTableWidget(len(self.rewrites), 3)
+        self.table.setHorizontalHeaderLabels(["Rule", "Before", "After"])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        for row, rewrite in enumerate(self.rewrites):
+            for column, value in enumerate((rewrite.rule, rewrite.before, rewrite.after)):
+                self.table.setItem(row, column, QTableWidgetItem(" ".join(value.split())))
+        layout.addWidget(self.table)
+
+        self.diff_view = QPlainTextEdit()
+        self.diff_view.setReadOnly(True)
+        self.diff_view.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.diff_view.setPlainText(sql_diff(self.original, self.rewritten))
+        layout.addWidget(self.diff_view, 1)
+
+        self.plan_label = QLabel()
+        layout.addWidget(self.plan_label)
+
+        self.button_box = QDialogButtonBox()
+        self.button_box.addButton("Apply Rewrite", QDialogButtonBox.ButtonRole.AcceptRole)
+        self.button_box.addButton("Keep Original", QDialogButtonBox.ButtonRole.RejectRole)
+        self.button_box.accepted.connect(self.accept)
+        self.button_box.rejected.connect(self.reject)
+        layout.addWidget(self.button_box)
+
+        self.setLayout(layout)
+
+    def compare_plans(self, db_config):
+        """EXPLAIN both versions in the background."""
+        if not db_config:
+            self.plan_label.setText("EXPLAIN: ยังไม่ได้ตั้งค่าการเชื่อมต่อฐานข้อมูล")
+            return
+        self.comparer = PlanComparer(self.original, self.rewritten, db_config)
+        self.comparer.progress.connect(self.plan_label.setText)
+        self.comparer.finished.connect(self.on_compare_finished)
+        self.comparer.error.connect(self.on_compare_error)
+        self.comparer.start()
+
+    def on_compare_finished(self, examined):
+        before, after = examined
+        if before and after <= before:
+            change = f"ลดลง {(before - after) / before * 100:.1f}%"
+        elif before:
+            change = f"เพิ่มขึ้น {(after - before) / before * 100:.1f}%"
+        else:
+            change = "ไม่มีคำสั่ง SELECT ให้เปรียบเทียบ"
+        self.plan_label.setText(
+            f"EXPLAIN rows examined: {before:,} → {after:,} ({change})"
+        )
+
+    def on_compare_error(self, error_message):
+        self.plan_label.setText(error_message)
+
+    def done(self, result):
+        """Close without waiting for an EXPLAIN still in flight."""
+        if self.comparer is not None and self.comparer.isRunning():
+            for signal in (self.comparer.progress, self.comparer.finished, self.comparer.error):
+                signal.disconnect()
+            self.comparer.setParent(QApplication.instance())
+            # QThread.finished, which PlanComparer shadows with its result signal
+            QThread.finished.__get__(self.comparer, QThread).connect(self.comparer.deleteLater)
+            if self.comparer.isFinished():
+                self.comparer.deleteLater()
+        self.comparer = None
+        super().done(result)
+
+
+def offer_rewrite(sql, db_config=None, parent=None):
+    """Rewrite `sql` and ask the user about it; returns the SQL to use.
+
+    Returns `sql` unchanged when nothing can be rewritten or the user keeps it.
+    """
+    rewritten, rewrites = rewrite_sargable(sql)
+    if not rewrites:
+        return sql
+    dialog = RewriteDialog(sql, rewritten, rewrites, db_config, parent)
+    return rewritten if dialog.exec() == QDialog.DialogCode.Accepted else sql
+
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    query = sys.argv[1] if len(sys.argv) > 1 else "SELECT * FROM ovst WHERE YEAR(vstdate) = 2024"
+    print(offer_rewrite(query))
@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication, QTableView
+
+from ColumnSizer import ColumnSizer, sample_positions, widest_texts
+from PandasTableModel import PandasTableModel
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def test_small_tables_measure_every_row():
+    assert list(sample_positions(5, size=10)) == [0, 1, 2, 3, 4]
+
+
+def test_sample_keeps_the_edges_and_is_repeatable():
+    positions = sample_positions(10_000, size=1000, edge=100)
+    assert len(positions) == len(set(positions)) == 1000
+    assert list(positions[:100]) == list(range(100))
+    assert list(positions[-100:]) == list(range(9900, 10_000))
+    assert np.array_equal(positions, sample_positions(10_000, size=1000, edge=100))
+
+
+def test_widest_texts_picks_the_longest_per_column():
+    dataframe = pd.DataFrame({"name": ["a", "abcd", None, "ab"], "n": [1, 22, 333, 4]})
+    candidates = widest_texts(dataframe, np.arange(4), per_column=2)
+    assert sorted(candidates[0]) == ["ab", "abcd"]
+    assert sorted(candidates[1]) == ["22", "333"]
+    assert "None" not in widest_texts(dataframe, np.array([2]), per_column=1)[0]
+
+
+def test_fit_caps_widths_and_keeps_manual_sizes(app):
+    table = QTableView()
+    sizer = ColumnSizer(table, max_width=120)
+    model = PandasTableModel(pd.DataFrame({"code": ["x"], "note": ["long text " * 50]}))
+    table.setModel(model)
+    sizer.fit(model)
+    assert table.columnWidth(1) == 120
+    assert table.columnWidth(0) < 120
+
+    table.setColumnWidth(0, 90)
+    sizer._apply([60, 60], widen_only=False)
+    assert table.columnWidth(0) == 90
+    assert table.columnWidth(1) == 60
+    sizer.stop()
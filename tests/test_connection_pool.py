@@ -0,0 +1,96 @@
+from contextlib import contextmanager
+
+import pymysql
+import pytest
+
+import ConnectionPool
+
+
+PROFILE = {"host": "primary", "port": 3306, "database": "hos", "replica_host": "replica", "max_replica_lag": 30}
+
+
+class FakePool:
+    def __init__(self, db_config):
+        self.host = db_config["host"]
+
+    @contextmanager
+    def connection(self):
+        yield self
+
+
+@pytest.fixture
+def routing(monkeypatch):
+    """Fresh routing state; `lag` is what the replica reports (or an exception to raise)."""
+    state = {"lag": 0, "notices": []}
+
+    def lag(connection):
+        if isinstance(state["lag"], Exception):
+            raise state["lag"]
+        return state["lag"]
+
+    monkeypatch.setattr(ConnectionPool, "_replicas", {})
+    monkeypatch.setattr(ConnectionPool, "_last_writes", {})
+    monkeypatch.setattr(ConnectionPool, "_notice_handlers", [state["notices"].append])
+    monkeypatch.setattr(ConnectionPool, "get_pool", FakePool)
+    monkeypatch.setattr(ConnectionPool, "replica_lag", lag)
+    return state
+
+
+def route(read_only=True):
+    pool, role = ConnectionPool.routed_pool(PROFILE, read_only)
+    return pool.host, role
+
+
+def test_reads_go_to_a_healthy_replica(routing):
+    assert route() == ("replica", "replica")
+    assert route(read_only=False) == ("primary", "primary")
+
+
+def test_profile_without_replica_uses_primary(routing):
+    assert ConnectionPool.routed_pool({"host": "primary"}, True)[1] == "primary"
+
+
+def test_lagging_replica_is_skipped_and_reported(routing):
+    routing["lag"] = 31
+    assert route() == ("primary", "primary")
+    assert routing["notices"] == ["ข้าม replica replica:3306 ใช้ primary แทน: lag 31 s > 30 s"]
+    routing["lag"] = 0
+    assert route() == ("primary", "primary")  # still skipped for REPLICA_RETRY_AFTER
+
+
+def test_stopped_replication_is_skipped(routing):
+    routing["lag"] = None
+    assert route() == ("primary", "primary")
+
+
+def test_unreachable_replica_is_skipped(routing):
+    routing["lag"] = pymysql.OperationalError(2003, "Can't connect")
+    assert route() == ("primary", "primary")
+    assert len(routing["notices"]) == 1
+
+
+def test_unknown_lag_keeps_the_replica(routing):
+    routing["lag"] = pymysql.ProgrammingError(1227, "Access denied")
+    assert route() == ("replica", "replica")
+    assert routing["notices"][0].startswith("อ่านค่า lag ของ replica ไม่ได้")
+
+
+def test_reads_after_a_write_use_the_primary(routing):
+    ConnectionPool.note_write(PROFILE)
+    assert route() == ("primary", "primary")
+
+
+def test_lag_is_checked_at_most_every_interval(routing):
+    assert route() == ("replica", "replica")
+    routing["lag"] = 99
+    assert route() == ("replica", "replica")  # the last reading is still trusted
+
+
+def test_a_failing_notice_handler_does_not_fail_routing(routing):
+    def broken(message):
+        raise RuntimeError("window closed")
+
+    ConnectionPool.add_notice_handler(broken)
+    routing["lag"] = 31
+    assert route() == ("primary", "primary")
+    assert len(routing["notices"]) == 1
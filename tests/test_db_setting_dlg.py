@@ -0,0 +1,15 @@
+import pytest
+
+from db_setting_dlg import to_int
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [(" 3307 ", 3307), (5, 5), ("", 42), (None, 42), ("abc", 42), ("3.5", 42), ("-4", 0)],
+)
+def test_to_int_falls_back_to_the_default(value, expected):
+    assert to_int(value, 42) == expected
+
+
+def test_to_int_respects_the_minimum():
+    assert to_int("0", 5, minimum=1) == 1
@@ -0,0 +1,127 @@
+from contextlib import contextmanager
+
+import pytest
+from pydantic_ai import ModelRetry
+
+from bench.fixtures import build_fixture_db
+from DbToolset import DbToolset, ensure_read_only
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT * FROM person",
+        "WITH p AS (SELECT hn FROM person) SELECT * FROM p",
+        "EXPLAIN SELECT * FROM person",
+        "EXPLAIN ANALYZE SELECT * FROM person",
+        "SHOW TABLES",
+    ],
+)
+def test_reads_are_allowed(sql):
+    ensure_read_only(sql)
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "DELETE FROM person",
+        "EXPLAIN ANALYZE DELETE FROM person",
+        "EXPLAIN ANALYZE UPDATE person SET fname = 'a'",
+        "WITH p AS (SELECT hn FROM person) DELETE FROM person",
+        "SELECT * INTO OUTFILE '/tmp/p' FROM person",
+        "SELECT * FROM person FOR UPDATE",
+        "SELECT 1; SELECT 2",
+        "CALL refresh_visits(2024)",
+    ],
+)
+def test_writes_are_rejected(sql):
+    with pytest.raises(ModelRetry):
+        ensure_read_only(sql)
+
+
+@pytest.fixture(scope="module")
+def toolset(tmp_path_factory):
+    path = build_fixture_db(str(tmp_path_factory.mktemp("db") / "hosxp.db"), people=40, visits=100)
+    return DbToolset.for_sqlite(path, max_rows=10)
+
+
+def test_list_and_describe_tables(toolset):
+    assert toolset.list_tables().splitlines() == ["name", "house", "ovst", "person", "village"]
+    columns = [line.split(",")[1] for line in toolset.describe_table("ovst").splitlines()[1:]]
+    assert columns == ["vn", "hn", "vstdate", "vsttime"]
+
+
+def test_sample_rows_are_capped(toolset):
+    lines = toolset.sample_rows("village", limit=500).splitlines()
+    assert len(lines) == 1 + 10 + 1  # header, max_rows rows, truncation note
+    assert lines[-1].startswith("-- ")
+    assert len(toolset.sample_rows("village", limit=3).splitlines()) == 1 + 3
+
+
+def test_bad_table_names_are_rejected(toolset):
+    with pytest.raises(ModelRetry):
+        toolset.describe_table("person; DROP TABLE person")
+
+
+def test_run_select_truncates_rows(toolset):
+    text = toolset.run_select("SELECT vn FROM ovst ORDER BY vn;")
+    lines = text.splitlines()
+    assert lines[0] == "vn"
+    assert len(lines) == 1 + 10 + 1
+    assert lines[-1].startswith("-- ")
+
+
+def test_run_select_rejects_writes(toolset):
+    with pytest.raises(ModelRetry):
+        toolset.run_select("DELETE FROM person")
+    assert toolset.run_select("SELECT COUNT(*) AS n FROM person").splitlines() == ["n", "40"]
+
+
+class FakeCursor:
+    description = [("id",)]
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.closed = False
+
+    def execute(self, sql):
+        pass
+
+    def fetchmany(self, size):
+        return self.rows[:size]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.cursor_ = FakeCursor(rows)
+        self.closed = False
+
+    def cursor(self, *args):
+        return self.cursor_
+
+    def close(self):
+        self.closed = True
+
+
+def mysql_toolset(connection):
+    @contextmanager
+    def connect():
+        yield connection
+
+    return DbToolset(connect, dialect="mysql", max_rows=3)
+
+
+def test_mysql_early_exit_closes_the_connection():
+    connection = FakeConnection([(i,) for i in range(10)])
+    text = mysql_toolset(connection).run_select("SELECT id FROM t")
+    assert text.splitlines()[1:4] == ["0", "1", "2"]
+    assert connection.closed and not connection.cursor_.closed
+
+
+def test_mysql_full_read_keeps_the_connection():
+    connection = FakeConnection([(1,), (2,)])
+    mysql_toolset(connection).run_select("SELECT id FROM t")
+    assert connection.cursor_.closed and not connection.closed
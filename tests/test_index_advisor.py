@@ -0,0 +1,24 @@
+import pytest
+
+import IndexAdvisor
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "WITH c AS (SELECT hn FROM dup) DELETE FROM person WHERE hn IN (SELECT hn FROM c)",
+        "WITH c AS (SELECT 1) UPDATE person SET fname = 'a'",
+        "SELECT * INTO OUTFILE '/tmp/p' FROM person",
+        "SELECT 1; SELECT 2",
+    ],
+)
+def test_plan_analyzer_never_explains_writes(sql, monkeypatch):
+    def connect(*args, **kwargs):
+        raise AssertionError("connected for a write")
+
+    monkeypatch.setattr(IndexAdvisor, "routed_connection", connect)
+    errors = []
+    analyzer = IndexAdvisor.PlanAnalyzer(sql, {}, analyze=True)
+    analyzer.error.connect(errors.append)
+    analyzer.run()
+    assert errors == ["วิเคราะห์แผนการทำงานได้เฉพาะคำสั่ง SELECT ทีละคำสั่ง"]
@@ -0,0 +1,43 @@
+import pytest
+
+from LatencyStats import RaceStats, percentile
+
+
+@pytest.mark.parametrize(
+    "pct, expected",
+    [(0, 1), (50, 5), (90, 9), (95, 10), (100, 10)],
+)
+def test_percentile_is_nearest_rank(pct, expected):
+    assert percentile([10, 1, 9, 2, 8, 3, 7, 4, 6, 5], pct) == expected
+
+
+def test_percentile_of_nothing_is_zero():
+    assert percentile([], 95) == 0.0
+
+
+def test_race_stats_persist_wins_and_latencies(tmp_path):
+    path = str(tmp_path / "race.json")
+    stats = RaceStats(path)
+    stats.record_latency("fast", 1.0)
+    stats.record_latency("slow", 3.0)
+    stats.record_race(["fast", "slow"], "fast")
+    stats.record_race(["fast", "slow"], None)
+
+    assert RaceStats(path).summary() == [("fast", 2, 0.5, 1.0, 1.0), ("slow", 2, 0.0, 3.0, 3.0)]
+
+
+def test_cancelled_runs_count_as_censored_latencies(tmp_path):
+    stats = RaceStats(str(tmp_path / "race.json"))
+    stats.record_latency("slow", 5.0)
+    for _ in range(3):
+        stats.record_censored("slow", 1.0)
+    stats.record_race(["slow"], None)
+
+    # Without the censored samples p50 would be 5.0, as if it always finished
+    assert stats.summary() == [("slow", 1, 0.0, 1.0, 5.0)]
+
+
+def test_old_files_without_censored_samples_load(tmp_path):
+    path = tmp_path / "race.json"
+    path.write_text('{"m": {"races": 1, "wins": 1, "latencies": [2.0]}}', encoding="utf-8")
+    assert RaceStats(str(path)).summary() == [("m", 1, 1.0, 2.0, 2.0)]
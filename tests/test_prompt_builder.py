@@ -0,0 +1,87 @@
+from PromptBuilder import PromptBuilder, estimate_tokens
+
+
+PROMPT = """1.Capabilities:
+- Use the database tools
+
+2.Definitions:
+- people,citizen = person
+- visit,came = ovst
+- diagnosis = ovstdiag
+
+3.Joins:
+- person <-> ovst via person.hn = ovst.hn
+- ovst <-> ovstdiag via ovst.vn = ovstdiag.vn
+
+4.Rules:
+- ovst.vstdate is the visit date
+- Always answer in Thai
+"""
+
+CATALOG = {"ovst": [["vn", "varchar(13)"], ["hn", "varchar(9)"], ["vstdate", "date"]]}
+
+
+def builder():
+    return PromptBuilder(PROMPT, CATALOG)
+
+
+def test_examples_share_the_token_budget():
+    example = "-- visits (similarity 0.90)\n" + " UNION ".join(["SELECT vn FROM ovst WHERE vstdate = CURDATE()"] * 10)
+    context = builder().build("visit today", 10_000, examples=[example], examples_header="Examples:")
+    assert context.endswith("Examples:\n\n" + example)
+
+    budget = estimate_tokens(builder().build("visit today", 10_000))
+    assert example not in builder().build("visit today", budget, examples=[example], examples_header="Examples:")
+
+
+def test_examples_are_kept_whole_and_in_order():
+    short, long = "-- a\nSELECT 1", "-- b\n" + "SELECT 2 " * 200
+    context = builder().build("visit", 80, examples=[long, short], examples_header="Examples:")
+    assert short in context
+    assert "-- b" not in context
+    assert estimate_tokens(context) <= 80 + 5  # separators are not counted
+
+
+def test_estimate_tokens_counts_thai_denser_than_ascii():
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("กขคง") == 2
+
+
+def test_stable_prefix_keeps_general_lines_and_the_join_graph():
+    prefix = builder().stable_prefix
+    assert "- Use the database tools" in prefix
+    assert "- person <-> ovst via person.hn = ovst.hn" in prefix
+    assert "- Always answer in Thai" in prefix
+    assert "people,citizen" not in prefix
+    assert "ovst.vstdate is the visit date" not in prefix
+    assert builder().stable_prefix == prefix
+
+
+def test_synonyms_and_join_path_pick_the_tables():
+    assert builder().relevant_tables("people who came") == {"person", "ovst"}
+    tables, joins = builder()._join_path({"person", "ovstdiag"})
+    assert tables == {"person", "ovst", "ovstdiag"}
+    assert [line.join for line in joins] == [("person", "ovst"), ("ovst", "ovstdiag")]
+
+
+def test_context_follows_the_question():
+    context = builder().build("diagnosis of people", 1000)
+    assert "- diagnosis = ovstdiag" in context
+    assert "- ovst.vstdate is the visit date" in context  # ovst joins them
+    assert "- ovst(vn varchar(13), hn varchar(9), vstdate date)" in context
+    assert "<->" not in context  # already in the stable prefix
+
+
+def test_budget_drops_lower_tiers_first():
+    full = builder().build("diagnosis of people", 1000)
+    trimmed = builder().build("diagnosis of people", 30)
+    assert estimate_tokens(trimmed) <= 30 + 5  # headers are not counted
+    assert "- diagnosis = ovstdiag" in trimmed and "- people,citizen = person" in trimmed
+    assert "โครงสร้างตารางที่เกี่ยวข้อง" in full and "โครงสร้างตารางที่เกี่ยวข้อง" not in trimmed
+    assert builder().build("diagnosis of people", 0) == ""
+
+
+def test_unrecognised_question_gets_the_synonym_map():
+    assert builder().build("weather today", 1000) == (
+        "2.Definitions:\n- people,citizen = person\n- visit,came = ovst\n- diagnosis = ovstdiag"
+    )
@@ -0,0 +1,75 @@
+import pytest
+
+from QueryHistory import QueryHistory, estimate_bytes
+from StatementClassifier import classify
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = QueryHistory(str(tmp_path / "history.sqlite3"), flush_interval=0.01)
+    yield history
+    history.close()
+
+
+def run(history, sql, total_ms, error=None, profile="hos"):
+    statement = classify(sql)
+    history.record(
+        {
+            "profile": profile,
+            "source": "editor",
+            "digest": statement.digest,
+            "fingerprint": statement.fingerprint,
+            "sql": sql,
+            "rows": 10,
+            "total_ms": total_ms,
+            "error": error,
+        }
+    )
+
+
+def test_estimate_bytes_scales_the_sample():
+    assert estimate_bytes([]) == 0
+    assert estimate_bytes([("abcd", None, b"xy")] * 1000) == 6000
+    assert estimate_bytes([("ก",)]) == 3
+
+
+def test_search_matches_word_prefixes_newest_first(history):
+    run(history, "SELECT * FROM ovst WHERE vstdate = '2024-01-01'", 5)
+    run(history, "SELECT * FROM person", 5)
+    run(history, "SELECT hn FROM ovstdiag", 5)
+    history.flush()
+
+    assert [row[-1] for row in history.search("ovst")] == [
+        "SELECT hn FROM ovstdiag",
+        "SELECT * FROM ovst WHERE vstdate = '2024-01-01'",
+    ]
+    assert [row[-1] for row in history.search("from person")] == ["SELECT * FROM person"]
+    assert len(history.search("")) == 3
+    assert history.search('"unbalanced') == []
+
+
+def test_ranking_groups_literals_and_skips_errors(history):
+    for day in range(1, 21):
+        run(history, f"SELECT * FROM ovst WHERE vstdate = '2024-01-{day:02d}'", day * 10)
+    run(history, "SELECT * FROM ovst WHERE vstdate = 'bad'", 9999, error="syntax")
+    run(history, "SELECT * FROM person", 1, profile="other")
+    history.flush()
+
+    slowest, fastest = history.ranking()
+    fingerprint, profiles, runs, total_ms, avg_ms, p95_ms, max_ms, avg_rows, last_run = slowest
+    assert fingerprint == "SELECT * FROM ovst WHERE vstdate = ?"
+    assert (profiles, runs, total_ms, avg_ms, p95_ms, max_ms) == ("hos", 20, 2100.0, 105.0, 190.0, 200.0)
+    assert fastest[:3] == ("SELECT * FROM person", "other", 1)
+
+
+def test_oldest_runs_are_pruned(tmp_path):
+    history = QueryHistory(str(tmp_path / "history.sqlite3"), flush_interval=0.01, max_rows=50)
+    try:
+        for number in range(1000):
+            run(history, f"SELECT {number}", 1)
+        history.flush()
+        rows = history.search("", limit=2000)
+        assert len(rows) == 50
+        assert rows[0][-1] == "SELECT 999"
+    finally:
+        history.close()
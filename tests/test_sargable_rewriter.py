@@ -0,0 +1,69 @@
+import pytest
+
+from SargableRewriter import rewrite_sargable
+
+
+@pytest.mark.parametrize(
+    "predicate, expected, rule",
+    [
+        ("YEAR(vstdate) = 2024", "(vstdate >= '2024-01-01' AND vstdate < '2025-01-01')", "YEAR() → range"),
+        ("DATE(vstdate) = '2024-03-01'", "(vstdate >= '2024-03-01' AND vstdate < '2024-03-02')", "DATE() → range"),
+        (
+            "DATE_FORMAT(vstdate, '%Y-%m') = '2024-02'",
+            "(vstdate >= '2024-02-01' AND vstdate < '2024-03-01')",
+            "DATE_FORMAT() → range",
+        ),
+        (
+            "YEAR(vstdate) = 2024 AND MONTH(vstdate) = 12",
+            "(vstdate >= '2024-12-01' AND vstdate < '2025-01-01')",
+            "YEAR/MONTH → range",
+        ),
+    ],
+)
+def test_date_functions_become_ranges(predicate, expected, rule):
+    sql, rewrites = rewrite_sargable(f"SELECT * FROM ovst WHERE {predicate}")
+    assert sql == f"SELECT * FROM ovst WHERE {expected}"
+    assert [rewrite.rule for rewrite in rewrites] == [rule]
+
+
+def test_in_subquery_becomes_join_without_extra_columns():
+    sql, rewrites = rewrite_sargable("SELECT * FROM ovst o WHERE o.hn IN (SELECT hn FROM person WHERE sex = '1')")
+    assert sql == (
+        "SELECT o.* FROM ovst o JOIN (SELECT DISTINCT hn AS in_key FROM person WHERE sex = '1') AS in_1 "
+        "ON in_1.in_key = o.hn"
+    )
+    assert [rewrite.rule for rewrite in rewrites] == ["IN (subquery) → JOIN"]
+
+
+def test_in_subquery_alias_is_replaced():
+    sql, _ = rewrite_sargable("SELECT o.vn FROM ovst o WHERE o.hn IN (SELECT p.hn AS h FROM person p) ORDER BY o.vn")
+    assert sql == (
+        "SELECT o.vn FROM ovst o JOIN (SELECT DISTINCT p.hn AS in_key FROM person p) AS in_1 "
+        "ON in_1.in_key = o.hn ORDER BY o.vn"
+    )
+
+
+def test_in_subquery_keeps_other_where_terms():
+    sql, _ = rewrite_sargable("SELECT o.vn FROM ovst o WHERE o.hn IN (SELECT hn FROM person) AND o.vn > 1")
+    assert sql == (
+        "SELECT o.vn FROM ovst o JOIN (SELECT DISTINCT hn AS in_key FROM person) AS in_1 "
+        "ON in_1.in_key = o.hn\nWHERE o.vn > 1"
+    )
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT * FROM ovst WHERE hn IN (SELECT hn FROM person) OR vn = 1",
+        "SELECT * FROM ovst o WHERE o.hn IN (SELECT hn FROM person p WHERE p.hn = o.hn)",
+        "SELECT * FROM ovst, person WHERE ovst.hn IN (SELECT hn FROM person)",
+        "SELECT * FROM ovst WHERE hn IN (SELECT hn FROM person UNION SELECT hn FROM patient)",
+        "SELECT * FROM ovst WHERE vstdate >= '2024-01-01'",
+        "SELECT * FROM ovst WHERE vn > 1 AND hn IN (SELECT hn FROM person) = 0",
+        "SELECT * FROM ovst WHERE vn > 1 AND hn IN (SELECT hn FROM person) IS FALSE",
+        "SELECT * FROM ovst UNION SELECT * FROM ipt WHERE hn IN (SELECT hn FROM person)",
+        "SELECT * FROM ovst WHERE hn IN (SELECT hn FROM person UNION ALL SELECT hn FROM patient)",
+    ],
+)
+def test_unsafe_or_plain_sql_is_unchanged(sql):
+    assert rewrite_sargable(sql) == (sql, [])
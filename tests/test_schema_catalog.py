@@ -0,0 +1,59 @@
+from SchemaCatalog import PrefixTrie, SchemaCatalog, completions, table_aliases
+
+
+CATALOG = SchemaCatalog(
+    {
+        "person": [["hn", "varchar(9)"], ["house_id", "int"]],
+        "house": [["house_id", "int"], ["address", "varchar(50)"]],
+        "ovst": [["vn", "varchar(13)"], ["hn", "varchar(9)"], ["vstdate", "date"]],
+    }
+)
+KEYWORDS = PrefixTrie(["HAVING", "HOUR", "SELECT"])
+
+
+def complete(text, position=None):
+    return completions(CATALOG, KEYWORDS, text, len(text) if position is None else position)
+
+
+def test_prefix_trie_is_case_insensitive_and_shortest_first():
+    trie = PrefixTrie(["village_name", "Village", "vn", "village_moo", "vn"])
+    assert trie.size == 4
+    assert trie.complete("VIL") == ["Village", "village_moo", "village_name"]
+    assert trie.complete("vil", limit=2) == ["Village", "village_moo"]
+    assert trie.complete("x") == []
+    assert trie.complete("") == ["vn", "Village", "village_moo", "village_name"]
+
+
+def test_columns_keep_table_order_and_table_names_are_case_insensitive():
+    assert CATALOG.columns("OVST") == ["vn", "hn", "vstdate"]
+    assert CATALOG.columns("`person`", "h") == ["hn", "house_id"]
+    assert CATALOG.columns("missing") == []
+
+
+def test_table_aliases():
+    assert table_aliases("SELECT * FROM person AS p JOIN `house` h ON p.house_id = h.house_id WHERE 1") == {
+        "person": "person", "p": "person", "house": "house", "h": "house",
+    }
+    assert table_aliases("SELECT * FROM ovst, person p LEFT JOIN house ON 1") == {
+        "ovst": "ovst", "person": "person", "p": "person", "house": "house",
+    }
+
+
+def test_alias_dot_offers_that_tables_columns():
+    assert complete("SELECT p.h FROM person p", len("SELECT p.h")) == (["hn", "house_id"], "h")
+
+
+def test_after_from_only_tables_are_offered():
+    assert complete("SELECT * FROM ho") == (["house"], "ho")
+    assert complete("SELECT * FROM person, ov") == (["ovst"], "ov")
+
+
+def test_columns_of_referenced_tables_come_first():
+    suggestions, prefix = complete("SELECT h FROM ovst o JOIN house h", len("SELECT h"))
+    assert prefix == "h"
+    assert suggestions == ["hn", "house_id", "HOUR", "HAVING", "house"]
+
+
+def test_completion_is_per_statement():
+    text = "SELECT * FROM house;\nSELECT v FROM ovst"
+    assert complete(text, len("SELECT * FROM house;\nSELECT v")) == (["vn", "vstdate"], "v")
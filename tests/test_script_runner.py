@@ -0,0 +1,74 @@
+from decimal import Decimal
+
+import pytest
+
+from ScriptRunner import batch_units, insert_shape, needs_session, plan_script, split_script
+
+
+def test_insert_shape_extracts_literals():
+    assert insert_shape("INSERT INTO t (a, b) VALUES (1, 'x''y'), (NULL, 2.5);") == (
+        "INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)",
+        (1, "x'y", None, Decimal("2.5")),
+    )
+
+
+def test_insert_shape_keeps_percent_signs_in_values():
+    assert insert_shape("INSERT INTO t (a) VALUES ('50%')") == ("INSERT INTO t (a) VALUES (%s)", ("50%",))
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "INSERT INTO t (a) VALUES (NOW())",
+        "INSERT INTO t SELECT * FROM u",
+        "INSERT INTO t (a) VALUES (1) ON DUPLICATE KEY UPDATE a = a + 1",
+        "UPDATE t SET a = 1",
+    ],
+)
+def test_insert_shape_rejects_non_literal_inserts(sql):
+    assert insert_shape(sql) is None
+
+
+def test_batch_units_groups_consecutive_inserts_of_one_shape():
+    statements = [
+        "INSERT INTO t (a) VALUES (1)",
+        "INSERT INTO t (a) VALUES (2)",
+        "UPDATE t SET a = 1",
+        "INSERT INTO t (a) VALUES (3)",
+    ]
+    assert batch_units(statements) == [
+        ("INSERT INTO t (a) VALUES (%s)", [(1,), (2,)], statements[:2]),
+        ("UPDATE t SET a = 1", None, statements[2:3]),
+        ("INSERT INTO t (a) VALUES (%s)", [(3,)], statements[3:]),
+    ]
+
+
+def test_batch_units_splits_different_shapes():
+    units = batch_units(["INSERT INTO t (a) VALUES (1)", "INSERT INTO t (a, b) VALUES (1, 2)"])
+    assert [len(unit[1]) for unit in units] == [1, 1]
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("SET @d = '2024-01-01'", True),
+        ("SELECT * FROM ovst WHERE vstdate = @d", True),
+        ("USE hos", True),
+        ("CREATE TEMPORARY TABLE tmp (a INT)", True),
+        ("SELECT LAST_INSERT_ID()", True),
+        ("SELECT * FROM ovst", False),
+        ("SELECT 'a@b' FROM ovst", False),
+    ],
+)
+def test_needs_session(sql, expected):
+    assert needs_session([sql]) is expected
+
+
+def test_plan_script_groups_reads_and_isolates_ddl():
+    statements = split_script(
+        "SELECT 1; SELECT 2; UPDATE t SET a = 1; INSERT INTO t (a) VALUES (1); "
+        "CREATE TABLE u (a INT); CREATE TABLE v (a INT); SELECT 3;"
+    )
+    assert [(kind, len(group)) for kind, group in plan_script(statements)] == [
+        ("read", 2), ("write", 2), ("ddl", 1), ("ddl", 1), ("read", 1),
+    ]
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+import SqlLibraryIndex
+from SqlLibraryIndex import FEW_SHOT_HEADER, SqlLibraryIndex as Index, char_ngrams, few_shot_context, few_shot_examples
+
+
+LIBRARY = {
+    "ประชากรแยกตามหมู่บ้าน.sql": "SELECT v.village_name, COUNT(*) FROM person p JOIN house h USING (house_id) "
+    "JOIN village v USING (village_id) GROUP BY v.village_name",
+    "ผู้มารับบริการรายวัน.sql": "SELECT vstdate, COUNT(*) FROM ovst GROUP BY vstdate",
+    "รายชื่อผู้ป่วยเบาหวาน.sql": "SELECT hn FROM ovstdiag WHERE icd10 BETWEEN 'E10' AND 'E14'",
+}
+
+
+@pytest.fixture
+def library(tmp_path):
+    sql_dir = tmp_path / "sql"
+    sql_dir.mkdir()
+    for name, sql in LIBRARY.items():
+        (sql_dir / name).write_text(sql, encoding="utf-8")
+    return Index(str(sql_dir), str(tmp_path / "index.json"))
+
+
+def test_char_ngrams_work_without_word_spaces():
+    assert char_ngrams("ab_c") == {"ab": 1, "b ": 1, " c": 1, "ab ": 1, "b c": 1}
+
+
+def test_thai_question_finds_the_query_named_after_it(library):
+    matches = library.search("จำนวนประชากรแต่ละหมู่บ้าน", k=3)
+    assert matches[0][1] == "ประชากรแยกตามหมู่บ้าน.sql"
+    assert matches[0][2] == LIBRARY["ประชากรแยกตามหมู่บ้าน.sql"]
+    assert [score for score, _, _ in matches] == sorted((score for score, _, _ in matches), reverse=True)
+
+
+def test_unrelated_question_finds_nothing(library):
+    assert library.search("zzzz qqqq", k=3) == []
+
+
+def test_changes_are_picked_up_and_cached(library, tmp_path):
+    library.search("เบาหวาน")
+    assert os.path.exists(library.cache_path)
+    os.remove(tmp_path / "sql" / "รายชื่อผู้ป่วยเบาหวาน.sql")
+    assert all(name != "รายชื่อผู้ป่วยเบาหวาน.sql" for _, name, _ in library.search("ผู้ป่วยเบาหวาน"))
+
+    reloaded = Index(library.sql_dir, library.cache_path)
+    assert set(reloaded.files) == set(library.files)
+
+
+def test_few_shot_examples_are_formatted_blocks(library, monkeypatch):
+    monkeypatch.setattr(SqlLibraryIndex, "get_sql_library", lambda: library)
+    examples = few_shot_examples("ผู้มารับบริการแต่ละวัน", k=1)
+    assert len(examples) == 1
+    assert examples[0].startswith("-- ผู้มารับบริการรายวัน (similarity ")
+    assert examples[0].endswith(LIBRARY["ผู้มารับบริการรายวัน.sql"])
+    assert few_shot_context(examples) == FEW_SHOT_HEADER + "\n\n" + examples[0]
+    assert few_shot_examples("anything", k=0) == []
+    assert few_shot_context([]) == ""
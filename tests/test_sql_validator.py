@@ -0,0 +1,55 @@
+import pytest
+
+from SQLValidator import estimate_result_rows, result_shape
+
+
+PLAN = [{"id": 1, "select_type": "SIMPLE", "rows": 500, "filtered": 10}]
+
+
+@pytest.mark.parametrize(
+    "sql, shape",
+    [
+        ("SELECT COUNT(*) FROM ovst", "aggregate"),
+        ("SELECT COUNT(*), MAX(vstdate) FROM ovst", "aggregate"),
+        ("SELECT hn, COUNT(*) FROM ovst GROUP BY hn", "grouped"),
+        ("SELECT DISTINCT hn FROM ovst", "grouped"),
+        ("SELECT hn, COUNT(*) OVER (PARTITION BY hn) FROM ovst", "rows"),
+        ("SELECT * FROM ovst WHERE vn IN (SELECT MAX(vn) FROM ovst GROUP BY hn)", "rows"),
+        ("WITH v AS (SELECT DISTINCT hn FROM ovst) SELECT * FROM v", "rows"),
+        ("SELECT COUNT(*) FROM ovst UNION ALL SELECT hn FROM person", "rows"),
+    ],
+)
+def test_result_shape(sql, shape):
+    assert result_shape(sql) == shape
+
+
+def test_aggregate_is_one_row():
+    assert estimate_result_rows(PLAN, "SELECT COUNT(*) FROM ovst") == 1
+
+
+@pytest.mark.parametrize("sql", ["SELECT hn, COUNT(*) FROM ovst GROUP BY hn", "SELECT DISTINCT hn FROM ovst"])
+def test_grouped_result_is_bounded_by_the_plan(sql):
+    assert estimate_result_rows(PLAN, sql) == 50
+
+
+def test_failed_explain_is_unknown():
+    assert estimate_result_rows([], "SELECT DISTINCT hn FROM ovst") == 0
+
+
+def test_window_function_keeps_every_row():
+    assert estimate_result_rows(PLAN, "SELECT hn, COUNT(*) OVER () FROM ovst") == 50
+
+
+def test_joins_multiply_and_unions_add():
+    plan = [
+        {"id": 1, "select_type": "PRIMARY", "rows": 1000, "filtered": 50},
+        {"id": 1, "select_type": "PRIMARY", "rows": 3, "filtered": 100},
+        {"id": 2, "select_type": "UNION", "rows": 10, "filtered": 100},
+        {"id": None, "select_type": "UNION RESULT", "rows": None, "filtered": None},
+        {"id": 3, "select_type": "SUBQUERY", "rows": 99999, "filtered": 100},
+    ]
+    assert estimate_result_rows(plan, "SELECT * FROM a JOIN b UNION SELECT * FROM c") == 1510
+
+
+def test_limit_caps_the_estimate():
+    assert estimate_result_rows(PLAN, "SELECT * FROM ovst LIMIT 10", 10) == 10
@@ -0,0 +1,68 @@
+import pytest
+
+from StatementClassifier import classify, statement_kind
+
+
+@pytest.mark.parametrize(
+    "sql, kind, targets",
+    [
+        ("SELECT * FROM person", "read", set()),
+        ("DELETE FROM person WHERE hn = '1'", "write", {"person"}),
+        ("UPDATE person SET fname = 'a'", "write", {"person"}),
+        ("INSERT INTO ovst SELECT * FROM ovst_old", "write", {"ovst"}),
+        ("WITH d AS (SELECT hn FROM dup) DELETE FROM person WHERE hn IN (SELECT hn FROM d)", "write", {"person"}),
+        ("WITH d AS (SELECT 1) UPDATE person SET fname = 'a'", "write", {"person"}),
+        ("DROP TABLE IF EXISTS tmp_visit", "ddl", {"tmp_visit"}),
+        ("EXPLAIN DELETE FROM person", "read", set()),
+        ("EXPLAIN ANALYZE DELETE FROM person", "write", {"person"}),
+        ("EXPLAIN ANALYZE UPDATE person SET fname = 'a'", "write", {"person"}),
+        ("EXPLAIN ANALYZE SELECT * FROM person", "read", set()),
+        ("CALL refresh_visits(2024)", "write", set()),
+    ],
+)
+def test_kind_and_targets(sql, kind, targets):
+    result = classify(sql)
+    assert result.kind == kind
+    assert result.targets == targets
+
+
+def test_subquery_tables_are_not_delete_targets():
+    result = classify("DELETE FROM person WHERE hn IN (SELECT hn FROM ovst)")
+    assert result.tables == {"person", "ovst"}
+    assert result.targets == {"person"}
+
+
+def test_locking_read_needs_primary():
+    result = classify("SELECT * FROM person WHERE hn = 1 FOR UPDATE")
+    assert result.kind == "read"
+    assert result.locking
+    assert result.needs_primary
+
+
+def test_keywords_inside_strings_are_not_writes():
+    assert classify("SELECT 'DELETE FROM person' AS note FROM dual").kind == "read"
+
+
+def test_limit_is_the_row_count():
+    assert classify("SELECT * FROM person LIMIT 20, 50").limit == 50
+    assert classify("SELECT * FROM person").limit is None
+
+
+def test_fingerprint_ignores_literals():
+    first = classify("SELECT * FROM person WHERE hn IN (1, 2, 3) AND fname = 'a'")
+    second = classify("SELECT * FROM person WHERE hn IN (7) AND fname = 'b'")
+    assert first.fingerprint == "SELECT * FROM person WHERE hn IN (?+) AND fname = ?"
+    assert first.digest != second.digest
+    assert classify("SELECT * FROM person WHERE hn IN (4, 5) AND fname = 'c'").digest == first.digest
+
+
+def test_script_takes_the_strongest_kind():
+    result = classify("SELECT 1; CREATE TABLE t (a INT); UPDATE t SET a = 1")
+    assert result.multi
+    assert result.kinds == ("read", "ddl", "write")
+    assert result.kind == "ddl"
+
+
+def test_empty_statement_is_treated_as_write():
+    assert classify("  -- nothing\n").kind == "empty"
+    assert statement_kind("") == "write"
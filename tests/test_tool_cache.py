@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+import ToolCache
+from ToolCache import CachingToolset, ToolResultCache, is_cacheable
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ToolCache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ToolResultCache(max_size=4, ttl=10)
+    cache.put("a", 1)
+    clock[0] += 9
+    assert cache.get("a") == (True, 1)
+    clock[0] += 2
+    assert cache.get("a") == (False, None)
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 0}
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ToolResultCache(max_size=2, ttl=10)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.get("c") == (True, 3)
+
+
+def test_shrinking_evicts_and_zero_disables(clock):
+    cache = ToolResultCache(max_size=3, ttl=10)
+    for key in "abc":
+        cache.put(key, key)
+    cache.configure(max_size=1)
+    assert cache.stats()["size"] == 1
+    cache.configure(ttl=0)
+    assert not cache.enabled
+
+
+@pytest.mark.parametrize(
+    "name, args, expected",
+    [
+        ("describe_table", {"table": "person"}, True),
+        ("list_tables", {}, True),
+        ("run_select", {"sql": "SELECT * FROM person LIMIT 5"}, True),
+        ("run_select", {"sql": "SHOW INDEX FROM person"}, True),
+        ("run_select", {"sql": "SELECT * FROM person"}, False),
+        ("run_select", {"sql": "SELECT * FROM person LIMIT 5 FOR UPDATE"}, False),
+        ("run_select", {"sql": "EXPLAIN ANALYZE DELETE FROM person"}, False),
+        ("run_select", {"sql": "DELETE FROM person LIMIT 5"}, False),
+        ("run_query", {"question": "how many people"}, False),
+    ],
+)
+def test_is_cacheable(name, args, expected):
+    assert is_cacheable(name, args) is expected
+
+
+class CountingToolset:
+    def __init__(self):
+        self.calls = 0
+
+    async def call_tool(self, name, tool_args, ctx, tool):
+        self.calls += 1
+        return f"{name} #{self.calls}"
+
+
+def call(toolset, name, **args):
+    return asyncio.run(toolset.call_tool(name, args, None, None))
+
+
+def test_caching_toolset_memoizes_per_scope(clock):
+    wrapped = CountingToolset()
+    cache = ToolResultCache(max_size=8, ttl=60)
+    first = CachingToolset(wrapped, scope="db1", cache=cache)
+    other = CachingToolset(wrapped, scope="db2", cache=cache)
+
+    assert call(first, "describe_table", table="person") == "describe_table #1"
+    assert call(first, "describe_table", table="person") == "describe_table #1"
+    assert call(other, "describe_table", table="person") == "describe_table #2"
+    assert call(first, "run_select", sql="SELECT * FROM person") == "run_select #3"
+    assert call(first, "run_select", sql="SELECT * FROM person") == "run_select #4"
+    assert (first.hits, first.misses) == (1, 1)
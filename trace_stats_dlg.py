@@ -0,0 +1,59 @@
+import sys
+from PyQt6.QtWidgets import (QApplication, QDialog, QVBoxLayout, QTableWidget,
+                            QTableWidgetItem, QDialogButtonBox, QHeaderView, QLabel)
+
+from Tracer import tracer
+
+
+class TraceStatsDialog(QDialog):
+    """
+    Shows p50/p95 latency per stage and per model from the local agent trace store.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Agent Timing")
+        self.setMinimumSize(640, 400)
+        
+        self.setup_ui()
+        self.load_stats()
+    
+    def setup_ui(self):
+        """Set up the user interface components."""
+        layout = QVBoxLayout()
+        
+        self.info_label = QLabel()
+        layout.addWidget(self.info_label)
+        
+        self.table = QTableWidget(0, 5)
+        self.table.setHorizontalHeaderLabels(["Stage", "Model", "Count", "p50 (ms)", "p95 (ms)"])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.table.setSortingEnabled(True)
+        layout.addWidget(self.table)
+        
+        self.button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        refresh_btn = self.button_box.addButton("Refresh", QDialogButtonBox.ButtonRole.ActionRole)
+        refresh_btn.clicked.connect(self.load_stats)
+        self.button_box.rejected.connect(self.reject)
+        layout.addWidget(self.button_box)
+        
+        self.setLayout(layout)
+    
+    def load_stats(self):
+        """Read the span store and fill the table."""
+        rows = tracer.summary()
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(rows))
+        for row, (stage, model, count, p50, p95) in enumerate(rows):
+            for column, value in enumerate((stage, model, count, p50, p95)):
+                item = QTableWidgetItem()
+                item.setData(0, value)
+                self.table.setItem(row, column, item)
+        self.table.setSortingEnabled(True)
+        self.info_label.setText(f"Spans from {tracer.path}")
+
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    dialog = TraceStatsDialog()
+    dialog.show()
+    sys.exit(app.exec())